@@ -1,5 +1,5 @@
-import pandas as pd
 from pathlib import Path
+from dataset_scanner import scan_dataset, build_count_table
 
 # --------------------------------------------------
 # ✅ 설정 부분
@@ -19,39 +19,23 @@ CSV_SAVE_PATH = BASE_DIR / "종별이미지개수.csv"
 def count_images_and_save_csv():
     """
     지정된 폴더 내의 각 하위 폴더에 있는 파일 개수를 세어 CSV로 저장합니다.
+    (dataset_scanner.py의 병렬/증분 스캐너를 사용하며, 변경되지 않은 폴더는 다시 세지 않습니다.)
     """
-    # 결과를 저장할 리스트
-    image_counts = []
-
     # images 폴더가 존재하는지 확인
     if not IMAGES_DIR.is_dir():
         print(f"❌ 오류: '{IMAGES_DIR}' 폴더를 찾을 수 없습니다. 경로를 확인해주세요.")
         return
 
-    print(f" сканирование '{IMAGES_DIR.name}' 폴더에서 이미지 개수를 스캔합니다...")
+    print(f"🔍 '{IMAGES_DIR.name}' 폴더에서 이미지 개수를 스캔합니다...")
 
-    # images 폴더 내의 모든 항목을 순회
-    for class_folder in IMAGES_DIR.iterdir():
-        # 폴더인 경우에만 개수 세기 진행
-        if class_folder.is_dir():
-            folder_name = class_folder.name
-            
-            # 해당 폴더 내의 파일 개수 계산 (숨김 파일 등 제외)
-            # '.jpg', '.jpeg', '.png' 등 일반적인 이미지 확장자만 카운트할 수 있습니다.
-            # 여기서는 간단하게 모든 파일을 카운트합니다.
-            file_count = sum(1 for f in class_folder.glob('*.*') if f.is_file())
-            
-            # 결과 리스트에 추가
-            image_counts.append({'folder': folder_name, 'file_count': file_count})
-            print(f" - '{folder_name}' 폴더에서 {file_count}개의 파일을 찾았습니다.")
+    # 파일 개수만 필요하므로 메타데이터(해상도/디코딩 검사)는 수집하지 않음
+    scan_results, (scanned, skipped) = scan_dataset(IMAGES_DIR, collect_metadata=False)
+    print(f" - {scanned}개 폴더 스캔, {skipped}개 폴더는 변경 없음(캐시 사용)")
 
     # 데이터가 있을 경우에만 CSV 파일 생성
-    if image_counts:
-        # 리스트를 Pandas DataFrame으로 변환
-        df = pd.DataFrame(image_counts)
-        
-        # 'file_count'를 기준으로 내림차순 정렬
-        df = df.sort_values(by='file_count', ascending=False)
+    if scan_results:
+        # 'file_count'를 기준으로 내림차순 정렬된 DataFrame
+        df = build_count_table(scan_results)
         
         try:
             # CSV 파일로 저장 (Excel에서 한글이 깨지지 않도록 'utf-8-sig' 인코딩 사용)
@@ -8,12 +8,21 @@ import os
 BASE_DIR = Path(__file__).resolve().parent
 DATASET_PATH = BASE_DIR / "dataset"
 SAVE_PATH = BASE_DIR.parent / "runs" # '.../CODE/runs'를 가리킴
+# ✨ (선택) shard_dataset.py로 만든 샤드 폴더. 지정하면 작은 파일 대신 샤드에서 이미지를 읽어 학습합니다.
+#    (클래스 목록 확인을 위해 DATASET_PATH 폴더 구조는 그대로 필요합니다)
+SHARD_DATASET_PATH = None  # 예: BASE_DIR / "dataset_shards"
+# ✨ (선택) 미리 리사이즈해 둔 이미지 캐시 사용 (image_cache.py). 같은 데이터셋이면 실험끼리 캐시를 재사용합니다.
+#    train은 짧은 변만 줄여 저장하므로 증강이 원본 전체 영역을 그대로 쓰지만, 처음 한 번 캐시를 만드는 시간과 디스크가 필요합니다.
+USE_IMAGE_CACHE = False
 
 # --------------------------------------------------
 # ✅ 옵션 설정
 # --------------------------------------------------
 EXPERIMENT_BASE_NAME = 'test11'
 EARLY_STOPPING_PATIENCE = 10
+# ✨ epoch마다 데이터로더 대기 시간 / 연산 시간 / 워커 사용률을 runs/classify/<exp>에 기록 (training_profiler.py)
+#    워커 수/배치 크기 추천은 python training_profiler.py (보정 모드)
+PROFILE_INPUT_PIPELINE = False
 # ✨ [추가] 실시간 데이터 증강 옵션
 # 추천 1: 균형 잡힌 강화
 AUGMENTATION_OPTIONS = {
@@ -30,6 +39,21 @@ AUGMENTATION_OPTIONS = {
     'hsv_s': 0.7,          # 채도(Saturation) 변화 범위
     'hsv_v': 0.4           # 명도(Value) 변화 범위
 }
+
+# ✨ 학습 기본 설정 (sweep_runner.py는 이 값에 실험별 설정을 덮어써서 사용)
+TRAIN_ARGS = {
+    'epochs': 75,
+    'imgsz': 384,
+    'batch': 32,
+    'patience': EARLY_STOPPING_PATIENCE,
+    'lr0': 0.01,
+    **AUGMENTATION_OPTIONS,
+    'weight_decay': 0.001, # 가중치 조절하기 
+    'device': 0,
+    'workers': min(16, os.cpu_count()), # cpu 병목 현상 처리(쓰레드에 일 전부 줘서 빨리 해결하기)
+    # cpu 병목 현상 처리 (기존 'cashe' 오타로 캐시가 꺼져 있었음). 이미지 캐시를 쓰면 중복이므로 끔
+    'cache': not USE_IMAGE_CACHE,
+}
 # --------------------------------------------------
 
 
@@ -38,19 +62,61 @@ def get_next_experiment_name(project_dir: Path, base_name: str) -> str:
     """
     지정된 프로젝트 폴더를 확인하여 다음 실험 이름을 반환합니다.
     먼저 base_name 자체를 확인하고, 존재하면 숫자를 붙여나갑니다.
+    ✨ 폴더를 mkdir로 바로 만들어 '예약'하므로, 여러 학습이 동시에 시작해도 같은 이름을 받지 않습니다.
+    (exists()로 확인한 뒤 나중에 만들면 그 사이에 다른 실행이 같은 이름을 가져갈 수 있음)
     """
-    # 1. 기본 이름(base_name) 자체를 먼저 확인
-    base_exp_path = project_dir / "classify" / base_name
-    if not base_exp_path.exists():
-        return base_name  # 기본 이름이 비어있으면 그대로 사용
+    classify_dir = project_dir / "classify"
+    classify_dir.mkdir(parents=True, exist_ok=True)
 
-    # 2. 기본 이름이 이미 존재하면, 뒤에 숫자를 붙여서 다음 번호 찾기
-    i = 1
+    i = 0
     while True:
-        exp_name = f"{base_name}{i}"
-        if not (project_dir / "classify" / exp_name).exists():
+        # 1. 기본 이름(base_name) 자체를 먼저 시도하고, 2. 이미 있으면 뒤에 숫자를 붙여서 다음 번호 시도
+        exp_name = base_name if i == 0 else f"{base_name}{i}"
+        try:
+            (classify_dir / exp_name).mkdir()
             return exp_name
-        i += 1
+        except FileExistsError:
+            i += 1
+
+
+def build_train_kwargs(use_image_cache=USE_IMAGE_CACHE, shard_dataset_path=SHARD_DATASET_PATH):
+    """이미지 캐시/샤드 사용 설정에 맞는 trainer 인자를 만듭니다."""
+    train_kwargs = {}
+    if use_image_cache:
+        from image_cache import get_or_build_cache, describe
+        from training_data import make_trainer, image_cache_factory
+        cache_dir, cache_meta = get_or_build_cache(DATASET_PATH)
+        print(f"이미지 캐시에서 학습합니다: {describe(cache_meta)}")
+        train_kwargs['trainer'] = make_trainer(image_cache_factory(cache_dir))
+    elif shard_dataset_path:
+        from training_data import make_trainer, shard_dataset_factory
+        train_kwargs['trainer'] = make_trainer(shard_dataset_factory(shard_dataset_path))
+        print(f"샤드 데이터셋에서 이미지를 읽습니다: {shard_dataset_path}")
+    return train_kwargs
+
+
+def train_experiment(experiment_name, overrides=None, model_weights='yolov8n-cls.pt', profile=PROFILE_INPUT_PIPELINE):
+    """
+    TRAIN_ARGS에 overrides를 덮어쓴 설정으로 학습합니다. (sweep_runner.py도 이 함수를 사용)
+    overrides에 'model'이 있으면 model_weights 대신 그 가중치로 시작합니다.
+    experiment_name 폴더는 get_next_experiment_name()으로 미리 예약돼 있어야 합니다.
+    """
+    args = {**TRAIN_ARGS, **(overrides or {})}
+    model = YOLO(args.pop('model', model_weights))
+    if profile:
+        from training_profiler import InputPipelineProfiler
+        InputPipelineProfiler().attach(model)
+    return model.train(
+        **build_train_kwargs(),
+        data=DATASET_PATH,
+        # ✨✨✨ [가장 중요] project 옵션 추가! ✨✨✨
+        project=SAVE_PATH,
+        # name에는 하위 폴더 이름만 지정
+        name=f"classify/{experiment_name}",
+        exist_ok=True,  # 예약해 둔 (비어 있는) 폴더를 그대로 사용
+        verbose=False,
+        **args,
+    )
 
 
 if __name__ == '__main__':
@@ -59,30 +125,10 @@ if __name__ == '__main__':
 
     print("--- 1단계: 모델 학습을 시작합니다 ---")
 
-    model = YOLO('yolov8n-cls.pt')
-
     # ✨ [수정됨] 함수에 SAVE_PATH를 직접 전달
     next_experiment_name = get_next_experiment_name(SAVE_PATH, EXPERIMENT_BASE_NAME)
     print(f"이번 학습 결과는 '{SAVE_PATH}/classify/{next_experiment_name}' 폴더에 저장됩니다.")
 
-    results = model.train(
-        data=DATASET_PATH,
-        epochs=75,
-        imgsz=384,
-        # ✨✨✨ [가장 중요] project 옵션 추가! ✨✨✨
-        project=SAVE_PATH,
-        # name에는 하위 폴더 이름만 지정
-        name=f"classify/{next_experiment_name}",
-        verbose=False,
-        batch=32,
-        patience=EARLY_STOPPING_PATIENCE,
-        lr0=0.01,
-        **AUGMENTATION_OPTIONS,
-        weight_decay=0.001, # 가중치 조절하기 
-        device=0,
-        workers=min(16, os.cpu_count()), # cpu 병목 현상 처리(쓰레드에 일 전부 줘서 빨리 해결하기)
-        cashe = True # cpu 병목 현상 처리
-        
-    )
+    results = train_experiment(next_experiment_name)
 
-    print("\n--- 학습 완료! ---")
\ No newline at end of file
+    print("\n--- 학습 완료! ---")
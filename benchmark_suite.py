@@ -0,0 +1,389 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import multiprocessing
+import tempfile
+import subprocess
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+from PIL import Image
+
+# --------------------------------------------------
+# ✅ 기본 설정 (명령행 인자로 바꿀 수 있음: python benchmark_suite.py --help)
+# --------------------------------------------------
+# 실제 images/ 폴더나 C:\ 경로, 네트워크 없이 CPU만으로 실행됩니다.
+BASE_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BASE_DIR / "benchmark_results"
+
+NUM_CLASSES = 20            # 합성 데이터셋의 클래스(종) 수
+IMAGES_PER_CLASS = 40       # 클래스당 이미지 수
+IMAGE_SIZE = (640, 480)     # 합성 이미지 크기 (가로, 세로)
+OTHER_CLASSES = 2           # 'other' 폴더(고정 데이터)에 들어갈 클래스 수
+IMGSZ = 128                 # 모델 입력 크기
+BATCH_SIZE = 16
+LATENCY_RUNS = 30           # 단일 이미지 지연 시간 측정 반복 횟수
+RENDER_IMAGES = 100         # 오버레이 렌더링 측정 이미지 수
+DECODE_IMAGE_SIZE = (4032, 3024)  # 디코딩 측정용 카메라 원본 크기 사진 (가로, 세로)
+DECODE_IMAGES = 8
+DISPLAY_SIZE = 1024         # 시각화용 이미지의 긴 변 최대 크기
+SEED = 0
+# --------------------------------------------------
+
+BENCHMARK_FORMAT_VERSION = 1
+
+
+def make_synthetic_dataset(root, num_classes=NUM_CLASSES, images_per_class=IMAGES_PER_CLASS, size=IMAGE_SIZE,
+                           other_classes=OTHER_CLASSES, seed=SEED, workers=8):
+    """
+    root/images/<종>/ 과 root/other/<종>/ 아래에 JPEG 이미지를 만듭니다.
+    클래스마다 바탕색이 다른 노이즈 이미지라 디코딩 비용은 실제 사진과 비슷하고, 내용 해시는 모두 다릅니다.
+    """
+    root = Path(root)
+    rng = np.random.default_rng(seed)
+    jobs = []
+    for folder, n_classes, prefix in (('images', num_classes, 'species'), ('other', other_classes, 'other')):
+        for c in range(n_classes):
+            class_dir = root / folder / f"{prefix}_{c:03d}"
+            class_dir.mkdir(parents=True, exist_ok=True)
+            base = rng.integers(0, 256, size=3)
+            for i in range(images_per_class if folder == 'images' else max(1, images_per_class // 4)):
+                jobs.append((class_dir / f"img_{i:05d}.jpg", base, int(rng.integers(0, 2**31))))
+
+    w, h = size
+
+    def write(job):
+        path, base, img_seed = job
+        noise = np.random.default_rng(img_seed).integers(-60, 60, size=(h // 8, w // 8, 3))
+        small = np.clip(base + noise, 0, 255).astype(np.uint8)
+        Image.fromarray(small).resize((w, h), Image.BILINEAR).save(path, quality=90)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(write, jobs))
+    return len(jobs)
+
+
+def make_tiny_classifier(path, class_names, imgsz=IMGSZ):
+    """무작위로 초기화한 yolov8n-cls 구조의 분류 모델을 .pt 체크포인트로 저장합니다. (다운로드 없음)"""
+    import torch
+    from ultralytics.nn.tasks import ClassificationModel
+
+    torch.manual_seed(SEED)
+    model = ClassificationModel('yolov8n-cls.yaml', nc=len(class_names), verbose=False)
+    model.names = dict(enumerate(class_names))
+    model.args = {'task': 'classify', 'imgsz': imgsz}
+    torch.save({'model': model.eval(), 'train_args': {'task': 'classify', 'imgsz': imgsz}}, path)
+    return Path(path)
+
+
+@contextlib.contextmanager
+def _quiet():
+    """각 스크립트의 진행 상황 출력을 숨기고 측정 결과만 보여줍니다."""
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+@contextlib.contextmanager
+def _patched(module, **values):
+    """모듈의 설정 상수를 잠시 벤치마크용 경로로 바꿉니다. (실제 CSV/인덱스 파일을 건드리지 않도록)"""
+    old = {k: getattr(module, k) for k in values}
+    for k, v in values.items():
+        setattr(module, k, v)
+    try:
+        yield
+    finally:
+        for k, v in old.items():
+            setattr(module, k, v)
+
+
+def bench_scan(work):
+    """Count_image.py 단계: 폴더 스캔 + 개수 표 생성 (캐시 없음 / 캐시 재사용)."""
+    from dataset_scanner import scan_dataset, build_count_table
+
+    cache_path = work / 'scan_cache.json'
+    result = {}
+    for label in ('cold', 'warm'):
+        start = time.perf_counter()
+        results, _ = scan_dataset(work / 'images', cache_path=cache_path, collect_metadata=False)
+        df = build_count_table(results)
+        result[f'{label}_seconds'] = time.perf_counter() - start
+    df.to_csv(work / 'counts.csv', index=False, encoding='utf-8-sig')
+    result['files'] = int(df['file_count'].sum())
+    result['files_per_sec'] = result['files'] / result['cold_seconds']
+    return result
+
+
+def bench_split(work, num_top):
+    """split_images_cls.create_combined_dataset 단계: 처음 생성 / 변경 없는 재실행(증분)."""
+    import split_images_cls as split
+
+    # 클래스마다 앞의 2장을 고정 Test 이미지로 지정
+    exclude = sorted({f"img_{i:05d}.jpg" for i in range(2)})
+    with open(work / 'exclude.json', 'w', encoding='utf-8') as f:
+        json.dump({'exclude': exclude}, f)
+
+    result = {}
+    with _patched(split, TEST_MANIFEST_PATH=work / 'no_manifest.json', METADATA_CSV_PATH=work / 'no_metadata.csv',
+                  HASH_INDEX_PATH=work / 'hash_index.csv', SAMPLING_WEIGHTS_PATH=work / 'sampling_weights.json',
+                  DROPPED_REPORT_PATH=work / 'dropped.csv'):
+        for label in ('cold', 'incremental'):
+            start = time.perf_counter()
+            with _quiet():
+                split.create_combined_dataset(work / 'images', work / 'other', work / 'dataset', work / 'counts.csv',
+                                              work / 'exclude.json', num_top, 0.8, SEED)
+            result[f'{label}_seconds'] = time.perf_counter() - start
+    result['files'] = len(split.list_files(work / 'dataset'))
+    return result
+
+
+def bench_single_image(model, image_paths, imgsz, runs):
+    """단일 이미지 지연 시간: 디코딩/리사이즈 + 예측 한 번 (첫 호출은 워밍업으로 제외)."""
+    from inference_engine import load_and_resize, predict_batch
+
+    predict_batch(model, [load_and_resize(image_paths[0], imgsz)], imgsz=imgsz)
+    latencies = []
+    for i in range(runs):
+        start = time.perf_counter()
+        predict_batch(model, [load_and_resize(image_paths[i % len(image_paths)], imgsz)], imgsz=imgsz)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        'runs': runs,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'mean_ms': float(np.mean(latencies)),
+    }
+
+
+def bench_batch_eval(model, items, imgsz, batch_size):
+    """evaluate_top1()로 배치 평가 처리 속도 (미리 읽기 켬 / 끔). 모델 워밍업은 단일 이미지 단계에서 이미 끝났습니다."""
+    from inference_engine import evaluate_top1
+
+    result = {'images': len(items), 'batch_size': batch_size}
+    for label, prefetch in (('prefetch', 2), ('sequential', 0)):
+        start = time.perf_counter()
+        stats = evaluate_top1(model, items, imgsz=imgsz, batch_size=batch_size, prefetch_batches=prefetch,
+                              warmup_batches=0)
+        result[f'{label}_images_per_sec'] = stats['images_per_sec']
+        result[f'{label}_wall_seconds'] = time.perf_counter() - start
+    return result
+
+
+def bench_render(work, image_paths, workers):
+    """OverlayRenderer로 top-5 오버레이 이미지를 저장하는 처리 속도."""
+    from overlay_renderer import OverlayRenderer
+
+    out_dir = work / 'rendered'
+    out_dir.mkdir(exist_ok=True)
+    text_lines = [(f"species_{i:03d} 0.{9 - i}0", "red" if i == 0 else "white") for i in range(5)]
+    start = time.perf_counter()
+    with OverlayRenderer(mode='all', font_path=None, num_workers=workers) as renderer:
+        for i, path in enumerate(image_paths):
+            renderer.submit(path, out_dir / f"{i:05d}.jpg", text_lines, is_correct=True)
+    seconds = time.perf_counter() - start
+    return {'images': renderer.rendered, 'failed': len(renderer.failed), 'seconds': seconds,
+            'images_per_sec': renderer.rendered / seconds if seconds > 0 else 0.0, 'workers': workers}
+
+
+def _peak_rss_mb():
+    """지금까지의 최대 메모리 사용량(MB). 측정할 수 없는 환경이면 None."""
+    try:
+        # Linux: ru_maxrss는 exec 후에도 부모 프로세스의 값이 이어지므로 VmHWM을 읽음
+        with open('/proc/self/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024  # macOS는 바이트 단위
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1 << 20)  # Windows
+    except (ImportError, AttributeError):
+        return None
+
+
+def _decode_child(mode, image_paths, imgsz, display_size):
+    """
+    새 프로세스에서 한 방식으로 이미지를 디코딩하며 이미지당 시간과 최대 메모리 증가량을 잽니다.
+    - 'twice': 예전 방식. 추론용과 시각화용으로 각각 원본 해상도로 디코딩
+    - 'shared': load_for_display()로 축소 디코딩 (추론용 배율로 표시 해상도가 충분하면 한 번만 디코딩)
+    """
+    from inference_engine import load_for_display
+
+    def full_decode(path):
+        with Image.open(path) as img:
+            return img.convert("RGB")
+
+    baseline = _peak_rss_mb()
+    times = []
+    for path in image_paths:
+        start = time.perf_counter()
+        if mode == 'twice':
+            img = full_decode(path)
+            scale = imgsz / min(img.size)
+            model_input = img.resize((round(img.width * scale), round(img.height * scale)), Image.BILINEAR)
+            display = full_decode(path)
+            display.thumbnail((display_size, display_size))
+            del img
+        else:
+            model_input, display = load_for_display(path, imgsz, display_size)
+        times.append(time.perf_counter() - start)
+        del model_input, display
+    peak = _peak_rss_mb()
+    return {'decode_ms': 1000 * float(np.median(times)),
+            'peak_rss_delta_mb': (peak - baseline) if peak is not None and baseline is not None else None}
+
+
+def bench_decode(work, imgsz, image_size=DECODE_IMAGE_SIZE, num_images=DECODE_IMAGES, display_size=DISPLAY_SIZE):
+    """카메라 원본 크기 JPEG을 추론+시각화용으로 디코딩하는 비용 (예전 방식 vs 축소 디코딩)."""
+    make_synthetic_dataset(work / 'camera', 1, num_images, image_size, other_classes=0)
+    paths = sorted((work / 'camera' / 'images').rglob('*.jpg'))
+    result = {'images': len(paths), 'image_size': list(image_size), 'display_size': display_size}
+    ctx = multiprocessing.get_context('spawn')  # 방식마다 새 프로세스에서 재야 최대 메모리를 비교할 수 있음
+    for mode in ('twice', 'shared'):
+        with ctx.Pool(1) as pool:
+            for key, value in pool.apply(_decode_child, (mode, paths, imgsz, display_size)).items():
+                result[f"{mode}_{key}"] = value
+    result['speedup'] = result['twice_decode_ms'] / result['shared_decode_ms'] if result['shared_decode_ms'] else None
+    return result
+
+
+def environment_info():
+    info = {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count()}
+    try:
+        info['git_commit'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                            capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        info['git_commit'] = None
+    try:
+        import torch
+        import ultralytics
+        info.update(torch=torch.__version__, ultralytics=ultralytics.__version__, torch_threads=torch.get_num_threads())
+    except ImportError:
+        pass
+    return info
+
+
+def run_benchmarks(num_classes=NUM_CLASSES, images_per_class=IMAGES_PER_CLASS, image_size=IMAGE_SIZE,
+                   imgsz=IMGSZ, batch_size=BATCH_SIZE, latency_runs=LATENCY_RUNS, render_images=RENDER_IMAGES,
+                   work_dir=None):
+    """합성 데이터셋을 만들고 단계별 성능을 측정해 결과 딕셔너리를 반환합니다."""
+    from inference_engine import load_model, list_class_images
+
+    work = Path(work_dir or tempfile.mkdtemp(prefix='wild_bench_'))
+    config = {'num_classes': num_classes, 'images_per_class': images_per_class, 'image_size': list(image_size),
+              'imgsz': imgsz, 'batch_size': batch_size, 'latency_runs': latency_runs, 'render_images': render_images}
+    report = {'version': BENCHMARK_FORMAT_VERSION, 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'environment': environment_info(), 'config': config, 'stages': {}}
+    stages = report['stages']
+
+    def stage(name, fn, *args):
+        print(f"▶ {name} ...", end=' ', flush=True)
+        start = time.perf_counter()
+        stages[name] = fn(*args)
+        print(f"{time.perf_counter() - start:.2f}초")
+
+    try:
+        start = time.perf_counter()
+        n_images = make_synthetic_dataset(work, num_classes, images_per_class, image_size)
+        report['dataset'] = {'images': n_images, 'generate_seconds': time.perf_counter() - start}
+        print(f"🧪 합성 데이터셋 {n_images}개 이미지 생성: {work}")
+
+        stage('scan', bench_scan, work)
+        stage('split', bench_split, work, num_classes)
+
+        test_items = list_class_images(work / 'dataset' / 'test')
+        val_items = list_class_images(work / 'dataset' / 'val')
+        class_names = sorted(d.name for d in (work / 'dataset' / 'train').iterdir() if d.is_dir())
+        with _quiet():
+            model = load_model(make_tiny_classifier(work / 'tiny-cls.pt', class_names, imgsz))
+        eval_items = test_items + val_items
+        paths = [p for p, _ in eval_items]
+
+        stage('single_image_latency', bench_single_image, model, paths, imgsz, latency_runs)
+        stage('batch_eval', bench_batch_eval, model, eval_items, imgsz, batch_size)
+        stage('overlay_render', bench_render, work, (paths * (render_images // max(1, len(paths)) + 1))[:render_images],
+              max(1, min(4, (os.cpu_count() or 2) // 2)))
+        stage('decode', bench_decode, work, imgsz)
+    finally:
+        if work_dir is None:
+            shutil.rmtree(work, ignore_errors=True)
+    return report
+
+
+def compare_reports(old_path, new_path):
+    """두 결과 JSON의 단계별 수치를 나란히 출력합니다. (시간은 작을수록, 처리 속도는 클수록 좋음)"""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"기준: {old['environment'].get('git_commit')} ({old['timestamp']})  ->  "
+          f"비교: {new['environment'].get('git_commit')} ({new['timestamp']})")
+    for stage_name, new_stage in new['stages'].items():
+        old_stage = old['stages'].get(stage_name, {})
+        for key, value in new_stage.items():
+            before = old_stage.get(key)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or before == 0:
+                continue
+            if not key.endswith(('_seconds', '_ms', '_mb', '_per_sec')):
+                continue
+            ratio = value / before
+            better = ratio > 1 if key.endswith('_per_sec') else ratio < 1
+            print(f" - {stage_name}.{key}: {before:.4g} -> {value:.4g} ({ratio:.2f}배, {'✅' if better else '⚠️'})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 데이터셋으로 단계별 성능을 측정합니다 (CPU, 오프라인).")
+    parser.add_argument('--classes', type=int, default=NUM_CLASSES)
+    parser.add_argument('--images-per-class', type=int, default=IMAGES_PER_CLASS)
+    parser.add_argument('--image-size', type=int, nargs=2, default=IMAGE_SIZE, metavar=('W', 'H'))
+    parser.add_argument('--imgsz', type=int, default=IMGSZ)
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE)
+    parser.add_argument('--latency-runs', type=int, default=LATENCY_RUNS)
+    parser.add_argument('--render-images', type=int, default=RENDER_IMAGES)
+    parser.add_argument('--work-dir', help="합성 데이터를 남겨 둘 폴더 (지정하지 않으면 임시 폴더를 쓰고 삭제)")
+    parser.add_argument('--out', help="결과 JSON 경로 (기본: benchmark_results/bench_<커밋>_<시각>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="저장된 두 결과 JSON을 비교")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    report = run_benchmarks(args.classes, args.images_per_class, tuple(args.image_size), args.imgsz, args.batch,
+                            args.latency_runs, args.render_images, args.work_dir)
+    out = Path(args.out) if args.out else (
+        RESULTS_DIR / f"bench_{report['environment'].get('git_commit') or 'nogit'}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    s = report['stages']
+    print(f"\n{'='*60}\n🏁 벤치마크 결과\n{'='*60}")
+    print(f" - 스캔: {s['scan']['cold_seconds']:.3f}초 (캐시 재사용 {s['scan']['warm_seconds']:.3f}초), "
+          f"{s['scan']['files_per_sec']:.0f} files/sec")
+    print(f" - split 생성: {s['split']['cold_seconds']:.3f}초 (증분 재실행 {s['split']['incremental_seconds']:.3f}초)")
+    print(f" - 단일 이미지: p50 {s['single_image_latency']['p50_ms']:.1f}ms, p95 {s['single_image_latency']['p95_ms']:.1f}ms")
+    print(f" - 배치 평가: {s['batch_eval']['prefetch_images_per_sec']:.1f} images/sec "
+          f"(순차 {s['batch_eval']['sequential_images_per_sec']:.1f})")
+    print(f" - 오버레이 렌더링: {s['overlay_render']['images_per_sec']:.1f} images/sec")
+    d = s['decode']
+    rss = (f", 최대 메모리 증가 {d['twice_peak_rss_delta_mb']:.0f}MB -> {d['shared_peak_rss_delta_mb']:.0f}MB"
+           if d['twice_peak_rss_delta_mb'] is not None else "")
+    print(f" - 원본 디코딩({d['image_size'][0]}x{d['image_size'][1]}): 이미지당 {d['twice_decode_ms']:.1f}ms -> "
+          f"{d['shared_decode_ms']:.1f}ms ({d['speedup']:.1f}배){rss}")
+    print(f"💾 결과 저장: {out}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
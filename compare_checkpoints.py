@@ -0,0 +1,192 @@
+import glob
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from PIL import Image
+from inference_engine import iter_image_batches, predict_batch, list_class_images, load_model
+from prediction_cache import PredictionCache, CACHE_ROOT
+from shard_dataset import ShardReader
+from metrics_engine import topk_accuracy
+
+# --------------------------------------------------
+# ✅ 사용자가 수정해야 할 부분
+# --------------------------------------------------
+# 비교할 체크포인트 목록. 경로 또는 glob 패턴을 섞어 쓸 수 있습니다. (내보낸 .onnx / *_openvino_model도 가능)
+CHECKPOINTS = [
+    r"C:\Users\sega0\Desktop\code\runs\classify\test*\weights\best.pt",
+]
+TEST_DATASET_PATH = r"C:\Users\sega0\Desktop\code\try\dataset\test"
+# (선택) shard_dataset.py로 만든 test 샤드 폴더
+SHARD_TEST_PATH = None
+# 비교 결과 CSV 저장 위치
+RESULTS_SAVE_PATH = Path(r"C:\Users\sega0\Desktop\code\runs\classify") / "checkpoint_comparison.csv"
+
+IMGSZ = 384
+BATCH_SIZE = 32
+PREFETCH_BATCHES = 2
+DECODE_WORKERS = 4
+
+# 예측 캐시(prediction_cache.py)를 사용하면 이미 평가한 모델/이미지 조합은 다시 예측하지 않습니다.
+USE_PREDICTION_CACHE = True
+PREDICTION_CACHE_DIR = CACHE_ROOT
+# --------------------------------------------------
+
+
+def resolve_checkpoints(patterns):
+    """경로/glob 패턴 목록을 실제 존재하는 체크포인트 경로 목록으로 바꿉니다. (중복 제거, 입력 순서 유지)"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(str(pattern))) if glob.has_magic(str(pattern)) else [str(pattern)]
+        for match in matches:
+            path = Path(match)
+            if path.exists() and path not in paths:
+                paths.append(path)
+    return paths
+
+
+def model_label(model_path):
+    """runs/classify/<실험>/weights/best.pt 형태면 실험 이름을, 아니면 파일 이름을 표시용 이름으로 씁니다."""
+    model_path = Path(model_path)
+    if model_path.parent.name == 'weights':
+        return f"{model_path.parent.parent.name}/{model_path.stem}"
+    return model_path.name
+
+
+def compare_checkpoints(model_paths, items, imgsz=IMGSZ, batch_size=BATCH_SIZE, prefetch_batches=PREFETCH_BATCHES,
+                        num_workers=DECODE_WORKERS, cache_root=PREDICTION_CACHE_DIR):
+    """
+    여러 모델을 같은 test 이미지로 평가합니다. 각 배치는 한 번만 디코딩/리사이즈하고 모든 모델에 차례로 넣습니다.
+    (모델별 {'label', 'cache', 'images', 'seconds'} 목록, 이미지별 캐시 키 목록, 전체 소요 시간)을 반환합니다.
+    images/seconds는 이번 실행에서 실제로 예측한 이미지 수와 forward에 쓴 시간이며,
+    결과를 다 읽은 뒤 각 run['cache']를 close() 해야 합니다.
+    """
+    runs = []
+    for path in model_paths:
+        print(f"모델을 로드합니다: {path}")
+        model = load_model(path)
+        # 더미 이미지로 한 번 추론해 첫 배치의 초기화 비용이 속도 측정에 섞이지 않도록 합니다.
+        model.predict(Image.new("RGB", (imgsz, imgsz)), imgsz=imgsz, verbose=False)
+        class_names = [model.names[i] for i in range(len(model.names))]
+        cache = PredictionCache(path, len(class_names), imgsz, cache_root=cache_root, class_names=class_names)
+        runs.append({'label': model_label(path), 'model': model, 'cache': cache, 'images': 0, 'seconds': 0.0})
+
+    sources = [src for src, _ in items]
+    keys = runs[0]['cache'].image_keys(sources, workers=num_workers) if runs else []
+    key_of = dict(zip(sources, keys))
+
+    # 이미지마다 아직 예측이 없는 모델 번호 목록. 하나라도 있으면 디코딩 대상입니다.
+    needed, seen = {}, set()
+    for src, key in zip(sources, keys):
+        if key in seen:
+            continue
+        seen.add(key)
+        missing = [i for i, run in enumerate(runs) if key not in run['cache']]
+        if missing:
+            needed[src] = missing
+    cached = sum(len(runs) - len(m) for m in needed.values()) + (len(seen) - len(needed)) * len(runs)
+    print(f"🗃️ 모델 x 이미지 {len(seen) * len(runs)}개 조합 중 {cached}개는 캐시 재사용, "
+          f"{len(needed)}개 이미지를 한 번씩 디코딩합니다.")
+
+    decode_start = time.perf_counter()
+    batches = iter_image_batches(list(needed), imgsz=imgsz, batch_size=batch_size,
+                                 prefetch_batches=prefetch_batches, num_workers=num_workers)
+    for paths, images, errors in batches:
+        for src, err in errors:
+            print(f"  - 파일: {src.name} | ⚠️ 이미지 디코딩 중 오류 발생: {err}")
+        for i, run in enumerate(runs):
+            picked = [j for j, src in enumerate(paths) if i in needed[src]]
+            if not picked:
+                continue
+            start = time.perf_counter()
+            try:
+                predictions = predict_batch(run['model'], [images[j] for j in picked], imgsz=imgsz)
+            except Exception as e:
+                print(f"  - ⚠️ '{run['label']}' 배치 예측 중 오류 발생 ({len(picked)}개 이미지 건너뜀): {e}")
+                continue
+            run['seconds'] += time.perf_counter() - start
+            run['images'] += len(predictions)
+            run['cache'].put([key_of[paths[j]] for j in picked], [pred['probs'] for pred in predictions])
+    total_seconds = time.perf_counter() - decode_start
+
+    for run in runs:
+        del run['model']
+    return runs, keys, total_seconds
+
+
+def build_comparison_table(runs, items, keys):
+    """
+    모델별 캐시된 확률로 클래스별 top-1 정확도를 나란히 놓은 표와, 모델별 요약 표를 만듭니다.
+    예측이 없는 이미지(디코딩 실패)는 해당 모델의 집계에서 빠집니다.
+    """
+    labels = np.array([label for _, label in items])
+    per_class = {}
+    summary = []
+    for run in runs:
+        cache = run['cache']
+        name_to_idx = {name: i for i, name in enumerate(cache.class_names)}
+        present = np.array([k in cache for k in keys], dtype=bool)
+        probs = cache.get_many([k for k, ok in zip(keys, present) if ok])
+        true_idx = np.array([name_to_idx.get(label, -1) for label in labels[present]], dtype=np.int64)
+        k = min(5, cache.num_classes)
+        topk_idx = np.argsort(-probs, axis=1)[:, :k]
+        correct = topk_idx[:, 0] == true_idx
+
+        per_class[run['label']] = (pd.Series(correct, index=labels[present]).groupby(level=0).mean() * 100)
+        summary.append({
+            '모델': run['label'],
+            '이미지 수': int(present.sum()),
+            'Top-1 정확도 (%)': topk_accuracy(true_idx, topk_idx, 1),
+            'Top-5 정확도 (%)': topk_accuracy(true_idx, topk_idx, k),
+            '예측한 이미지 수': run['images'],
+            'images/sec': run['images'] / run['seconds'] if run['seconds'] > 0 else float('nan'),
+        })
+
+    counts = pd.Series(labels).value_counts().sort_index()
+    table = pd.DataFrame(per_class).reindex(counts.index)
+    table.insert(0, '총 이미지 수', counts)
+    table.index.name = '클래스'
+    return table, pd.DataFrame(summary)
+
+
+def main():
+    model_paths = resolve_checkpoints(CHECKPOINTS)
+    if not model_paths:
+        print(f"❌ 오류: 비교할 체크포인트를 찾을 수 없습니다. CHECKPOINTS 설정을 확인해주세요.")
+        return
+
+    if SHARD_TEST_PATH:
+        items = ShardReader(SHARD_TEST_PATH).items()
+    else:
+        if not Path(TEST_DATASET_PATH).is_dir():
+            print(f"❌ 오류: 테스트 데이터셋 폴더를 찾을 수 없습니다: {TEST_DATASET_PATH}")
+            return
+        items = list_class_images(TEST_DATASET_PATH)
+    print(f"총 {len(model_paths)}개 모델을 {len(items)}개의 테스트 이미지로 비교합니다.")
+
+    runs, keys, total_seconds = compare_checkpoints(
+        model_paths, items, cache_root=PREDICTION_CACHE_DIR if USE_PREDICTION_CACHE else None)
+    print(f"\n⚡ 디코딩 + 전체 모델 예측: {total_seconds:.1f}초")
+
+    try:
+        table, summary = build_comparison_table(runs, items, keys)
+    finally:
+        for run in runs:
+            run['cache'].close()
+    print(f"\n\n{'='*60}\n🏆 클래스별 Top-1 정확도 (%)\n{'='*60}")
+    print(table.to_string(float_format=lambda v: f"{v:.2f}"))
+    print(f"\n\n{'='*60}\n📊 모델별 요약 (images/sec는 디코딩을 뺀 forward 처리 속도)\n{'='*60}")
+    print(summary.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+    try:
+        table.to_csv(RESULTS_SAVE_PATH, encoding='utf-8-sig')
+        with open(RESULTS_SAVE_PATH, 'a', encoding='utf-8-sig', newline="") as f:
+            f.write('\n')
+            summary.to_csv(f, index=False)
+        print(f"\n\n💾 비교 결과가 CSV 파일로 저장되었습니다.\n  -> 저장 위치: {RESULTS_SAVE_PATH}")
+    except Exception as e:
+        print(f"\n\n❌ CSV 파일 저장 중 오류가 발생했습니다: {e}")
+
+
+if __name__ == '__main__':
+    main()
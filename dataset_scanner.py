@@ -0,0 +1,179 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pandas as pd
+from PIL import Image
+
+# --------------------------------------------------
+# ✅ 설정 부분
+# --------------------------------------------------
+BASE_DIR = Path(__file__).resolve().parent
+
+# 이미지들이 들어있는 상위 폴더 경로 ('.../images/')
+IMAGES_DIR = BASE_DIR.parent / "images"
+
+# 기존 형식(folder,file_count)의 CSV 파일
+CSV_SAVE_PATH = BASE_DIR / "종별이미지개수.csv"
+# 파일별 메타데이터 표 (split_images_cls.py에서 읽을 수 있음)
+METADATA_CSV_PATH = BASE_DIR / "이미지메타데이터.csv"
+# 폴더별 스캔 결과 캐시 (폴더 수정 시각이 같으면 다시 스캔하지 않음)
+SCAN_CACHE_PATH = BASE_DIR / ".scan_cache.json"
+
+COLLECT_METADATA = True          # 파일 크기/형식/해상도/디코딩 가능 여부 기록
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)   # 파일 I/O 위주라 코어 수보다 넉넉하게
+# --------------------------------------------------
+
+SCAN_CACHE_VERSION = 1
+METADATA_COLUMNS = ['folder', 'name', 'size', 'format', 'width', 'height', 'ok']
+
+
+def inspect_image(path):
+    """이미지 파일의 형식/해상도를 읽고, 실제로 디코딩되는지 확인합니다."""
+    try:
+        with Image.open(path) as img:
+            fmt, (width, height) = img.format, img.size
+            # JPEG는 축소 디코딩(draft)으로 빠르게 전체 스트림을 검사
+            img.draft('RGB', (64, 64))
+            img.load()
+        return fmt, width, height, True
+    except Exception:
+        return None, None, None, False
+
+
+def scan_folder(folder_path, collect_metadata=COLLECT_METADATA):
+    """os.scandir로 폴더 하나를 스캔해 파일 수와 (선택) 파일별 메타데이터를 반환합니다."""
+    files = []
+    with os.scandir(folder_path) as it:
+        for entry in it:
+            # 기존 Count_image.py의 glob('*.*')와 같이 확장자가 있는 파일만 카운트
+            if '.' not in entry.name or not entry.is_file(follow_symlinks=True):
+                continue
+            if collect_metadata:
+                fmt, width, height, ok = inspect_image(entry.path)
+                files.append({'name': entry.name, 'size': entry.stat().st_size, 'format': fmt,
+                              'width': width, 'height': height, 'ok': ok})
+            else:
+                files.append({'name': entry.name})
+    files.sort(key=lambda f: f['name'])
+    return files
+
+
+def load_scan_cache(cache_path):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('version') == SCAN_CACHE_VERSION:
+            return cache
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {'version': SCAN_CACHE_VERSION, 'root': None, 'folders': {}}
+
+
+def save_scan_cache(cache, cache_path):
+    tmp_path = Path(str(cache_path) + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+def scan_dataset(images_dir, cache_path=SCAN_CACHE_PATH, collect_metadata=COLLECT_METADATA,
+                 num_workers=SCAN_WORKERS):
+    """
+    클래스 폴더들을 스레드 풀로 병렬 스캔합니다.
+    폴더 수정 시각(mtime)이 캐시와 같은 폴더는 건너뛰고 캐시된 결과를 그대로 사용합니다.
+    {폴더명: 파일 정보 목록} 딕셔너리와 (스캔한 폴더 수, 건너뛴 폴더 수)를 반환합니다.
+    """
+    images_dir = Path(images_dir)
+    cache = load_scan_cache(cache_path) if cache_path else {'folders': {}}
+    if cache.get('root') != str(images_dir.resolve()):
+        cache = {'version': SCAN_CACHE_VERSION, 'root': str(images_dir.resolve()), 'folders': {}}
+    cached_folders = cache['folders']
+
+    to_scan, results = [], {}
+    with os.scandir(images_dir) as it:
+        for entry in it:
+            if not entry.is_dir():
+                continue
+            mtime_ns = entry.stat().st_mtime_ns
+            cached = cached_folders.get(entry.name)
+            if (cached and cached['mtime_ns'] == mtime_ns
+                    and (cached['metadata'] or not collect_metadata)):
+                results[entry.name] = cached['files']
+            else:
+                to_scan.append((entry.name, entry.path, mtime_ns))
+
+    skipped = len(results)
+    with ThreadPoolExecutor(max_workers=max(1, num_workers)) as pool:
+        scanned = pool.map(lambda item: (item, scan_folder(item[1], collect_metadata)), to_scan)
+        for (name, _, mtime_ns), files in scanned:
+            results[name] = files
+            cached_folders[name] = {'mtime_ns': mtime_ns, 'metadata': collect_metadata, 'files': files}
+
+    # 사라진 폴더는 캐시에서 제거
+    for name in list(cached_folders):
+        if name not in results:
+            del cached_folders[name]
+
+    if cache_path:
+        save_scan_cache(cache, cache_path)
+    return results, (len(to_scan), skipped)
+
+
+def build_count_table(scan_results):
+    """기존 종별이미지개수.csv와 같은 folder,file_count 표를 만듭니다."""
+    df = pd.DataFrame([{'folder': name, 'file_count': len(files)} for name, files in scan_results.items()],
+                      columns=['folder', 'file_count'])
+    return df.sort_values(by='file_count', ascending=False, kind='stable')
+
+
+def build_metadata_table(scan_results):
+    """파일별 메타데이터 표 (folder, name, size, format, width, height, ok)를 만듭니다."""
+    rows = [{'folder': name, **f} for name, files in sorted(scan_results.items()) for f in files if 'ok' in f]
+    return pd.DataFrame(rows, columns=METADATA_COLUMNS)
+
+
+def load_broken_files(metadata_path=METADATA_CSV_PATH):
+    """메타데이터 표에서 디코딩할 수 없는 파일들을 {(폴더명, 파일명)} 집합으로 반환합니다."""
+    metadata_path = Path(metadata_path)
+    if not metadata_path.is_file():
+        return set()
+    df = pd.read_csv(metadata_path, encoding='utf-8-sig')
+    broken = df[~df['ok'].astype(bool)]
+    return set(zip(broken['folder'], broken['name']))
+
+
+def main():
+    if not IMAGES_DIR.is_dir():
+        print(f"❌ 오류: '{IMAGES_DIR}' 폴더를 찾을 수 없습니다. 경로를 확인해주세요.")
+        return
+
+    print(f"🔍 '{IMAGES_DIR.name}' 폴더를 {SCAN_WORKERS}개 스레드로 스캔합니다...")
+    start = time.perf_counter()
+    scan_results, (scanned, skipped) = scan_dataset(IMAGES_DIR)
+    print(f"✅ 스캔 완료 ({time.perf_counter() - start:.2f}초): {scanned}개 폴더 스캔, {skipped}개 폴더는 변경 없음(캐시 사용)")
+
+    if not scan_results:
+        print("\n⚠️ 스캔할 하위 폴더를 찾지 못했습니다.")
+        return
+
+    df = build_count_table(scan_results)
+    try:
+        # CSV 파일로 저장 (Excel에서 한글이 깨지지 않도록 'utf-8-sig' 인코딩 사용)
+        df.to_csv(CSV_SAVE_PATH, index=False, encoding='utf-8-sig')
+        print(f"\n✅ 결과가 '{CSV_SAVE_PATH.name}' 파일로 성공적으로 저장되었습니다.")
+        print("\n--- 결과 미리보기 (상위 5개) ---")
+        print(df.head().to_string(index=False))
+
+        if COLLECT_METADATA:
+            meta_df = build_metadata_table(scan_results)
+            meta_df.to_csv(METADATA_CSV_PATH, index=False, encoding='utf-8-sig')
+            broken = int((~meta_df['ok'].astype(bool)).sum())
+            print(f"\n✅ 파일별 메타데이터 {len(meta_df)}건을 '{METADATA_CSV_PATH.name}'에 저장했습니다. (디코딩 불가 {broken}개)")
+    except Exception as e:
+        print(f"\n❌ CSV 파일 저장 중 오류가 발생했습니다: {e}")
+
+
+if __name__ == '__main__':
+    main()
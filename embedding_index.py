@@ -0,0 +1,422 @@
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+from PIL import Image
+from inference_engine import (DEFAULT_IMGSZ, DEFAULT_BATCH_SIZE, DEFAULT_PREFETCH_BATCHES, DEFAULT_DECODE_WORKERS,
+                              iter_image_batches, list_class_images, load_and_resize, load_model, predict_batch)
+from prediction_cache import model_fingerprint, preprocess_key
+from file_lock import FileLock
+
+# --------------------------------------------------
+# ✅ 설정 부분
+# --------------------------------------------------
+# 사용 예)
+#   python embedding_index.py build                     : TRAIN_DATASET_PATH의 train 이미지로 색인 생성 (이미 넣은 이미지는 건너뜀)
+#   python embedding_index.py add <새 종 폴더>           : <폴더>/<종 이름>/*.jpg 를 색인에 추가 (재학습 없이 새 종 추가)
+#   python embedding_index.py query <이미지> [...]       : 분류기 + 색인 결합 top-5 출력
+#   python embedding_index.py evaluate [test 폴더]       : 분류기 / kNN / 중심점 / 결합 방식의 정확도 비교
+BASE_DIR = Path(__file__).resolve().parent
+MODEL_PATH = r"C:\Users\sega0\Desktop\code\runs\classify\test10\weights\best.pt"
+TRAIN_DATASET_PATH = BASE_DIR / "dataset" / "train"
+TEST_DATASET_PATH = BASE_DIR / "dataset" / "test"
+INDEX_DIR = BASE_DIR.parent / "embedding_index"
+
+IMGSZ = DEFAULT_IMGSZ
+BATCH_SIZE = DEFAULT_BATCH_SIZE
+PREFETCH_BATCHES = DEFAULT_PREFETCH_BATCHES
+DECODE_WORKERS = DEFAULT_DECODE_WORKERS
+
+KNN_K = 10                  # kNN 투표에 쓸 이웃 수
+CENTROID_TEMPERATURE = 0.05  # 중심점 코사인 유사도 -> 확률 변환 온도 (작을수록 뾰족)
+BLEND_WEIGHT = 0.5          # 결합 점수에서 색인 점수의 비중 (0: 분류기만, 1: 색인만)
+QUERY_METHOD = 'knn'        # 색인 점수 방식: 'knn' 또는 'centroid'
+# --------------------------------------------------
+
+INDEX_FORMAT_VERSION = 1
+QUERY_CHUNK_ROWS = 65536    # kNN 유사도 계산 시 한 번에 읽을 색인 행 수 (메모리 상한)
+METHODS = ('knn', 'centroid')
+
+
+class EmbeddingExtractor:
+    """
+    분류 head의 마지막 Linear 입력(직전 층 특징 벡터)을 forward pre-hook으로 가로챕니다.
+    한 번의 forward로 임베딩과 분류기 확률을 함께 얻으며, PyTorch(.pt) 모델에서만 사용할 수 있습니다.
+    """
+
+    def __init__(self, model):
+        # ultralytics는 첫 predict()에서 모델을 복사해 predictor에 두므로, 실제로 실행되는 복사본에 hook을 답니다.
+        if getattr(model, 'predictor', None) is None:
+            model.predict(Image.new("RGB", (IMGSZ, IMGSZ)), imgsz=IMGSZ, verbose=False)
+        backend = getattr(model.predictor.model, 'model', None)
+        head = getattr(backend, 'model', [None])[-1]
+        if not hasattr(head, 'linear'):
+            raise ValueError("임베딩 추출은 PyTorch(.pt) 분류 모델에서만 지원합니다.")
+        self.model = model
+        self._captured = []
+        self._handle = head.linear.register_forward_pre_hook(
+            lambda module, inputs: self._captured.append(inputs[0].detach().float().cpu().numpy()))
+        self.dim = head.linear.in_features
+
+    def embed(self, images, imgsz=IMGSZ):
+        """이미지 배치의 (L2 정규화된 임베딩 (N, D) float32, predict_batch() 결과 목록)을 반환합니다."""
+        self._captured.clear()
+        predictions = predict_batch(self.model, images, imgsz=imgsz)
+        if not predictions:
+            return np.zeros((0, self.dim), dtype=np.float32), predictions
+        emb = np.concatenate(self._captured, axis=0)
+        return normalize(emb), predictions
+
+    def close(self):
+        self._handle.remove()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def normalize(x):
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return (x / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+class EmbeddingIndex:
+    """
+    이미지 임베딩을 float16 행렬(embeddings.f16, memmap으로 읽음)에, 행별 (경로, 클래스)를 items.jsonl에 저장합니다.
+    prediction_cache와 같이 뒤에 덧붙이기만 하므로 중간에 멈춰도 기록된 행은 유지됩니다.
+    build/add를 여러 프로세스가 동시에 실행해도 되도록, add()는 폴더의 lock 파일을 잡고
+    다른 프로세스가 추가한 클래스와 항목을 먼저 읽은 뒤 덧붙입니다.
+    클래스 목록은 분류기 클래스로 시작해 새 종을 추가할 때마다 뒤에 늘어납니다.
+    """
+
+    def __init__(self, index_dir, model_path=None, dim=None, imgsz=IMGSZ, class_names=None):
+        self.dir = Path(index_dir)
+        meta_path = self.dir / 'meta.json'
+        if not meta_path.is_file() and dim is None:
+            raise FileNotFoundError(f"임베딩 색인이 없습니다: {self.dir} (먼저 build를 실행하세요)")
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._file_lock = FileLock(self.dir / 'write.lock')
+        with self._file_lock:
+            if meta_path.is_file():
+                self._load_meta()
+                if model_path is not None and self.meta['model_sha1'] != model_fingerprint(model_path):
+                    raise ValueError(f"'{self.dir}' 색인은 다른 모델({self.meta['model_path']})로 만들어졌습니다.")
+            else:
+                self.meta = {
+                    'version': INDEX_FORMAT_VERSION,
+                    'model_path': str(model_path),
+                    'model_sha1': model_fingerprint(model_path),
+                    'preprocess': preprocess_key(imgsz),
+                    'dim': int(dim),
+                    'classes': list(class_names or []),
+                }
+                self._save_meta()
+                self._load_meta()
+            self.dim = self.meta['dim']
+
+            self._emb_path = self.dir / 'embeddings.f16'
+            self._items_path = self.dir / 'items.jsonl'
+            self.paths = []
+            self.labels = np.zeros(0, dtype=np.int32)
+            self._known = set()
+            self._items_pos = 0  # items.jsonl에서 읽은 바이트 수
+            self._sync()
+        self._mm = None
+        self._centroids = None
+
+    def _load_meta(self):
+        with open(self.dir / 'meta.json', 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.class_names = self.meta['classes']
+        self._class_idx = {name: i for i, name in enumerate(self.class_names)}
+
+    def _sync(self):
+        """
+        lock을 잡은 상태에서, 아직 읽지 않은 items.jsonl 줄(다른 프로세스가 덧붙인 것)을 읽어 들입니다.
+        기록 중 종료돼 남은 끊긴 꼬리는 잘라냅니다. 두 파일을 min(임베딩 행 수, 온전한 줄 수)에 맞춰 잘라야
+        이후 add()가 행과 줄을 어긋나게 붙이지 않습니다. (lock 안에서는 쓰는 중인 다른 프로세스가 없음)
+        """
+        row_bytes = self.dim * 2
+        file_rows = (self._emb_path.stat().st_size // row_bytes) if self._emb_path.is_file() else 0
+        paths, labels = [], []
+        if self._items_path.is_file():
+            good_end = self._items_pos
+            with open(self._items_path, 'rb') as f:
+                f.seek(self._items_pos)
+                for line in f:
+                    if len(self.paths) + len(paths) >= file_rows or not line.endswith(b'\n'):
+                        break  # 임베딩 행이 없는 항목이거나 기록 중 끊긴 마지막 줄
+                    try:
+                        entry = json.loads(line)
+                        label = self._class_idx[entry['label']]
+                    except (json.JSONDecodeError, KeyError):
+                        break
+                    good_end += len(line)
+                    paths.append(entry['path'])
+                    labels.append(label)
+            if self._items_path.stat().st_size != good_end:
+                with open(self._items_path, 'r+b') as f:
+                    f.truncate(good_end)
+            self._items_pos = good_end
+        n_rows = len(self.paths) + len(paths)
+        if self._emb_path.is_file() and self._emb_path.stat().st_size != n_rows * row_bytes:
+            with open(self._emb_path, 'r+b') as f:
+                f.truncate(n_rows * row_bytes)
+        if paths:
+            self.paths.extend(paths)
+            self._known.update(paths)
+            self.labels = np.concatenate([self.labels, np.array(labels, dtype=np.int32)])
+            self._mm = None
+            self._centroids = None
+
+    def _save_meta(self):
+        tmp_path = self.dir / f'meta.json.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.dir / 'meta.json')
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, path):
+        return str(path) in self._known
+
+    def class_index(self, name):
+        """클래스 번호를 반환합니다. 처음 보는 클래스면 목록 끝에 추가합니다."""
+        if name not in self._class_idx:
+            with self._file_lock:
+                self._load_meta()  # 다른 프로세스가 먼저 추가한 클래스를 덮어쓰지 않도록
+                if name not in self._class_idx:
+                    self.meta['classes'].append(name)
+                    self._save_meta()
+                    self._load_meta()
+                self._centroids = None
+        return self._class_idx[name]
+
+    def add(self, paths, labels, embeddings):
+        """임베딩 (N, D)와 이미지별 경로/클래스 이름을 추가합니다. 이미 색인에 있는 경로는 건너뜁니다."""
+        if len(paths) == 0:
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float16).reshape(-1, self.dim)
+        with self._file_lock:
+            self._load_meta()
+            self._sync()
+            keep = [i for i, p in enumerate(paths) if str(p) not in self._known]
+            if not keep:
+                return
+            paths = [str(paths[i]) for i in keep]
+            labels = [labels[i] for i in keep]
+            label_idx = [self.class_index(label) for label in labels]
+            with open(self._emb_path, 'ab') as f:
+                f.write(embeddings[keep].tobytes())
+            with open(self._items_path, 'a', encoding='utf-8') as f:
+                for path, label in zip(paths, labels):
+                    f.write(json.dumps({'path': path, 'label': label}, ensure_ascii=False) + '\n')
+            self._items_pos = self._items_path.stat().st_size
+            self.paths.extend(paths)
+            self._known.update(paths)
+            self.labels = np.concatenate([self.labels, np.array(label_idx, dtype=np.int32)])
+        self._mm = None
+        self._centroids = None
+
+    def matrix(self):
+        if self._mm is None and len(self.paths):
+            self._mm = np.memmap(self._emb_path, dtype=np.float16, mode='r', shape=(len(self.paths), self.dim))
+        return self._mm
+
+    def centroids(self):
+        """클래스별 평균 임베딩(L2 정규화) (클래스 수, D). 이미지가 없는 클래스는 0 벡터입니다."""
+        if self._centroids is None:
+            sums = np.zeros((len(self.class_names), self.dim), dtype=np.float32)
+            X = self.matrix()
+            for start in range(0, len(self.paths), QUERY_CHUNK_ROWS):
+                np.add.at(sums, self.labels[start:start + QUERY_CHUNK_ROWS],
+                          np.asarray(X[start:start + QUERY_CHUNK_ROWS], dtype=np.float32))
+            self._centroids = normalize(sums) * (np.linalg.norm(sums, axis=1, keepdims=True) > 0)
+        return self._centroids
+
+    def knn(self, queries, k=KNN_K):
+        """코사인 유사도 기준 가장 가까운 k개의 (행 번호 (Q, k), 유사도 (Q, k))를 반환합니다."""
+        queries = np.asarray(queries, dtype=np.float32)
+        k = min(k, len(self.paths))
+        best_idx = np.zeros((len(queries), 0), dtype=np.int64)
+        best_sim = np.zeros((len(queries), 0), dtype=np.float32)
+        X = self.matrix()
+        # 색인을 조각으로 나눠 읽으며 조각마다 상위 k개만 유지 (색인 전체를 float32로 올리지 않음)
+        for start in range(0, len(self.paths), QUERY_CHUNK_ROWS):
+            sim = queries @ np.asarray(X[start:start + QUERY_CHUNK_ROWS], dtype=np.float32).T
+            kk = min(k, sim.shape[1])
+            top = np.argpartition(-sim, kk - 1, axis=1)[:, :kk]
+            best_idx = np.concatenate([best_idx, top + start], axis=1)
+            best_sim = np.concatenate([best_sim, np.take_along_axis(sim, top, axis=1)], axis=1)
+            if best_idx.shape[1] > k:
+                keep = np.argpartition(-best_sim, k - 1, axis=1)[:, :k]
+                best_idx = np.take_along_axis(best_idx, keep, axis=1)
+                best_sim = np.take_along_axis(best_sim, keep, axis=1)
+        order = np.argsort(-best_sim, axis=1)
+        return np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_sim, order, axis=1)
+
+    def class_scores(self, queries, method=QUERY_METHOD, k=KNN_K, temperature=CENTROID_TEMPERATURE):
+        """
+        질의 임베딩마다 색인 클래스별 점수 (Q, 클래스 수)를 계산합니다. 각 행의 합은 1입니다.
+        - 'knn': 가까운 k개 이웃의 유사도 가중 투표
+        - 'centroid': 클래스 중심점과의 코사인 유사도에 온도 softmax
+        """
+        n_classes = len(self.class_names)
+        if method == 'centroid':
+            sim = np.asarray(queries, dtype=np.float32) @ self.centroids().T / temperature
+            sim -= sim.max(axis=1, keepdims=True)
+            scores = np.exp(sim)
+        elif method == 'knn':
+            idx, sim = self.knn(queries, k)
+            votes = self.labels[idx]
+            scores = np.zeros((len(votes), n_classes), dtype=np.float32)
+            np.add.at(scores, (np.arange(len(votes))[:, None], votes), np.maximum(sim, 0))
+        else:
+            raise ValueError(f"알 수 없는 방식입니다: {method} (가능한 값: {METHODS})")
+        totals = scores.sum(axis=1, keepdims=True)
+        return np.divide(scores, totals, out=np.zeros_like(scores), where=totals > 0)
+
+    def close(self):
+        self._mm = None
+
+
+def blend_scores(index, head_probs, head_names, index_scores, blend=BLEND_WEIGHT):
+    """
+    분류기 확률 (Q, 모델 클래스 수)과 색인 점수 (Q, 색인 클래스 수)를 색인 클래스 순서로 맞춰 가중 평균합니다.
+    색인에만 있는 새 종은 분류기 확률이 0, 색인에 없는 모델 클래스는 목록 끝에 붙습니다.
+    (점수 (Q, 전체 클래스 수), 전체 클래스 이름 목록)을 반환합니다.
+    """
+    names = list(index.class_names) + [n for n in head_names if n not in set(index.class_names)]
+    pos = {name: i for i, name in enumerate(names)}
+    combined = np.zeros((len(head_probs), len(names)), dtype=np.float32)
+    combined[:, :index_scores.shape[1]] = blend * index_scores
+    combined[:, [pos[n] for n in head_names]] += (1 - blend) * np.asarray(head_probs, dtype=np.float32)
+    return combined, names
+
+
+def embed_folder(model, model_path, items, index_dir=INDEX_DIR, imgsz=IMGSZ, batch_size=BATCH_SIZE,
+                 prefetch_batches=PREFETCH_BATCHES, num_workers=DECODE_WORKERS):
+    """
+    (이미지 경로, 클래스 이름) 목록을 배치로 임베딩해 색인에 추가합니다. 이미 색인에 있는 경로는 건너뜁니다.
+    (색인, 새로 추가한 개수, 소요 시간)을 반환합니다.
+    """
+    with EmbeddingExtractor(model) as extractor:
+        try:
+            index = EmbeddingIndex(index_dir, model_path)
+        except FileNotFoundError:
+            head_names = [model.names[i] for i in range(len(model.names))]
+            index = EmbeddingIndex(index_dir, model_path, dim=extractor.dim, imgsz=imgsz, class_names=head_names)
+        label_of = {path: label for path, label in items}
+        todo = [path for path, _ in items if path not in index]
+        print(f"🧬 {len(items)}개 이미지 중 {len(items) - len(todo)}개는 이미 색인에 있고, {len(todo)}개를 임베딩합니다.")
+
+        start = time.perf_counter()
+        batches = iter_image_batches(todo, imgsz=imgsz, batch_size=batch_size,
+                                     prefetch_batches=prefetch_batches, num_workers=num_workers)
+        added = 0
+        for paths, images, errors in batches:
+            for path, err in errors:
+                print(f"  - 파일: {Path(path).name} | ⚠️ 이미지 디코딩 중 오류 발생: {err}")
+            emb, _ = extractor.embed(images, imgsz=imgsz)
+            index.add(paths, [label_of[p] for p in paths], emb)
+            added += len(paths)
+        return index, added, time.perf_counter() - start
+
+
+def query_images(model, index, images, method=QUERY_METHOD, blend=BLEND_WEIGHT, imgsz=IMGSZ):
+    """이미지 배치를 분류기와 색인으로 함께 예측해 (결합 점수, 클래스 이름 목록, 분류기 확률, 색인 점수)를 반환합니다."""
+    head_names = [model.names[i] for i in range(len(model.names))]
+    with EmbeddingExtractor(model) as extractor:
+        emb, predictions = extractor.embed(images, imgsz=imgsz)
+    head_probs = np.stack([pred['probs'] for pred in predictions]) if predictions else np.zeros((0, len(head_names)))
+    index_scores = index.class_scores(emb, method)
+    combined, names = blend_scores(index, head_probs, head_names, index_scores, blend)
+    return combined, names, head_probs, index_scores
+
+
+def evaluate(model, index, items, imgsz=IMGSZ, batch_size=BATCH_SIZE):
+    """test 이미지로 분류기 / kNN / 중심점 / 결합 점수의 top-1, top-5 정확도를 비교합니다."""
+    head_names = [model.names[i] for i in range(len(model.names))]
+    label_of = dict(items)
+    results = {name: [] for name in ('분류기', 'kNN', '중심점', f'결합({QUERY_METHOD}, {BLEND_WEIGHT})')}
+    true_names = []
+    with EmbeddingExtractor(model) as extractor:
+        for paths, images, _ in iter_image_batches([p for p, _ in items], imgsz=imgsz, batch_size=batch_size):
+            emb, predictions = extractor.embed(images, imgsz=imgsz)
+            head_probs = np.stack([pred['probs'] for pred in predictions])
+            knn = index.class_scores(emb, 'knn')
+            centroid = index.class_scores(emb, 'centroid')
+            combined, names = blend_scores(index, head_probs, head_names,
+                                           knn if QUERY_METHOD == 'knn' else centroid, BLEND_WEIGHT)
+            for key, scores, score_names in zip(results, (head_probs, knn, centroid, combined),
+                                                (head_names, index.class_names, index.class_names, names)):
+                top = np.argsort(-scores, axis=1)[:, :5]
+                results[key].append(np.array(score_names, dtype=object)[top])
+            true_names.extend(label_of[p] for p in paths)
+
+    true_names = np.array(true_names, dtype=object)
+    for key, chunks in results.items():
+        top_names = np.concatenate(chunks) if chunks else np.zeros((0, 5), dtype=object)
+        # 클래스 이름으로 비교 (분류기와 색인의 클래스 번호 체계가 다르므로)
+        hit = top_names == true_names[:, None]
+        top1 = hit[:, 0].mean() * 100 if len(hit) else 0.0
+        top5 = hit.any(axis=1).mean() * 100 if len(hit) else 0.0
+        print(f" - {key}: Top-1 {top1:.2f}% | Top-5 {top5:.2f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="분류기 임베딩 색인으로 kNN/중심점 종 검색 (재학습 없이 새 종 추가)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build', help="TRAIN_DATASET_PATH의 train 이미지로 색인 생성/갱신")
+    add = sub.add_parser('add', help="<폴더>/<종 이름>/*.jpg 를 색인에 추가")
+    add.add_argument('folder')
+    query = sub.add_parser('query', help="이미지의 결합 top-5 예측")
+    query.add_argument('images', nargs='+')
+    query.add_argument('--method', choices=METHODS, default=QUERY_METHOD)
+    query.add_argument('--blend', type=float, default=BLEND_WEIGHT)
+    ev = sub.add_parser('evaluate', help="test 폴더로 방식별 정확도 비교")
+    ev.add_argument('test_dir', nargs='?', default=str(TEST_DATASET_PATH))
+    args = parser.parse_args()
+
+    model_path = Path(MODEL_PATH)
+    if not model_path.exists():
+        print(f"❌ 오류: 모델 파일을 찾을 수 없습니다: {model_path}")
+        return
+    model = load_model(model_path)
+
+    if args.command in ('build', 'add'):
+        folder = Path(TRAIN_DATASET_PATH if args.command == 'build' else args.folder)
+        if not folder.is_dir():
+            print(f"❌ 오류: 이미지 폴더를 찾을 수 없습니다: {folder}")
+            return
+        index, added, seconds = embed_folder(model, model_path, list_class_images(folder))
+        rate = f" ({added / seconds:.1f} images/sec)" if added and seconds > 0 else ""
+        print(f"✅ {added}개 추가{rate}. 색인: {len(index)}개 이미지, {len(index.class_names)}개 클래스 -> {INDEX_DIR}")
+        return
+
+    try:
+        index = EmbeddingIndex(INDEX_DIR, model_path)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ 오류: {e}")
+        return
+
+    if args.command == 'query':
+        images = [load_and_resize(p, IMGSZ) for p in args.images]
+        combined, names, _, _ = query_images(model, index, images, args.method, args.blend)
+        for path, scores in zip(args.images, combined):
+            print(f"\n📷 {Path(path).name} (색인 {args.method}, 비중 {args.blend})")
+            for rank, i in enumerate(np.argsort(-scores)[:5], 1):
+                print(f"  {rank}. {names[i]} ({scores[i] * 100:.1f}%)")
+    else:
+        items = list_class_images(args.test_dir)
+        print(f"📊 {len(items)}개 test 이미지로 비교합니다. (색인 {len(index)}개 이미지, {len(index.class_names)}개 클래스)")
+        evaluate(model, index, items)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,139 +1,285 @@
-import os
-from ultralytics import YOLO
+import time
 from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont 
-import pandas as pd
+from PIL import ImageFont
+from inference_engine import iter_image_batches, predict_batch, list_class_images, load_model, evaluate_top1, ThroughputMeter
+from overlay_renderer import OverlayRenderer
+from shard_dataset import ShardReader
+from metrics_engine import compute_report, save_metrics, top_confusions
+from prediction_cache import PredictionCache, topk_from_probs, CACHE_ROOT
+from result_stream import ResultStreamWriter, record_id, summarize_stream
+from startup_timing import StartupTimer, import_ml_backend
 
 # --------------------------------------------------
 # ✅ 사용자가 수정해야 할 부분
 # --------------------------------------------------
+# (.pt 대신 export_model.py로 내보낸 best.onnx 또는 best_openvino_model 폴더도 지정할 수 있습니다)
 MODEL_PATH = r"C:\Users\sega0\Desktop\code\runs\classify\test10\weights\best.pt"
 TEST_DATASET_PATH = r"C:\Users\sega0\Desktop\code\try\dataset\test"
 RESULTS_SAVE_PATH = Path(MODEL_PATH).parent.parent
 VISUALIZED_IMAGES_SAVE_DIR = RESULTS_SAVE_PATH / "visualized_predictions"
 FONT_PATH = "C:/Windows/Fonts/malgunbd.ttf"
+# (선택) shard_dataset.py로 만든 test 샤드 폴더. 지정하면 TEST_DATASET_PATH 대신 샤드에서 이미지를 읽습니다.
+SHARD_TEST_PATH = None  # 예: r"C:\Users\sega0\Desktop\code\try\dataset_shards\test"
+# (선택) MODEL_PATH에 내보낸 모델을 지정한 경우, 원본 .pt 경로를 넣으면 정확도 차이와 속도 향상을 함께 출력
+BASELINE_MODEL_PATH = None
+
+# ✨ 배치 추론 옵션 (BATCH_SIZE=1, PREFETCH_BATCHES=0 이면 기존처럼 한 장씩 순차 예측)
+IMGSZ = 384             # 모델 입력 크기 (학습 시 imgsz와 동일하게)
+BATCH_SIZE = 32         # 한 번에 예측할 이미지 수
+PREFETCH_BATCHES = 2    # 백그라운드에서 미리 디코딩해 둘 배치 수
+DECODE_WORKERS = 4      # 디코딩/리사이즈에 사용할 스레드 수
+
+# ✨ 예측 캐시: 모델과 이미지 내용이 같으면 이전 실행의 예측 확률을 재사용하고, 캐시에 없는 이미지만 예측
+USE_PREDICTION_CACHE = True
+PREDICTION_CACHE_DIR = CACHE_ROOT
+
+# ✨ 시각화 옵션 ('none': 저장 안 함, 'errors': 오답만 저장, 'all': 전부 저장)
+RENDER_MODE = 'all'
+RENDER_MAX_SIZE = 1024      # 저장 이미지의 긴 변 최대 크기 (None이면 원본 크기)
+RENDER_JPEG_QUALITY = 85
+RENDER_WORKERS = 4          # 시각화 전용 프로세스 수
+
+# ✨ 지표 옵션 (혼동 행렬, top-5 정확도, 클래스별 정밀도/재현율/F1, 신뢰도 보정을 .npz로 저장)
+METRICS_SAVE_PATH = RESULTS_SAVE_PATH / 'prediction_metrics.npz'
+CALIBRATION_BINS = 15
+TOP_CONFUSIONS = 10         # 출력할 '가장 많이 헷갈린 클래스 쌍' 개수
+
+# ✨ 이미지별 결과를 예측하는 즉시 JSONL 파일에 기록 (요약표와 지표는 마지막에 이 파일에서 계산)
+RESULTS_STREAM_PATH = RESULTS_SAVE_PATH / 'prediction_results.jsonl'
+RESUME = True               # 같은 모델/설정으로 기록된 결과가 있으면 이미 기록된 이미지는 건너뛰고 이어서 평가
+RESULTS_FLUSH_EVERY = 256   # 이만큼 기록할 때마다 디스크에 flush (중단돼도 그때까지의 결과는 보존)
 # --------------------------------------------------
 
+def print_summary(df, collector, class_names):
+    """
+    클래스별 요약표를 정확도 순으로 출력하고, 전체 지표를 계산해 METRICS_SAVE_PATH에 저장합니다.
+    (정렬된 요약표, 전체 정확도)를 반환합니다. evaluation_sharded.py의 병합 단계도 같은 함수를 씁니다.
+    """
+    total_images = int(df['총 이미지 수'].sum())
+    total_correct = int(df['정답 수'].sum())
+
+    print(f"\n\n{'='*60}\n🏆 최종 예측 결과 요약\n{'='*60}")
+    df = df.sort_values(by='정확도 (%)', ascending=False)
+    print(df.to_string(index=False))
+
+    overall_accuracy = (total_correct / total_images * 100) if total_images > 0 else 0
+    print(f"\n\n📊 전체 정확도: {total_images}개 중 {total_correct}개 정답 ({overall_accuracy:.2f}%)")
+
+    true_idx, topk_idx, topk_conf = collector.arrays()
+    report = compute_report(true_idx, topk_idx, topk_conf, len(class_names), n_bins=CALIBRATION_BINS)
+    print(f" - Top-5 정확도: {report['top5_accuracy']:.2f}% | Macro F1: {report['macro_f1']:.2f}% "
+          f"| 보정 오차(ECE): {report['calibration']['ece'] * 100:.2f}%")
+    confusions = top_confusions(report['confusion_matrix'], TOP_CONFUSIONS)
+    if confusions:
+        print(f" - 가장 많이 헷갈린 클래스 쌍 (정답 → 예측):")
+        for true_i, pred_i, count in confusions:
+            print(f"    {class_names[true_i]} → {class_names[pred_i]}: {count}개")
+    try:
+        save_metrics(METRICS_SAVE_PATH, true_idx, topk_idx, topk_conf, report, class_names)
+        print(f" - 💾 예측 배열과 지표 저장: {METRICS_SAVE_PATH}")
+    except Exception as e:
+        print(f" - ❌ 지표 파일 저장 중 오류가 발생했습니다: {e}")
+    return df, overall_accuracy
+
+
+def save_summary_csv(df, csv_save_path):
+    """요약표와 마지막 줄의 전체 정확도를 prediction_summary.csv 형식으로 저장합니다."""
+    total_images = int(df['총 이미지 수'].sum())
+    total_correct = int(df['정답 수'].sum())
+    overall_accuracy = (total_correct / total_images * 100) if total_images > 0 else 0
+    try:
+        df.to_csv(csv_save_path, index=False, encoding='utf-8-sig')
+        if total_images > 0:
+            with open(csv_save_path, 'a',encoding='utf-8-sig',newline="") as f: 
+                f.write('\n')
+                summary_line=f"\n전체 정확도,{total_images}개중,{total_correct}개 정답,{overall_accuracy:.2f}%\n"
+                f.write(summary_line)
+        print(f"\n\n💾 결과가 CSV 파일로 성공적으로 저장되었습니다.")
+        print(f"  -> 저장 위치: {csv_save_path}")
+    except Exception as e:
+        print(f"\n\n❌ CSV 파일 저장 중 오류가 발생했습니다: {e}")
+
+
 def main():
     model_path = Path(MODEL_PATH)
     test_path = Path(TEST_DATASET_PATH)
 
-    try:
-        VISUALIZED_IMAGES_SAVE_DIR.mkdir(parents=True, exist_ok=True)
-        print(f"✨ 시각화된 이미지를 저장할 폴더가 생성 또는 확인되었습니다:\n  -> {VISUALIZED_IMAGES_SAVE_DIR}")
-    except Exception as e:
-        print(f"❌ 오류: 이미지 저장 폴더 생성에 실패했습니다. 경로를 확인하거나 다른 경로를 지정해 주세요: {e}")
-        return
+    if RENDER_MODE != 'none':
+        try:
+            VISUALIZED_IMAGES_SAVE_DIR.mkdir(parents=True, exist_ok=True)
+            print(f"✨ 시각화된 이미지를 저장할 폴더가 생성 또는 확인되었습니다:\n  -> {VISUALIZED_IMAGES_SAVE_DIR}")
+        except Exception as e:
+            print(f"❌ 오류: 이미지 저장 폴더 생성에 실패했습니다. 경로를 확인하거나 다른 경로를 지정해 주세요: {e}")
+            return
 
-    if not model_path.exists() or not test_path.exists():
+    if not model_path.exists() or not (test_path.exists() or SHARD_TEST_PATH):
         print(f"❌ 오류: 모델 또는 테스트 데이터셋 폴더를 찾을 수 없습니다. 경로를 확인해주세요.")
         return
     
+    timer = StartupTimer('evaluation')
     print(f"모델을 로드합니다: {model_path.name}")
-    model = YOLO(model_path)
+    with timer.stage('import'):
+        import_ml_backend()
+    with timer.stage('model_load'):
+        model = load_model(model_path)
     print("✅ 모델 로드 완료.")
 
-    total_images = 0
-    total_correct = 0
-    results_data = []
-
     try:
-        font = ImageFont.truetype(FONT_PATH, 20) 
-        small_font = ImageFont.truetype(FONT_PATH, 16)
+        ImageFont.truetype(FONT_PATH, 16)
     except IOError:
         print(f"⚠️ 경고: 폰트를 로드할 수 없습니다. 기본 폰트가 사용됩니다: {FONT_PATH}")
-        font = ImageFont.load_default()
-        small_font = ImageFont.load_default()
 
-    class_dirs = [d for d in test_path.iterdir() if d.is_dir()]
-    for class_dir in class_dirs:
-        true_label = class_dir.name
-        print(f"\n{'='*50}\n📂 클래스 '{true_label}'의 이미지 예측을 시작합니다.\n{'='*50}")
+    renderer = OverlayRenderer(
+        mode=RENDER_MODE,
+        font_path=FONT_PATH,
+        font_size=16,
+        max_size=RENDER_MAX_SIZE,
+        jpeg_quality=RENDER_JPEG_QUALITY,
+        num_workers=RENDER_WORKERS,
+    )
+
+    # 예측 도중 오류가 나도 렌더링 프로세스 풀과 디스패처 스레드가 남지 않도록 반드시 닫음 (close는 여러 번 불러도 됨)
+    try:
+        # ✨ 클래스 순서대로 정렬된 (이미지, 라벨) 목록을 만들어 배치 단위로 예측
+        if SHARD_TEST_PATH:
+            shard_reader = ShardReader(SHARD_TEST_PATH)
+            test_items = shard_reader.items()
+            all_classes = shard_reader.classes
+            print(f"샤드에서 테스트 이미지를 읽습니다: {SHARD_TEST_PATH}")
+        else:
+            test_items = list_class_images(test_path)
+            all_classes = sorted(d.name for d in test_path.iterdir() if d.is_dir())
+        print(f"총 {len(test_items)}개의 테스트 이미지를 배치 크기 {BATCH_SIZE}, 미리 읽기 {PREFETCH_BATCHES}배치로 예측합니다.")
+
+        meter = ThroughputMeter()
+        class_names = [model.names[i] for i in range(len(model.names))]
+        cache = PredictionCache(model_path, len(class_names), IMGSZ, class_names=class_names,
+                                cache_root=PREDICTION_CACHE_DIR if USE_PREDICTION_CACHE else None)
+
+        # ✨ 결과 기록 파일: 같은 모델/전처리/테스트 경로로 기록된 파일이 있으면 이어서 씀
+        stream_meta = {'model_sha1': cache.model_sha1, 'preprocess': cache.preprocess,
+                       'test': str(SHARD_TEST_PATH or TEST_DATASET_PATH)}
+        writer = ResultStreamWriter(RESULTS_STREAM_PATH, stream_meta, resume=RESUME, flush_every=RESULTS_FLUSH_EVERY)
+        all_ids = {record_id(path, label) for path, label in test_items}
+        pending_items = [(path, label) for path, label in test_items if record_id(path, label) not in writer]
+        if writer.resumed:
+            print(f"⏩ 이어서 평가: {len(test_items) - len(pending_items)}개 이미지는 이미 기록되어 건너뜁니다. ({RESULTS_STREAM_PATH.name})")
 
-        class_total = 0
-        class_correct = 0
+        current_label = None
 
-        for image_path in class_dir.glob('*.*'):
-            if image_path.suffix.lower() not in ['.jpg', '.jpeg', '.png']:
-                continue
+        def write_results(items):
+            """캐시된 확률에서 결과를 읽어 한 장씩 기록 파일에 덧붙이고 시각화를 맡깁니다."""
+            nonlocal current_label
+            for image_path, true_label in items:
+                probs = cache.get(image_keys[image_path])
+                if probs is None:
+                    continue  # 디코딩/예측에 실패한 이미지 (위에서 오류 출력)
+                pred = topk_from_probs(probs, 5)
 
-            try:
-                results = model.predict(image_path, verbose=False)
-                result = results[0]
-                
-                # ✨ 수정된 부분: topk() 대신 top5와 top5conf 속성 사용
-                pred_label = model.names[result.probs.top1]
-                pred_confidence = result.probs.top1conf.item()
+                if true_label != current_label:
+                    current_label = true_label
+                    print(f"\n{'='*50}\n📂 클래스 '{true_label}'의 이미지 예측을 시작합니다.\n{'='*50}")
 
+                pred_label = model.names[pred['top1']]
+                pred_confidence = pred['top1conf']
                 is_correct = (true_label == pred_label)
-                if is_correct:
-                    class_correct += 1
-                    total_correct += 1
-                
-                class_total += 1
-                total_images += 1
-                
+                writer.write(record_id(image_path, true_label), true_label, pred_label, pred, is_correct)
+
                 print(f"  - 파일: {image_path.name} | 예측: '{pred_label}' | 신뢰도: {pred_confidence*100:.2f}% | 결과: {'✅ 정답' if is_correct else '❌ 오답'}")
 
-                try:
-                    img = Image.open(image_path).convert("RGB")
-                    draw = ImageDraw.Draw(img)
-                    
-                    # ✨ 수정된 부분: topk() 대신 top5와 top5conf 속성을 결합하여 사용
-                    top5_indices = result.probs.top5
-                    top5_confs = result.probs.top5conf
-                    
-                    text_lines = [f"{model.names[idx]} {conf.item():.2f}" for idx, conf in zip(top5_indices, top5_confs)]
-                    
-                    text_height_per_line = small_font.getbbox("Tg")[3] - small_font.getbbox("Tg")[1]
-                    total_text_height = len(text_lines) * (text_height_per_line + 2)
-                    
-                    box_start_x, box_start_y = 10, 10
-                    box_end_x = box_start_x + 250
-                    box_end_y = box_start_y + total_text_height + 10
-                    
-                    draw.rectangle([box_start_x, box_start_y, box_end_x, box_end_y], fill=(0, 0, 0, 128))
-
-                    y_offset = box_start_y + 5
-                    for i, (idx, conf) in enumerate(zip(top5_indices, top5_confs)):
-                        text_to_draw = f"{model.names[idx]} {conf.item():.2f}"
-                        text_color = "red" if model.names[idx] == true_label else "white"
-                        draw.text((box_start_x + 5, y_offset), text_to_draw, font=small_font, fill=text_color)
-                        y_offset += (text_height_per_line + 2)
-
-                    save_path = VISUALIZED_IMAGES_SAVE_DIR / f"{true_label}_{image_path.name}"
-                    print(f"    - 이미지를 다음 경로에 저장합니다:\n      -> {save_path}")
-                    img.save(save_path)
-                except Exception as img_e:
-                    print(f"    - 파일: {image_path.name} | ⚠️ 이미지 시각화/저장 중 오류 발생: {img_e}")
-                    
-            except Exception as e:
-                print(f"  - 파일: {image_path.name} | ⚠️ 예측 중 오류 발생: {e}")
-
-        class_accuracy = (class_correct / class_total * 100) if class_total > 0 else 0
-        print(f"\n👉 '{true_label}' 클래스 예측 완료: {class_total}개 중 {class_correct}개 정답 (정확도: {class_accuracy:.2f}%)")
-        results_data.append([true_label, class_total, class_correct, class_accuracy])
+                # ✨ 시각화는 별도 렌더링 프로세스에 맡기고 바로 다음 예측으로 진행
+                text_lines = [(f"{model.names[idx]} {conf:.2f}", "red" if model.names[idx] == true_label else "white")
+                              for idx, conf in zip(pred['top5'], pred['top5conf'])]
+                save_path = VISUALIZED_IMAGES_SAVE_DIR / f"{true_label}_{image_path.name}"
+                renderer.submit(image_path, save_path, text_lines, is_correct)
 
-    print(f"\n\n{'='*60}\n🏆 최종 예측 결과 요약\n{'='*60}")
-    df = pd.DataFrame(results_data, columns=['클래스', '총 이미지 수', '정답 수', '정확도 (%)'])
-    df = df.sort_values(by='정확도 (%)', ascending=False)
-    print(df.to_string(index=False))
+        # 캐시를 임시 폴더에 만든 경우(USE_PREDICTION_CACHE=False) 오류가 나도 닫아서 지워야 함
+        try:
+            image_keys = dict(zip([path for path, _ in pending_items],
+                                  cache.image_keys([path for path, _ in pending_items], workers=DECODE_WORKERS)))
+            position = {path: i for i, (path, _) in enumerate(pending_items)}
+            miss_paths, seen = [], set()
+            for path, key in image_keys.items():
+                if key not in cache and key not in seen:
+                    seen.add(key)
+                    miss_paths.append(path)
+            if USE_PREDICTION_CACHE:
+                print(f"🗃️ 예측 캐시: {len(pending_items) - len(miss_paths)}개 재사용, {len(miss_paths)}개 새로 예측")
 
-    overall_accuracy = (total_correct / total_images * 100) if total_images > 0 else 0
-    print(f"\n\n📊 전체 정확도: {total_images}개 중 {total_correct}개 정답 ({overall_accuracy:.2f}%)")
+            # ✨ 캐시에 없는 이미지만 배치 단위로 예측해 캐시에 기록하고, 배치가 끝날 때마다
+            #    그 배치까지의 결과(중간의 캐시 재사용 이미지 포함)를 클래스 순서대로 바로 기록 파일에 덧붙임
+            batches = iter_image_batches(
+                miss_paths,
+                imgsz=IMGSZ,
+                batch_size=BATCH_SIZE,
+                prefetch_batches=PREFETCH_BATCHES,
+                num_workers=DECODE_WORKERS,
+            )
+            written = 0
+            with writer:
+                for paths, images, errors in batches:
+                    for image_path, err in errors:
+                        print(f"  - 파일: {image_path.name} | ⚠️ 이미지 디코딩 중 오류 발생: {err}")
+                    batch_end = max(position[p] for p in list(paths) + [p for p, _ in errors]) + 1
 
-    csv_save_path = RESULTS_SAVE_PATH / 'prediction_summary.csv'
-    try:
-        df.to_csv(csv_save_path, index=False, encoding='utf-8-sig')
-        if total_images > 0:
-            with open(csv_save_path, 'a',encoding='utf-8-sig',newline="") as f: 
-                f.write('\n')
-                summary_line=f"\n전체 정확도,{total_images}개중,{total_correct}개 정답,{overall_accuracy:.2f}%\n"
-                f.write(summary_line)
-        print(f"\n\n💾 결과가 CSV 파일로 성공적으로 저장되었습니다.")
-        print(f"  -> 저장 위치: {csv_save_path}")
-    except Exception as e:
-        print(f"\n\n❌ CSV 파일 저장 중 오류가 발생했습니다: {e}")
+                    try:
+                        if 'first_inference' in timer.stages:
+                            predictions = predict_batch(model, images, imgsz=IMGSZ)
+                        else:
+                            with timer.stage('first_inference'):  # 첫 배치는 초기화 비용이 포함됨
+                                predictions = predict_batch(model, images, imgsz=IMGSZ)
+                    except Exception as e:
+                        print(f"  - ⚠️ 배치 예측 중 오류 발생 ({len(paths)}개 이미지 건너뜀): {e}")
+                        predictions = []
+                    meter.update(len(predictions))
+                    if predictions:
+                        cache.put([image_keys[p] for p in paths], [pred['probs'] for pred in predictions])
+                    write_results(pending_items[written:batch_end])
+                    written = batch_end
+                meter.stop()
+                write_results(pending_items[written:])
+        finally:
+            cache.close()
+
+        # ✨ 클래스별/전체 요약은 기록 파일에서 계산 (이어서 평가한 경우 이전 실행의 결과도 포함)
+        df, collector = summarize_stream(RESULTS_STREAM_PATH, class_names, all_classes, keep_ids=all_ids)
+        for label, class_total, class_correct, class_accuracy in df.itertuples(index=False):
+            print(f"\n👉 '{label}' 클래스 예측 완료: {class_total}개 중 {class_correct}개 정답 (정확도: {class_accuracy:.2f}%)")
+
+        if meter.count:
+            print(f"\n⚡ 처리 속도: {meter.count}개 이미지 / {meter.elapsed:.1f}초 ({meter.images_per_sec:.2f} images/sec)")
+        else:
+            print(f"\n⚡ 새로 추론한 이미지가 없습니다 (예측 캐시 또는 이전 기록 사용).")
+        print(timer.report())
+        timer.save()
+
+        render_wait_start = time.perf_counter()
+        renderer.close()
+        if RENDER_MODE != 'none':
+            print(f"\n🖼️ 시각화 이미지 {renderer.rendered}개 저장 완료 (추론 종료 후 대기 {time.perf_counter() - render_wait_start:.1f}초)")
+            for image_path, err in renderer.failed:
+                print(f"    - 파일: {image_path.name} | ⚠️ 이미지 시각화/저장 중 오류 발생: {err}")
+    finally:
+        renderer.close()
+
+    df, _ = print_summary(df, collector, class_names)
+
+    if BASELINE_MODEL_PATH:
+        # 위의 처리 속도는 캐시/해시/첫 배치가 섞여 있으므로, 두 모델 모두 evaluate_top1()로 같은 조건에서 다시 측정
+        print(f"\n🔁 기준 모델 '{Path(BASELINE_MODEL_PATH).name}'과(와) 같은 조건으로 비교합니다... ({len(test_items)}개 이미지)")
+        compare_kwargs = dict(imgsz=IMGSZ, batch_size=BATCH_SIZE, prefetch_batches=PREFETCH_BATCHES,
+                              num_workers=DECODE_WORKERS)
+        current = evaluate_top1(model, test_items, **compare_kwargs)
+        baseline = evaluate_top1(load_model(BASELINE_MODEL_PATH), test_items, **compare_kwargs)
+        print(f" - 정확도 차이: {current['top1_accuracy'] - baseline['top1_accuracy']:+.2f}%p "
+              f"(기준 {baseline['top1_accuracy']:.2f}% → 현재 {current['top1_accuracy']:.2f}%)")
+        if baseline['images_per_sec'] > 0 and current['images_per_sec'] > 0:
+            speedup = current['images_per_sec'] / baseline['images_per_sec']
+            print(f" - 속도 향상: {speedup:.2f}배 (기준 {baseline['images_per_sec']:.2f} → 현재 {current['images_per_sec']:.2f} images/sec)")
+        else:
+            print(f" - 속도 비교: 첫 배치(워밍업)를 제외하면 측정할 배치가 없습니다 (테스트 이미지를 BATCH_SIZE보다 많이 준비하세요)")
+
+    save_summary_csv(df, RESULTS_SAVE_PATH / 'prediction_summary.csv')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
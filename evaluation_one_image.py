@@ -1,13 +1,15 @@
 import os
-from ultralytics import YOLO
 from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont 
-import pandas as pd
+from PIL import ImageDraw, ImageFont 
+from inference_engine import load_for_display, load_model, DEFAULT_DISPLAY_SIZE
+from prediction_cache import predict_image_cached
+from startup_timing import StartupTimer, import_ml_backend
 
 # --------------------------------------------------
 # ✅ 사용자가 수정해야 할 부분
 # --------------------------------------------------
 # 1. 학습된 모델(.pt 파일)의 전체 경로
+#    (export_model.py로 내보낸 best.onnx 또는 best_openvino_model 폴더도 사용 가능)
 MODEL_PATH = r"C:\Users\sega0\Desktop\code\runs\classify\test10\weights\best.pt"
 
 # 2. ✨ [가장 중요] 예측하고 싶은 '이미지 파일 하나'의 전체 경로
@@ -18,6 +20,9 @@ RESULTS_SAVE_PATH = Path(MODEL_PATH).parent.parent
 
 # 4. (선택) 텍스트 표시에 사용할 폰트 경로
 FONT_PATH = "C:/Windows/Fonts/malgunbd.ttf"
+
+# 5. (선택) 저장할 시각화 이미지의 긴 변 최대 크기 (None이면 원본 크기로 디코딩/저장)
+VISUALIZE_MAX_SIZE = DEFAULT_DISPLAY_SIZE
 # --------------------------------------------------
 
 
@@ -32,15 +37,19 @@ def predict_single_image():
     visualized_save_dir.mkdir(parents=True, exist_ok=True)
     
     # 모델 또는 이미지 파일이 존재하는지 확인
-    if not model_path.is_file():
+    if not model_path.exists():
         print(f"❌ 오류: 모델 파일을 찾을 수 없습니다. 경로를 확인해주세요:\n -> {model_path}")
         return
     if not image_path.is_file():
         print(f"❌ 오류: 이미지 파일을 찾을 수 없습니다. 경로를 확인해주세요:\n -> {image_path}")
         return
         
+    timer = StartupTimer('evaluation_one_image')
     print(f"모델을 로드합니다: {model_path.name}")
-    model = YOLO(model_path)
+    with timer.stage('import'):
+        import_ml_backend()
+    with timer.stage('model_load'):
+        model = load_model(model_path)
     print("✅ 모델 로드 완료.")
 
     # 실제 라벨을 이미지의 부모 폴더 이름으로 간주
@@ -55,14 +64,21 @@ def predict_single_image():
 
     print(f"\n{'='*50}\n▶ '{image_path.name}' 파일 예측 시작...\n{'='*50}")
 
+    from_cache = False
     try:
-        # 단일 이미지 예측
-        results = model.predict(image_path, verbose=False)
-        result = results[0]
+        # 이미지는 한 번만 디코딩해 모델 입력과 시각화에 함께 사용
+        with timer.stage('decode'):
+            model_input, img = load_for_display(image_path, display_size=VISUALIZE_MAX_SIZE)
+
+        # 단일 이미지 예측 (같은 모델/이미지의 예측이 캐시에 있으면 재사용)
+        with timer.stage('first_inference'):
+            pred, from_cache = predict_image_cached(model, model_path, image_path, image=model_input)
+        if from_cache:
+            print(" -> 🗃️ 캐시된 예측 결과를 사용합니다.")
         
         # Top-1 예측 결과
-        pred_label = model.names[result.probs.top1]
-        pred_confidence = result.probs.top1conf.item()
+        pred_label = model.names[pred['top1']]
+        pred_confidence = pred['top1conf']
         is_correct = (true_label == pred_label)
         
         print(f" -> 예측 클래스: '{pred_label}'")
@@ -70,16 +86,15 @@ def predict_single_image():
         print(f" -> 결과: {'✅ 정답' if is_correct else '❌ 오답'}")
 
         # Top-5 예측 결과 시각화
-        img = Image.open(image_path).convert("RGB")
         draw = ImageDraw.Draw(img)
         
-        top5_indices = result.probs.top5
-        top5_confs = result.probs.top5conf
+        top5_indices = pred['top5']
+        top5_confs = pred['top5conf']
         
         box_y = 10
         for i, (idx, conf) in enumerate(zip(top5_indices, top5_confs)):
             class_name = model.names[idx]
-            text = f"{i+1}. {class_name} ({conf.item()*100:.1f}%)"
+            text = f"{i+1}. {class_name} ({conf*100:.1f}%)"
             
             # 실제 라벨과 일치하는 예측은 빨간색으로 표시
             text_color = "red" if class_name == true_label else "white"
@@ -99,6 +114,9 @@ def predict_single_image():
     except Exception as e:
         print(f"❌ 예측 또는 시각화 중 오류가 발생했습니다: {e}")
 
+    print(f"\n{timer.report()}{' (예측 캐시 사용)' if from_cache else ''}")
+    timer.save()
+
 
 if __name__ == '__main__':
     predict_single_image()
\ No newline at end of file
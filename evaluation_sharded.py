@@ -0,0 +1,208 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import subprocess
+from pathlib import Path
+import numpy as np
+import evaluation as ev
+from inference_engine import iter_image_batches, list_class_images, load_model, predict_batch, ThroughputMeter
+from prediction_cache import model_fingerprint, preprocess_key, topk_from_probs
+from result_stream import ResultStreamWriter, record_id, iter_records, read_stream_info, summarize_stream
+from shard_dataset import ShardReader
+from startup_timing import StartupTimer, import_ml_backend
+
+# --------------------------------------------------
+# ✅ 설정 부분 (모델/테스트 경로, 배치 크기 등은 evaluation.py의 설정을 그대로 사용)
+# --------------------------------------------------
+# 사용 예)
+#   python evaluation_sharded.py run --workers 4             : 한 컴퓨터에서 4개 프로세스로 나눠 평가한 뒤 병합
+#   python evaluation_sharded.py worker --shard 0 --num-shards 8 : 8개 중 0번 조각만 평가 (컴퓨터마다 번호를 바꿔 실행)
+#   python evaluation_sharded.py merge --num-shards 8         : 조각별 결과 파일을 모아 prediction_summary.csv 생성
+# 여러 컴퓨터에서 나눠 실행할 때는 SHARD_RESULTS_DIR의 shard_*.jsonl 파일을 한 폴더에 모은 뒤 merge 합니다.
+SHARD_RESULTS_DIR = ev.RESULTS_SAVE_PATH / 'shard_results'
+NUM_SHARDS = 4
+THREADS_PER_WORKER = None   # 프로세스당 torch 스레드 수 (None이면 run은 CPU 코어 수 / 프로세스 수, worker는 CPU 코어 수)
+# --------------------------------------------------
+
+SHARD_FORMAT_VERSION = 1
+
+
+def shard_of(rid, num_shards):
+    """'클래스/파일명' 식별자의 sha1로 조각 번호를 정합니다. 폴더 위치나 컴퓨터, 실행 순서와 관계없이 항상 같습니다."""
+    return int(hashlib.sha1(rid.encode('utf-8')).hexdigest()[:8], 16) % num_shards
+
+
+def shard_stream_path(shard, num_shards, results_dir=None):
+    return Path(results_dir or SHARD_RESULTS_DIR) / f"shard_{shard:03d}_of_{num_shards:03d}.jsonl"
+
+
+def default_threads(workers):
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def load_test_items():
+    """evaluation.py와 같은 (이미지, 라벨) 목록과 전체 클래스 목록을 반환합니다."""
+    if ev.SHARD_TEST_PATH:
+        reader = ShardReader(ev.SHARD_TEST_PATH)
+        return reader.items(), reader.classes
+    test_path = Path(ev.TEST_DATASET_PATH)
+    return list_class_images(test_path), sorted(d.name for d in test_path.iterdir() if d.is_dir())
+
+
+def run_worker(shard, num_shards, threads, results_dir=None):
+    """조각 하나의 이미지만 예측해 조각별 결과 파일에 기록합니다. 같은 설정으로 다시 실행하면 이어서 평가합니다."""
+    # torch/OpenMP가 시작되기 전에 스레드 수를 정해야 적용됩니다.
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    tag = f"[{shard + 1}/{num_shards}]"
+    model_path = Path(ev.MODEL_PATH)
+    if not model_path.exists():
+        print(f"❌ {tag} 오류: 모델 파일을 찾을 수 없습니다: {model_path}")
+        return False
+
+    timer = StartupTimer(f'evaluation_shard{shard}')
+    with timer.stage('import'):
+        import_ml_backend()
+        import torch
+        torch.set_num_threads(threads)
+    with timer.stage('model_load'):
+        model = load_model(model_path)
+    class_names = [model.names[i] for i in range(len(model.names))]
+
+    test_items, all_classes = load_test_items()
+    items = [(path, label) for path, label in test_items if shard_of(record_id(path, label), num_shards) == shard]
+    meta = {'shard_format': SHARD_FORMAT_VERSION, 'shard': shard, 'num_shards': num_shards,
+            'model_sha1': model_fingerprint(model_path), 'preprocess': preprocess_key(ev.IMGSZ),
+            'class_names': class_names, 'all_classes': all_classes, 'items': len(items)}
+    writer = ResultStreamWriter(shard_stream_path(shard, num_shards, results_dir), meta, resume=ev.RESUME,
+                                flush_every=ev.RESULTS_FLUSH_EVERY)
+    labels = {path: label for path, label in items if record_id(path, label) not in writer}
+    print(f"▶ {tag} {len(items)}개 이미지 중 {len(labels)}개 예측 (스레드 {threads}개)")
+
+    meter = ThroughputMeter()
+    with writer:
+        for paths, images, errors in iter_image_batches(list(labels), imgsz=ev.IMGSZ, batch_size=ev.BATCH_SIZE,
+                                                        prefetch_batches=ev.PREFETCH_BATCHES,
+                                                        num_workers=ev.DECODE_WORKERS):
+            for image_path, err in errors:
+                print(f"  - {tag} 파일: {image_path.name} | ⚠️ 이미지 디코딩 중 오류 발생: {err}")
+            try:
+                if 'first_inference' in timer.stages:
+                    predictions = predict_batch(model, images, imgsz=ev.IMGSZ)
+                else:
+                    with timer.stage('first_inference'):
+                        predictions = predict_batch(model, images, imgsz=ev.IMGSZ)
+            except Exception as e:
+                print(f"  - {tag} ⚠️ 배치 예측 중 오류 발생 ({len(paths)}개 이미지 건너뜀): {e}")
+                continue
+            meter.update(len(predictions))
+            for image_path, pred in zip(paths, predictions):
+                # evaluation.py는 예측 캐시(float16)를 거친 확률로 기록하므로 같은 값이 되도록 맞춤
+                pred = topk_from_probs(pred['probs'].astype(np.float16), 5)
+                true_label = labels[image_path]
+                pred_label = class_names[pred['top1']]
+                writer.write(record_id(image_path, true_label), true_label, pred_label, pred, true_label == pred_label)
+    meter.stop()
+    print(f"✅ {tag} 완료: {meter.count}개 이미지 / {meter.elapsed:.1f}초 ({meter.images_per_sec:.2f} images/sec) "
+          f"-> {writer.path.name}")
+    print(timer.report())
+    timer.save()
+    return True
+
+
+def run_local(workers, threads=None):
+    """한 컴퓨터에서 조각별 worker 프로세스를 동시에 실행하고, 모두 끝나면 병합합니다."""
+    threads = threads or default_threads(workers)
+    print(f"🚀 테스트 이미지를 {workers}개 조각으로 나눠 프로세스 {workers}개 x 스레드 {threads}개로 평가합니다.")
+    start = time.perf_counter()
+    procs = [subprocess.Popen([sys.executable, str(Path(__file__).resolve()), 'worker', '--shard', str(i),
+                               '--num-shards', str(workers), '--threads', str(threads)])
+             for i in range(workers)]
+    failed = [i for i, proc in enumerate(procs) if proc.wait() != 0]
+    print(f"\n⚡ 전체 worker 실행 시간: {time.perf_counter() - start:.1f}초")
+    if failed:
+        print(f"❌ 오류: {len(failed)}개 조각({', '.join(map(str, failed))})이 실패했습니다. 다시 실행하면 이어서 평가합니다.")
+        return
+    merge_shards(workers)
+
+
+def merge_shards(num_shards, results_dir=None):
+    """
+    조각별 결과 파일을 하나의 prediction_results.jsonl로 합치고, 단일 프로세스 evaluation.py와 같은
+    요약표/지표/prediction_summary.csv를 만듭니다. 모델이나 테스트 데이터 없이 결과 파일만으로 동작합니다.
+    """
+    paths = [shard_stream_path(i, num_shards, results_dir) for i in range(num_shards)]
+    missing = [p.name for p in paths if not p.is_file()]
+    if missing:
+        print(f"❌ 오류: 조각 결과 파일이 없습니다: {', '.join(missing)}")
+        return False
+
+    metas, records = [], []
+    for path in paths:
+        meta, ids = read_stream_info(path)
+        metas.append(meta)
+        if meta is None or meta.get('shard_format') != SHARD_FORMAT_VERSION or meta['num_shards'] != num_shards:
+            print(f"❌ 오류: {path.name}은(는) {num_shards}개 조각 평가 결과가 아닙니다.")
+            return False
+        if len(ids) < meta['items']:
+            print(f"⚠️ 경고: {path.name}: {meta['items']}개 중 {len(ids)}개만 기록되어 있습니다. (실패했거나 아직 실행 중)")
+        records.extend(iter_records(path))
+
+    shared = ('model_sha1', 'preprocess', 'class_names', 'all_classes')
+    for meta, path in zip(metas[1:], paths[1:]):
+        different = [k for k in shared if meta[k] != metas[0][k]]
+        if different:
+            print(f"❌ 오류: {path.name}의 설정({', '.join(different)})이 {paths[0].name}과(와) 다릅니다. 같은 모델/설정으로 다시 평가하세요.")
+            return False
+    class_names, all_classes = metas[0]['class_names'], metas[0]['all_classes']
+
+    # 단일 프로세스와 같은 순서(클래스 -> 파일명)로 기록해야 요약표의 행 순서까지 같아집니다.
+    records.sort(key=lambda r: (r['label'], r['id']))
+    stream_meta = {'model_sha1': metas[0]['model_sha1'], 'preprocess': metas[0]['preprocess'],
+                   'test': str(ev.SHARD_TEST_PATH or ev.TEST_DATASET_PATH)}
+    with ResultStreamWriter(ev.RESULTS_STREAM_PATH, stream_meta, resume=False,
+                            flush_every=ev.RESULTS_FLUSH_EVERY) as writer:
+        for r in records:
+            pred = {'top1conf': r['conf'], 'top5': r['top5'], 'top5conf': r['top5conf']}
+            writer.write(r['id'], r['label'], r['pred'], pred, r['correct'])
+    print(f"🧩 {num_shards}개 조각의 결과 {len(records)}개를 병합했습니다: {ev.RESULTS_STREAM_PATH}")
+
+    df, collector = summarize_stream(ev.RESULTS_STREAM_PATH, class_names, all_classes)
+    df, _ = ev.print_summary(df, collector, class_names)
+    ev.save_summary_csv(df, ev.RESULTS_SAVE_PATH / 'prediction_summary.csv')
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="테스트 이미지를 조각으로 나눠 여러 프로세스/컴퓨터에서 평가하고 병합합니다.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help="이 컴퓨터에서 worker 여러 개를 실행한 뒤 병합")
+    run.add_argument('--workers', type=int, default=NUM_SHARDS)
+    run.add_argument('--threads', type=int, default=THREADS_PER_WORKER)
+    worker = sub.add_parser('worker', help="조각 하나만 평가")
+    worker.add_argument('--shard', type=int, required=True, help="0부터 시작하는 조각 번호")
+    worker.add_argument('--num-shards', type=int, default=NUM_SHARDS)
+    worker.add_argument('--threads', type=int, default=THREADS_PER_WORKER)
+    merge = sub.add_parser('merge', help="조각별 결과 파일 병합")
+    merge.add_argument('--num-shards', type=int, default=NUM_SHARDS)
+    merge.add_argument('--results-dir', help=f"조각 결과 파일 폴더 (기본: {SHARD_RESULTS_DIR})")
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        run_local(max(1, args.workers), args.threads)
+    elif args.command == 'worker':
+        if not 0 <= args.shard < args.num_shards:
+            parser.error(f"--shard는 0 이상 {args.num_shards} 미만이어야 합니다.")
+        # 컴퓨터마다 worker 하나를 띄우는 경우가 기본 (한 컴퓨터에 여러 개를 직접 띄우면 --threads 지정)
+        threads = args.threads or default_threads(1)
+        if not run_worker(args.shard, args.num_shards, threads):
+            sys.exit(1)
+    else:
+        if not merge_shards(args.num_shards, args.results_dir):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+from pathlib import Path
+import json
+import time
+from ultralytics import YOLO
+from inference_engine import evaluate_top1, list_class_images, load_model
+
+# --------------------------------------------------
+# ✅ 사용자가 수정해야 할 부분
+# --------------------------------------------------
+# 1. 내보낼 학습 결과 체크포인트 (runs/classify/<exp>/weights/best.pt)
+MODEL_PATH = r"C:\Users\sega0\Desktop\code\runs\classify\test10\weights\best.pt"
+
+# 2. 데이터셋 폴더 (INT8 보정에는 val, 비교 평가에는 test 폴더를 사용)
+DATASET_PATH = r"C:\Users\sega0\Desktop\code\try\dataset"
+
+# 3. 내보내기 옵션
+EXPORT_FORMAT = 'openvino'    # 'openvino' (CPU 권장) 또는 'onnx'
+INT8 = True                   # True면 val 데이터로 보정한 INT8 양자화 모델 생성 (openvino 전용)
+CALIBRATION_FRACTION = 1.0    # 보정에 사용할 val 데이터 비율
+IMGSZ = 384
+BATCH_SIZE = 32
+
+# 4. 양자화 모델 채택 기준: 원본 대비 top-1 정확도 하락 허용치 (%p)
+MAX_ACCURACY_DROP = 1.0
+# --------------------------------------------------
+
+
+def export_model(model_path, dataset_path, export_format=EXPORT_FORMAT, int8=INT8, imgsz=IMGSZ,
+                 fraction=CALIBRATION_FRACTION):
+    """체크포인트를 CPU 최적화 형식으로 내보내고, 내보낸 파일(폴더) 경로를 반환합니다."""
+    if int8 and export_format != 'openvino':
+        print(f"⚠️ 경고: INT8 양자화는 openvino 형식에서만 지원합니다. '{export_format}'은(는) FP32로 내보냅니다.")
+        int8 = False
+
+    model = YOLO(model_path)
+    export_args = dict(format=export_format, imgsz=imgsz, dynamic=True)
+    if int8:
+        # ultralytics가 data의 val 분할을 보정(calibration) 데이터로 사용합니다.
+        export_args.update(int8=True, data=str(dataset_path), fraction=fraction)
+
+    print(f"📦 '{Path(model_path).name}'을(를) {export_format}{' (INT8)' if int8 else ''} 형식으로 내보냅니다...")
+    start = time.perf_counter()
+    exported = model.export(**export_args)
+    print(f"✅ 내보내기 완료 ({time.perf_counter() - start:.1f}초): {exported}")
+    return Path(exported)
+
+
+def compare_models(original_path, exported_path, test_path, imgsz=IMGSZ, batch_size=BATCH_SIZE):
+    """원본 체크포인트와 내보낸 모델을 test 데이터로 평가해 정확도 차이와 속도 향상을 반환합니다."""
+    items = list_class_images(test_path)
+    if not items:
+        print(f"❌ 오류: '{test_path}'에서 테스트 이미지를 찾을 수 없습니다.")
+        return None
+
+    report = {'test_images': len(items)}
+    for key, path in (('original', original_path), ('exported', exported_path)):
+        print(f"\n▶ '{Path(path).name}' 평가 중... ({len(items)}개 이미지)")
+        stats = evaluate_top1(load_model(path), items, imgsz=imgsz, batch_size=batch_size)
+        report[key] = {'path': str(path), **stats}
+        print(f" - top-1: {stats['top1_accuracy']:.2f}% | top-5: {stats['top5_accuracy']:.2f}% | {stats['images_per_sec']:.2f} images/sec")
+
+    original, exported = report['original'], report['exported']
+    report['top1_accuracy_diff'] = exported['top1_accuracy'] - original['top1_accuracy']
+    report['top5_accuracy_diff'] = exported['top5_accuracy'] - original['top5_accuracy']
+    report['speedup'] = (exported['images_per_sec'] / original['images_per_sec']
+                         if original['images_per_sec'] > 0 else None)
+    report['accepted'] = -report['top1_accuracy_diff'] <= MAX_ACCURACY_DROP
+    return report
+
+
+def main():
+    model_path = Path(MODEL_PATH)
+    dataset_path = Path(DATASET_PATH)
+
+    if not model_path.is_file():
+        print(f"❌ 오류: 모델 파일을 찾을 수 없습니다. 경로를 확인해주세요:\n -> {model_path}")
+        return
+    if not (dataset_path / 'test').is_dir():
+        print(f"❌ 오류: '{dataset_path}' 아래에 test 폴더가 없습니다.")
+        return
+
+    exported_path = export_model(model_path, dataset_path)
+    report = compare_models(model_path, exported_path, dataset_path / 'test')
+    if report is None:
+        return
+
+    speedup = f"{report['speedup']:.2f}배" if report['speedup'] else "측정 불가"
+    print(f"\n{'='*60}\n🏁 비교 결과\n{'='*60}")
+    print(f" - top-1 정확도 차이: {report['top1_accuracy_diff']:+.2f}%p")
+    print(f" - top-5 정확도 차이: {report['top5_accuracy_diff']:+.2f}%p")
+    print(f" - 속도 향상: {speedup}")
+    if report['accepted']:
+        print(f"✅ 정확도 하락이 허용치({MAX_ACCURACY_DROP}%p) 이내입니다. 내보낸 모델을 사용해도 좋습니다:\n -> {exported_path}")
+    else:
+        print(f"❌ 정확도 하락이 허용치({MAX_ACCURACY_DROP}%p)를 넘습니다. 원본 체크포인트 사용을 권장합니다.")
+
+    report_path = model_path.parent.parent / f"export_report_{exported_path.stem}.json"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 비교 결과를 저장했습니다: {report_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import time
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # 윈도우
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    lock 파일로 여러 프로세스(와 같은 프로세스의 여러 스레드)가 한 폴더에 동시에 쓰지 못하게 막는 배타 잠금입니다.
+    with 문으로 사용하며 같은 스레드에서는 다시 잡아도 됩니다. 프로세스가 죽으면 운영체제가 잠금을 풀어 줍니다.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._thread_lock = threading.RLock()
+        self._file = None
+        self._depth = 0
+
+    def acquire(self, blocking=True):
+        """잠금을 잡습니다. blocking=False이면 다른 프로세스가 잡고 있을 때 기다리지 않고 False를 반환합니다."""
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if self._depth:
+            self._depth += 1
+            return True
+        f = open(self.path, 'a+b')
+        try:
+            if not _lock_file(f, blocking):
+                f.close()
+                self._thread_lock.release()
+                return False
+        except BaseException:
+            f.close()
+            self._thread_lock.release()
+            raise
+        self._file = f
+        self._depth = 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            _unlock_file(self._file)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _lock_file(f, blocking):
+    if fcntl is not None:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            return True
+        except BlockingIOError:
+            return False
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.05)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
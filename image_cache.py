@@ -0,0 +1,390 @@
+import os
+import json
+import hashlib
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+from PIL import Image
+from file_lock import FileLock
+
+# --------------------------------------------------
+# ✅ 설정 부분
+# --------------------------------------------------
+BASE_DIR = Path(__file__).resolve().parent
+
+# split_images_cls.py가 만든 데이터셋 폴더 (train/val/test)
+DATASET_PATH = BASE_DIR / "dataset"
+# 캐시가 저장될 폴더. 데이터셋 내용이 같으면 실험(test11, test12, ...)끼리 같은 캐시를 재사용합니다.
+CACHE_ROOT = BASE_DIR.parent / "image_cache"
+
+CACHE_EDGE = 384          # 짧은 변을 이 길이로 줄여 저장 (학습 imgsz 이상으로 설정)
+CACHE_WORKERS = os.cpu_count() or 1
+SPLITS = ('train', 'val')
+# 가운데를 잘라 정사각형으로 저장할 split. 검증 전처리(짧은 변 리사이즈 -> 가운데 자르기)와 같으므로 val만 자릅니다.
+# train은 잘라 두면 랜덤 크롭/이동 증강이 가장자리를 전혀 볼 수 없으므로 비율을 유지한 채 저장합니다.
+CROP_SPLITS = ('val',)
+# 만들다 중단된 임시 폴더(<키>.<pid>.tmp)는 이 시간이 지나면 삭제
+STALE_TMP_SECONDS = 24 * 3600
+# --------------------------------------------------
+
+CACHE_FORMAT_VERSION = 2
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp')
+FILE_HASHES_NAME = 'file_hashes.json'
+USERS_DIR_NAME = 'users'
+
+# 이 프로세스가 사용 중으로 표시한 캐시 폴더 -> 잡고 있는 잠금 (프로세스가 끝나면 운영체제가 풀어 줌)
+_held_users = {}
+
+
+def list_split(split_dir):
+    """split 폴더의 (클래스 목록, [(클래스 번호, 파일 경로)]) 를 정렬된 순서로 반환합니다."""
+    split_dir = Path(split_dir)
+    classes = sorted(d.name for d in split_dir.iterdir() if d.is_dir())
+    files = []
+    for cls_idx, class_name in enumerate(classes):
+        with os.scandir(split_dir / class_name) as it:
+            for name in sorted(e.name for e in it if e.is_file() and e.name.lower().endswith(IMAGE_SUFFIXES)):
+                files.append((cls_idx, os.path.join(split_dir, class_name, name)))
+    return classes, files
+
+
+def _sha1_file(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def content_hashes(paths, memo_path=None, workers=CACHE_WORKERS):
+    """
+    파일 내용의 sha1 목록을 반환합니다.
+    memo_path에 (크기, 수정 시각)별 해시를 기억해 두어, 바뀌지 않은 파일은 다시 읽지 않습니다.
+    (복사로 수정 시각만 바뀐 파일은 한 번 다시 읽지만 해시는 같으므로 캐시 키는 그대로입니다)
+    """
+    memo = {}
+    if memo_path and Path(memo_path).is_file():
+        try:
+            with open(memo_path, 'r', encoding='utf-8') as f:
+                memo = json.load(f)
+        except (OSError, ValueError):
+            memo = {}
+
+    stats = [os.stat(p) for p in paths]
+    hashes = [None] * len(paths)
+    todo = []
+    for i, (path, st) in enumerate(zip(paths, stats)):
+        entry = memo.get(os.path.abspath(path))
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            hashes[i] = entry[2]
+        else:
+            todo.append(i)
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for i, digest in zip(todo, pool.map(_sha1_file, [paths[i] for i in todo])):
+                hashes[i] = digest
+        if memo_path:
+            for path, st, digest in zip(paths, stats, hashes):
+                memo[os.path.abspath(path)] = [st.st_size, st.st_mtime_ns, digest]
+            Path(memo_path).parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = f"{memo_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(memo, f, ensure_ascii=False)
+            os.replace(tmp_path, memo_path)
+    return hashes
+
+
+def dataset_fingerprint(dataset_path, splits=SPLITS, edge=CACHE_EDGE, memo_path=None):
+    """
+    데이터셋 구성(split/클래스/파일 이름과 파일 내용의 sha1)과 캐시 설정으로 캐시 키를 만듭니다.
+    파일이 하나라도 추가/삭제/변경되면 키가 바뀌어 새 캐시를 만들고,
+    데이터셋을 복사하거나 옮겨 수정 시각만 바뀐 경우에는 같은 키가 되어 캐시를 재사용합니다.
+    """
+    h = hashlib.sha1(f"v{CACHE_FORMAT_VERSION}|edge={edge}|crop={','.join(CROP_SPLITS)}".encode())
+    for split in splits:
+        split_dir = Path(dataset_path) / split
+        if not split_dir.is_dir():
+            continue
+        _, files = list_split(split_dir)
+        paths = [p for _, p in files]
+        for path, digest in zip(paths, content_hashes(paths, memo_path)):
+            rel = os.path.relpath(path, dataset_path).replace(os.sep, '/')
+            h.update(f"{rel}|{digest}\n".encode())
+    return h.hexdigest()[:16]
+
+
+def target_shape(size, edge, crop):
+    """원본 (가로, 세로)에 대해 저장할 (높이, 너비, 3) 모양을 반환합니다."""
+    if crop:
+        return edge, edge, 3
+    return _scaled_size(size, edge)[::-1] + (3,)
+
+
+def _scaled_size(size, edge):
+    """짧은 변을 edge로 맞춘 (가로, 세로)."""
+    w, h = size
+    scale = edge / min(w, h)
+    return max(edge, round(w * scale)), max(edge, round(h * scale))
+
+
+def resize_image(path, edge, crop):
+    """
+    짧은 변을 edge로 줄인 uint8 배열을 반환합니다.
+    crop이면 가운데를 edge x edge로 잘라 반환합니다. (검증용)
+    """
+    with Image.open(path) as img:
+        # 축소 디코딩 후에도 크기가 target_shape()와 같도록 원본 크기 기준으로 계산
+        new_w, new_h = _scaled_size(img.size, edge)
+        img.draft('RGB', (edge, edge))  # JPEG는 필요한 만큼만 축소 디코딩
+        img = img.convert('RGB')
+    img = img.resize((new_w, new_h), Image.BILINEAR)
+    if crop:
+        left, top = (new_w - edge) // 2, (new_h - edge) // 2
+        img = img.crop((left, top, left + edge, top + edge))
+    return np.asarray(img, dtype=np.uint8)
+
+
+def _read_size(path):
+    """헤더만 읽어 원본 (가로, 세로)를 반환합니다. 열 수 없으면 None."""
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None
+
+
+def _fill_chunk(array_path, jobs, edge, crop):
+    """워커 프로세스: 맡은 이미지들을 리사이즈해 1차원 memmap의 자기 위치에 바로 씁니다. 실패한 인덱스 목록을 반환합니다."""
+    arr = np.load(array_path, mmap_mode='r+')
+    failed = []
+    for idx, path, offset, shape in jobs:
+        try:
+            img = resize_image(path, edge, crop)
+            if img.shape != tuple(shape):
+                raise ValueError(f"예상 크기 {tuple(shape)}와 다름: {img.shape}")
+            arr[offset:offset + img.size] = img.reshape(-1)
+        except Exception:
+            failed.append(idx)
+    arr.flush()
+    del arr
+    return failed
+
+
+def build_split_cache(split_dir, out_dir, split, edge=CACHE_EDGE, workers=CACHE_WORKERS, chunk_size=256):
+    """
+    split 하나를 1차원 uint8 memmap(.npy)과 인덱스(.json)로 만듭니다.
+    이미지마다 크기가 다를 수 있으므로 인덱스에 (시작 위치, 모양)을 함께 기록합니다.
+    """
+    classes, files = list_split(split_dir)
+    crop = split in CROP_SPLITS
+    paths = [p for _, p in files]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        sizes = list(pool.map(_read_size, paths))
+
+    failed = [i for i, size in enumerate(sizes) if size is None]
+    shapes = [target_shape(size, edge, crop) if size else (0, 0, 3) for size in sizes]
+    offsets = np.concatenate([[0], np.cumsum([h * w * c for h, w, c in shapes], dtype=np.int64)])
+    array_path = str(Path(out_dir) / f"{split}.npy")
+    arr = np.lib.format.open_memmap(array_path, mode='w+', dtype=np.uint8, shape=(max(1, int(offsets[-1])),))
+    del arr
+
+    jobs = [(i, paths[i], int(offsets[i]), shapes[i]) for i in range(len(paths)) if sizes[i] is not None]
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(_fill_chunk, array_path, jobs[start:start + chunk_size], edge, crop)
+                   for start in range(0, len(jobs), chunk_size)]
+        for future in futures:
+            failed.extend(future.result())
+
+    index = {
+        'classes': classes,
+        'labels': [cls_idx for cls_idx, _ in files],
+        'names': [os.path.basename(p) for _, p in files],
+        'offsets': [int(o) for o in offsets[:-1]],
+        'shapes': [list(s) for s in shapes],
+        'cropped': crop,
+        'failed': sorted(failed),
+    }
+    with open(Path(out_dir) / f"{split}.json", 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    return len(files), len(failed)
+
+
+def mark_in_use(cache_dir):
+    """
+    이 프로세스가 캐시 폴더를 쓰고 있다고 표시합니다. users/<pid>.lock 잠금을 프로세스가 끝날 때까지 잡고 있으며,
+    DataLoader 워커처럼 fork된 자식 프로세스가 살아 있는 동안에도 잠금이 유지됩니다.
+    """
+    cache_dir = Path(cache_dir)
+    if str(cache_dir) in _held_users:
+        return
+    users_dir = cache_dir / USERS_DIR_NAME
+    users_dir.mkdir(exist_ok=True)
+    lock = FileLock(users_dir / f"{os.getpid()}.lock")
+    lock.acquire()
+    _held_users[str(cache_dir)] = lock
+
+
+def in_use(cache_dir):
+    """다른 프로세스(또는 이 프로세스)가 mark_in_use()로 잡아 둔 잠금이 하나라도 남아 있으면 True를 반환합니다."""
+    users_dir = Path(cache_dir) / USERS_DIR_NAME
+    for marker in users_dir.glob('*.lock') if users_dir.is_dir() else []:
+        lock = FileLock(marker)
+        try:
+            if not lock.acquire(blocking=False):
+                return True
+        except OSError:
+            return True  # 확인할 수 없으면 지우지 않음
+        lock.release()
+    return False
+
+
+def prune_stale_caches(cache_root, dataset_path, keep_key):
+    """
+    같은 데이터셋으로 만든 예전 캐시 폴더(데이터셋이 바뀌기 전 키)와 오래된 임시 폴더를 지웁니다.
+    다른 데이터셋의 캐시와, 아직 실행 중인 학습이 사용 중으로 표시한 캐시는 건드리지 않습니다.
+    (리눅스에서는 memmap을 열어 둔 폴더도 지워지므로, 나중에 memmap을 여는 DataLoader 워커가 학습 도중 실패할 수 있음)
+    삭제한 폴더 이름 목록을 반환합니다.
+    """
+    cache_root = Path(cache_root)
+    dataset = str(Path(dataset_path).resolve())
+    removed = []
+    for entry in cache_root.iterdir() if cache_root.is_dir() else []:
+        if not entry.is_dir() or entry.name == keep_key:
+            continue
+        if entry.name.endswith('.tmp'):
+            stale = time.time() - entry.stat().st_mtime > STALE_TMP_SECONDS
+        else:
+            try:
+                with open(entry / 'meta.json', 'r', encoding='utf-8') as f:
+                    stale = json.load(f).get('dataset') == dataset
+            except (OSError, ValueError):
+                stale = False  # 캐시 폴더가 아니거나 다른 프로세스가 만드는 중
+        if stale and not in_use(entry):
+            # 사용 표시 없이 memmap을 열어 둔 프로세스가 있으면 (Windows) 지워지지 않으므로 다음 실행에서 다시 시도
+            shutil.rmtree(entry, ignore_errors=True)
+            if not entry.exists():
+                removed.append(entry.name)
+    return removed
+
+
+def get_or_build_cache(dataset_path=DATASET_PATH, cache_root=CACHE_ROOT, edge=CACHE_EDGE, splits=SPLITS,
+                       workers=CACHE_WORKERS):
+    """
+    데이터셋 지문에 해당하는 캐시가 있으면 그대로 쓰고, 없으면 병렬로 만듭니다.
+    반환한 캐시 폴더는 이 프로세스가 끝날 때까지 사용 중으로 표시하고, 같은 데이터셋의 예전 캐시 폴더 중 사용 중이 아닌 것은 지웁니다.
+    (캐시 폴더, 메타 정보)를 반환합니다. 메타 정보에는 크기와 생성 시간이 들어 있습니다.
+    """
+    key = dataset_fingerprint(dataset_path, splits, edge, memo_path=Path(cache_root) / FILE_HASHES_NAME)
+    cache_dir = Path(cache_root) / key
+    meta_path = cache_dir / 'meta.json'
+    if meta_path.is_file():
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        meta['reused'] = True
+        mark_in_use(cache_dir)
+        meta['pruned'] = prune_stale_caches(cache_root, dataset_path, key)
+        return cache_dir, meta
+
+    # 프로세스별 임시 폴더에서 생성 (같은 캐시를 동시에 만드는 다른 학습과 겹치지 않도록)
+    tmp_dir = Path(cache_root) / f"{key}.{os.getpid()}.tmp"
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    start = time.perf_counter()
+    counts = {}
+    for split in splits:
+        split_dir = Path(dataset_path) / split
+        if split_dir.is_dir():
+            counts[split] = build_split_cache(split_dir, tmp_dir, split, edge, workers)
+    build_time = time.perf_counter() - start
+
+    meta = {
+        'version': CACHE_FORMAT_VERSION,
+        'key': key,
+        'dataset': str(Path(dataset_path).resolve()),
+        'edge': edge,
+        'cropped': [split for split in counts if split in CROP_SPLITS],
+        'images': {split: n for split, (n, _) in counts.items()},
+        'failed': {split: n for split, (_, n) in counts.items()},
+        'size_bytes': sum(f.stat().st_size for f in tmp_dir.glob('*.npy')),
+        'build_seconds': round(build_time, 2),
+    }
+    with open(tmp_dir / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    try:
+        os.replace(tmp_dir, cache_dir)
+    except OSError:
+        if not meta_path.is_file():
+            raise
+        shutil.rmtree(tmp_dir)  # 다른 프로세스가 먼저 완성한 캐시를 사용
+    meta['reused'] = False
+    mark_in_use(cache_dir)
+    meta['pruned'] = prune_stale_caches(cache_root, dataset_path, key)
+    return cache_dir, meta
+
+
+class ImageCacheReader:
+    """
+    캐시된 split 하나를 memmap으로 읽습니다.
+    memmap은 프로세스마다 처음 접근할 때 열기 때문에, DataLoader 워커로 넘겨도 배열 전체가 복사되지 않습니다.
+    """
+
+    def __init__(self, cache_dir, split):
+        with open(Path(cache_dir) / f"{split}.json", 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.classes = index['classes']
+        self.labels = index['labels']
+        self.names = index['names']
+        self.offsets = index['offsets']
+        self.shapes = [tuple(s) for s in index['shapes']]
+        self.failed = set(index['failed'])
+        self.array_path = Path(cache_dir) / f"{split}.npy"
+        self._array = None
+
+    @property
+    def array(self):
+        if self._array is None:
+            self._array = np.load(self.array_path, mmap_mode='r')
+        return self._array
+
+    def image(self, i):
+        """i번째 이미지를 (높이, 너비, 3) uint8 배열로 반환합니다. (memmap 뷰이므로 복사하지 않음)"""
+        h, w, c = self.shapes[i]
+        offset = self.offsets[i]
+        return self.array[offset:offset + h * w * c].reshape(h, w, c)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_array'] = None
+        return state
+
+    def __len__(self):
+        return len(self.labels)
+
+
+def describe(meta):
+    status = "재사용" if meta.get('reused') else "새로 생성"
+    images = ', '.join(f"{k} {v}개" for k, v in meta['images'].items())
+    return (f"캐시 {meta['key']} ({status}): {images}, {meta['size_bytes'] / 1024**3:.2f}GB, "
+            f"생성 시간 {meta['build_seconds']:.1f}초"
+            + (f", 예전 캐시 {len(meta['pruned'])}개 삭제" if meta.get('pruned') else ""))
+
+
+def main():
+    if not DATASET_PATH.is_dir():
+        print(f"❌ 오류: '{DATASET_PATH}' 폴더를 찾을 수 없습니다. split_images_cls.py를 먼저 실행하세요.")
+        return
+    print(f"🗂️ '{DATASET_PATH.name}'의 {CACHE_EDGE}px 이미지 캐시를 확인합니다...")
+    cache_dir, meta = get_or_build_cache()
+    print(f"✅ {describe(meta)}")
+    if any(meta['failed'].values()):
+        print(f" - ⚠️ 디코딩에 실패한 이미지: {meta['failed']} (학습에서 제외됩니다)")
+    print(f" -> {cache_dir}")
+
+
+if __name__ == '__main__':
+    main()
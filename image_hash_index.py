@@ -0,0 +1,150 @@
+import os
+import hashlib
+import time
+from multiprocessing import Pool
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+# --------------------------------------------------
+# ✅ 설정 부분
+# --------------------------------------------------
+BASE_DIR = Path(__file__).resolve().parent
+
+# 해시를 계산할 이미지 폴더들
+HASH_ROOTS = [BASE_DIR.parent / "images", BASE_DIR.parent / "other"]
+# 해시 인덱스 파일 (다시 실행하면 새로 추가/변경된 파일만 해시를 계산)
+HASH_INDEX_PATH = BASE_DIR / "이미지해시인덱스.csv"
+
+HASH_WORKERS = os.cpu_count() or 1
+# 지각 해시(dHash, 64비트)의 해밍 거리가 이 값 이하이면 같은 사진으로 간주
+NEAR_DUPLICATE_DISTANCE = 5
+# --------------------------------------------------
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp')
+INDEX_COLUMNS = ['path', 'size', 'mtime_ns', 'sha1', 'dhash']
+
+
+def dhash(img, hash_size=8):
+    """difference hash: 밝기 기울기 방향으로 만든 64비트 지각 해시. 재압축/리사이즈에 강합니다."""
+    img = img.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = np.asarray(img, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hash_file(path):
+    """(경로, sha1, dhash)를 반환합니다. 디코딩할 수 없으면 dhash는 None입니다."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    sha1 = hashlib.sha1(data).hexdigest()
+    try:
+        with Image.open(path) as img:
+            img.draft('RGB', (64, 64))  # JPEG는 축소 디코딩으로 충분
+            return path, sha1, dhash(img)
+    except Exception:
+        return path, sha1, None
+
+
+def _iter_image_files(roots):
+    for root in roots:
+        if not Path(root).is_dir():
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.lower().endswith(IMAGE_SUFFIXES):
+                    yield os.path.abspath(os.path.join(dirpath, filename))
+
+
+def load_index(index_path=HASH_INDEX_PATH):
+    if not Path(index_path).is_file():
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    return pd.read_csv(index_path, encoding='utf-8-sig', dtype={'sha1': str, 'dhash': str})
+
+
+def update_index(roots=HASH_ROOTS, index_path=HASH_INDEX_PATH, workers=HASH_WORKERS, save=True):
+    """
+    roots 아래 모든 이미지의 내용 해시(sha1)와 지각 해시(dHash)를 인덱스에 반영합니다.
+    크기/수정 시각이 인덱스와 같은 파일은 다시 계산하지 않고, 사라진 파일은 인덱스에서 제거합니다.
+    save=False이면 계산만 하고 인덱스 파일은 그대로 둡니다. (split_images_cls.py의 DRY RUN)
+    (갱신된 인덱스 DataFrame, 새로 계산한 파일 수)를 반환합니다.
+    """
+    old = load_index(index_path)
+    known = {row.path: row for row in old.itertuples(index=False)}
+
+    rows, to_hash = [], []
+    for path in _iter_image_files(roots):
+        st = os.stat(path)
+        row = known.get(path)
+        if row is not None and row.size == st.st_size and row.mtime_ns == st.st_mtime_ns:
+            rows.append(row._asdict())
+        else:
+            to_hash.append((path, st.st_size, st.st_mtime_ns))
+
+    if to_hash:
+        stats = {p: (size, mtime) for p, size, mtime in to_hash}
+        with Pool(processes=max(1, workers)) as pool:
+            for path, sha1, dh in pool.imap_unordered(hash_file, [p for p, _, _ in to_hash], chunksize=64):
+                size, mtime = stats[path]
+                rows.append({'path': path, 'size': size, 'mtime_ns': mtime, 'sha1': sha1,
+                             'dhash': None if dh is None else f"{dh:016x}"})
+
+    df = pd.DataFrame(rows, columns=INDEX_COLUMNS).sort_values('path', kind='stable')
+    if save:
+        df.to_csv(index_path, index=False, encoding='utf-8-sig')
+    return df, len(to_hash)
+
+
+def to_lookup(df):
+    """인덱스를 {절대 경로: (sha1, dhash 정수 또는 None)} 딕셔너리로 바꿉니다."""
+    return {path: (sha1, int(dh, 16) if isinstance(dh, str) else None)
+            for path, sha1, dh in zip(df['path'], df['sha1'], df['dhash'])}
+
+
+def _popcount64(x):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x)
+    return np.unpackbits(x.view(np.uint8).reshape(*x.shape, 8), axis=-1).sum(axis=-1)
+
+
+def near_duplicate_mask(query, refs, max_distance=NEAR_DUPLICATE_DISTANCE, block=1024):
+    """query의 각 해시가 refs 중 하나와 해밍 거리 max_distance 이하인지 벡터 연산으로 계산합니다."""
+    query = np.asarray(query, dtype=np.uint64)
+    refs = np.asarray(refs, dtype=np.uint64)
+    mask = np.zeros(len(query), dtype=bool)
+    if len(query) == 0 or len(refs) == 0:
+        return mask
+    for start in range(0, len(query), block):
+        q = query[start:start + block, None]
+        mask[start:start + block] = (_popcount64(q ^ refs[None, :]) <= max_distance).any(axis=1)
+    return mask
+
+
+def dedupe_group(keys, hashes, max_distance=NEAR_DUPLICATE_DISTANCE):
+    """정렬된 순서대로 보며, 앞에서 남긴 이미지와 거의 같은 이미지는 버립니다. 남길 키 목록을 반환합니다."""
+    kept_keys, kept_hashes = [], np.zeros(len(keys), dtype=np.uint64)
+    for key, h in zip(keys, hashes):
+        n = len(kept_keys)
+        if n and (_popcount64(kept_hashes[:n] ^ np.uint64(h)) <= max_distance).any():
+            continue
+        kept_hashes[n] = h
+        kept_keys.append(key)
+    return kept_keys
+
+
+def main():
+    print(f"🔍 이미지 해시 인덱스를 갱신합니다 ({HASH_WORKERS}개 프로세스):")
+    for root in HASH_ROOTS:
+        print(f" - {root}")
+    start = time.perf_counter()
+    df, n_hashed = update_index()
+    print(f"✅ 완료 ({time.perf_counter() - start:.1f}초): 전체 {len(df)}개 중 {n_hashed}개 새로 계산")
+
+    dup_groups = df[df.duplicated('sha1', keep=False)].groupby('sha1')
+    print(f" - 내용이 완전히 같은 파일 그룹: {dup_groups.ngroups}개")
+    print(f"💾 인덱스 저장 위치: {HASH_INDEX_PATH}")
+
+
+if __name__ == '__main__':
+    main()
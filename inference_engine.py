@@ -0,0 +1,265 @@
+import os
+import math
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from PIL import Image
+from shard_dataset import as_image_source
+
+# --------------------------------------------------
+# ✅ 기본 설정
+# --------------------------------------------------
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+DEFAULT_IMGSZ = 384              # 학습(Yolo_cls.py)과 동일한 입력 크기
+DEFAULT_BATCH_SIZE = 32          # 한 번의 forward에 넣을 이미지 수
+DEFAULT_PREFETCH_BATCHES = 2     # 미리 디코딩해 둘 배치 수 (0이면 미리 읽지 않음)
+DEFAULT_DECODE_WORKERS = min(8, os.cpu_count() or 1)
+DEFAULT_DISPLAY_SIZE = 1024      # 시각화용 이미지의 긴 변 최대 크기
+# --------------------------------------------------
+
+_STOP = object()
+
+# 내보낸(export) 모델 형식별 확장자. 모두 ultralytics의 AutoBackend로 불러옵니다.
+EXPORTED_SUFFIXES = {
+    '.pt': 'pytorch',
+    '.onnx': 'onnx',
+    '.xml': 'openvino',   # OpenVINO 폴더 안의 .xml 파일을 선택한 경우
+}
+
+
+def resolve_backend(model_path):
+    """모델 경로로부터 (실제 로드할 경로, 백엔드 이름)을 결정합니다."""
+    model_path = Path(model_path)
+    if model_path.is_dir() and model_path.name.endswith('_openvino_model'):
+        return model_path, 'openvino'
+    if model_path.suffix.lower() == '.xml':
+        return model_path.parent, 'openvino'
+    backend = EXPORTED_SUFFIXES.get(model_path.suffix.lower())
+    if backend is None:
+        raise ValueError(f"지원하지 않는 모델 형식입니다: {model_path.name} (.pt, .onnx, *_openvino_model 폴더)")
+    return model_path, backend
+
+
+def load_model(model_path):
+    """
+    PyTorch 체크포인트(.pt) 또는 export_model.py로 내보낸 CPU 최적화 모델(ONNX, OpenVINO)을 불러옵니다.
+    """
+    from ultralytics import YOLO  # torch를 함께 불러오므로 실제로 모델이 필요할 때 import (시작 시간 단축)
+
+    path, backend = resolve_backend(model_path)
+    if backend == 'pytorch':
+        return YOLO(path)
+    # 내보낸 모델은 메타데이터만으로 작업 종류를 알 수 없는 경우가 있어 명시해 줍니다.
+    return YOLO(path, task='classify')
+
+
+def decode_image(image_path, imgsz=None, display_size=None):
+    """
+    이미지(경로 또는 샤드 샘플)를 RGB로 한 번만 디코딩합니다.
+    JPEG은 '짧은 변 >= imgsz'와 '긴 변 >= display_size'를 모두 만족하는 가장 작은 배율(1/2, 1/4, 1/8)로
+    축소 디코딩(draft)하므로, 카메라 원본을 전체 해상도로 풀지 않습니다. 둘 다 None이면 원본 크기로 디코딩합니다.
+    """
+    with Image.open(as_image_source(image_path)) as img:
+        w, h = img.size
+        ratio = max(imgsz / min(w, h) if imgsz else 0, display_size / max(w, h) if display_size else 0)
+        if 0 < ratio < 1:
+            img.draft("RGB", (math.ceil(w * ratio), math.ceil(h * ratio)))
+        return img.convert("RGB")
+
+
+def _shrink(img, scale):
+    if scale >= 1:
+        return img
+    w, h = img.size
+    return img.resize((max(1, round(w * scale)), max(1, round(h * scale))), Image.BILINEAR)
+
+
+def load_and_resize(image_path, imgsz=DEFAULT_IMGSZ):
+    """이미지(경로 또는 샤드 샘플)를 RGB로 디코딩하고, 짧은 변이 imgsz가 되도록 줄여서 반환합니다."""
+    img = decode_image(image_path, imgsz)
+    return _shrink(img, imgsz / min(img.size))
+
+
+def load_for_display(image_path, imgsz=DEFAULT_IMGSZ, display_size=DEFAULT_DISPLAY_SIZE):
+    """
+    (모델 입력 이미지, 긴 변이 display_size 이하인 표시용 이미지)를 반환합니다.
+    모델 입력은 load_and_resize()와 똑같이 imgsz만으로 정한 배율로 디코딩하므로, 같은 예측 캐시 키에 같은 입력이 들어갑니다.
+    그 디코딩 결과가 표시용으로도 충분하면 함께 쓰고, 부족할 때만 표시용을 한 번 더 디코딩합니다.
+    display_size가 None이면 표시용 이미지는 원본 크기입니다.
+    """
+    img = decode_image(image_path, imgsz)
+    model_input = _shrink(img, imgsz / min(img.size))
+    if not display_size or max(img.size) < display_size:
+        with Image.open(as_image_source(image_path)) as src:
+            drafted = src.size != img.size
+        if drafted:  # 축소 디코딩으로 표시용 해상도가 모자람
+            img = decode_image(image_path, display_size=display_size)
+    display = _shrink(img, display_size / max(img.size)) if display_size else img
+    return model_input, display
+
+
+def _decode_safe(image_path, imgsz):
+    try:
+        return load_and_resize(image_path, imgsz), None
+    except Exception as e:
+        return None, e
+
+
+def iter_image_batches(image_paths, imgsz=DEFAULT_IMGSZ, batch_size=DEFAULT_BATCH_SIZE,
+                       prefetch_batches=DEFAULT_PREFETCH_BATCHES, num_workers=DEFAULT_DECODE_WORKERS):
+    """
+    백그라운드 스레드에서 이미지를 디코딩/리사이즈하여 고정 크기 배치로 넘겨줍니다.
+    (paths, images, errors) 튜플을 yield 하며, errors는 디코딩에 실패한 (path, 예외) 목록입니다.
+    """
+    image_paths = list(image_paths)
+    batch_size = max(1, int(batch_size))
+    batch_queue = queue.Queue(maxsize=max(1, int(prefetch_batches)))
+    stop_event = threading.Event()
+
+    def producer():
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, num_workers)) as pool:
+                for start in range(0, len(image_paths), batch_size):
+                    if stop_event.is_set():
+                        return
+                    chunk = image_paths[start:start + batch_size]
+                    decoded = list(pool.map(lambda p: _decode_safe(p, imgsz), chunk))
+
+                    paths, images, errors = [], [], []
+                    for path, (img, err) in zip(chunk, decoded):
+                        if err is None:
+                            paths.append(path)
+                            images.append(img)
+                        else:
+                            errors.append((path, err))
+                    batch_queue.put((paths, images, errors))
+        except Exception as e:
+            batch_queue.put(e)
+        finally:
+            batch_queue.put(_STOP)
+
+    if prefetch_batches <= 0:
+        # 미리 읽기 없이 순차적으로 디코딩 (디버깅/비교용)
+        for start in range(0, len(image_paths), batch_size):
+            chunk = image_paths[start:start + batch_size]
+            paths, images, errors = [], [], []
+            for path in chunk:
+                img, err = _decode_safe(path, imgsz)
+                if err is None:
+                    paths.append(path)
+                    images.append(img)
+                else:
+                    errors.append((path, err))
+            yield paths, images, errors
+        return
+
+    worker = threading.Thread(target=producer, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = batch_queue.get()
+            if item is _STOP:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # 소비 측이 중간에 멈춘 경우 생산 스레드가 막히지 않도록 큐를 비워줍니다.
+        stop_event.set()
+        while worker.is_alive():
+            try:
+                batch_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def predict_batch(model, images, imgsz=DEFAULT_IMGSZ):
+    """이미지 배치를 한 번의 forward로 예측하고 이미지별 top-1/top-5 결과와 전체 클래스 확률(probs)을 반환합니다."""
+    if not images:
+        return []
+
+    results = model.predict(images, imgsz=imgsz, verbose=False)
+    predictions = []
+    for result in results:
+        probs = result.probs
+        predictions.append({
+            'top1': int(probs.top1),
+            'top1conf': float(probs.top1conf),
+            'top5': [int(i) for i in probs.top5],
+            'top5conf': [float(c) for c in probs.top5conf],
+            'probs': probs.data.float().cpu().numpy(),
+        })
+    return predictions
+
+
+class ThroughputMeter:
+    """처리한 이미지 수와 경과 시간으로 images/sec를 계산합니다."""
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self.count = 0
+
+    def update(self, n):
+        self.count += n
+
+    def stop(self):
+        """측정을 멈춥니다. 이후 elapsed/images_per_sec 값은 고정됩니다."""
+        if self.end_time is None:
+            self.end_time = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return (self.end_time or time.perf_counter()) - self.start_time
+
+    @property
+    def images_per_sec(self):
+        elapsed = self.elapsed
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+
+def list_class_images(dataset_path):
+    """클래스 폴더 구조(dataset/<class>/<image>)에서 (이미지 경로, 실제 라벨) 목록을 만듭니다."""
+    items = []
+    for class_dir in sorted(d for d in Path(dataset_path).iterdir() if d.is_dir()):
+        for image_path in sorted(class_dir.glob('*.*')):
+            if image_path.suffix.lower() in IMAGE_EXTENSIONS:
+                items.append((image_path, class_dir.name))
+    return items
+
+
+def evaluate_top1(model, items, imgsz=DEFAULT_IMGSZ, batch_size=DEFAULT_BATCH_SIZE,
+                  prefetch_batches=DEFAULT_PREFETCH_BATCHES, warmup_batches=1, num_workers=DEFAULT_DECODE_WORKERS):
+    """
+    (이미지 경로, 실제 라벨) 목록으로 top-1/top-5 정확도와 처리 속도를 측정합니다.
+    처음 warmup_batches개의 배치는 속도 측정에서 제외합니다.
+    """
+    correct = correct5 = total = 0
+    timed_images = 0
+    timed_seconds = 0.0
+    true_labels = dict(items)
+    names = model.names
+
+    batches = iter_image_batches([p for p, _ in items], imgsz=imgsz, batch_size=batch_size,
+                                 prefetch_batches=prefetch_batches, num_workers=num_workers)
+    for batch_idx, (paths, images, _) in enumerate(batches):
+        start = time.perf_counter()
+        predictions = predict_batch(model, images, imgsz=imgsz)
+        if batch_idx >= warmup_batches:
+            timed_seconds += time.perf_counter() - start
+            timed_images += len(predictions)
+
+        for path, pred in zip(paths, predictions):
+            label = true_labels[path]
+            total += 1
+            correct += names[pred['top1']] == label
+            correct5 += any(names[idx] == label for idx in pred['top5'])
+
+    return {
+        'total': total,
+        'top1_accuracy': correct / total * 100 if total else 0.0,
+        'top5_accuracy': correct5 / total * 100 if total else 0.0,
+        'images_per_sec': timed_images / timed_seconds if timed_seconds > 0 else 0.0,
+    }
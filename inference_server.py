@@ -0,0 +1,251 @@
+import argparse
+import io
+import json
+import queue
+import threading
+import time
+import urllib.request
+from collections import Counter, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from inference_engine import load_and_resize, load_model, predict_batch, DEFAULT_IMGSZ
+
+# --------------------------------------------------
+# ✅ 서버 설정 (명령행 인자로 덮어쓸 수 있습니다)
+# --------------------------------------------------
+MODEL_PATH = "runs/classify/test10/weights/best.pt"
+HOST = "127.0.0.1"
+PORT = 8000
+MAX_BATCH_SIZE = 16      # 한 번의 forward에 묶을 최대 요청 수
+MAX_WAIT_MS = 10         # 첫 요청 도착 후 배치를 더 모으기 위해 기다리는 최대 시간
+MAX_QUEUE_SIZE = 1024    # 대기열이 가득 차면 503으로 거절
+LATENCY_WINDOW = 10000   # p50/p99 계산에 사용할 최근 요청 수
+MAX_REQUEST_BYTES = 32 * 1024 * 1024  # 요청 본문(이미지) 최대 크기. 넘으면 413으로 거절
+# --------------------------------------------------
+
+
+class MicroBatcher:
+    """동시에 들어온 요청을 최대 배치 크기/최대 대기 시간 안에서 묶어 한 번에 예측합니다."""
+
+    def __init__(self, model, imgsz=DEFAULT_IMGSZ, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 max_queue_size=MAX_QUEUE_SIZE):
+        self.model = model
+        self.imgsz = imgsz
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stats_lock = threading.Lock()
+        self.batch_size_hist = Counter()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.processed = 0
+        self.errors = 0
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, image):
+        """이미지 하나를 대기열에 넣고 결과를 받을 Future를 반환합니다. 대기열이 가득 차면 queue.Full이 발생합니다."""
+        future = Future()
+        self._queue.put_nowait((image, future, time.perf_counter()))
+        return future
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            images = [image for image, _, _ in batch]
+            try:
+                predictions = predict_batch(self.model, images, imgsz=self.imgsz)
+            except Exception as e:
+                with self._stats_lock:
+                    self.errors += len(batch)
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            with self._stats_lock:
+                self.batch_size_hist[len(batch)] += 1
+                self.processed += len(batch)
+                for _, _, submitted in batch:
+                    self.latencies.append(done - submitted)
+            for (_, future, _), pred in zip(batch, predictions):
+                future.set_result((pred, len(batch)))
+
+    def metrics(self):
+        with self._stats_lock:
+            latencies = sorted(self.latencies)
+            hist = dict(sorted(self.batch_size_hist.items()))
+            processed, errors = self.processed, self.errors
+
+        def percentile(p):
+            if not latencies:
+                return None
+            idx = min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))
+            return round(latencies[idx] * 1000, 2)
+
+        return {
+            'queue_depth': self._queue.qsize(),
+            'processed': processed,
+            'errors': errors,
+            'batch_size_histogram': {str(k): v for k, v in hist.items()},
+            'latency_ms': {'p50': percentile(50), 'p99': percentile(99)},
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+
+def make_handler(batcher, names, model_name, max_request_bytes=MAX_REQUEST_BYTES):
+    class PredictionHandler(BaseHTTPRequestHandler):
+        """POST /predict (요청 본문 = 이미지 바이트), GET /health 를 처리합니다."""
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip('/') in ('/health', '/metrics'):
+                self._send_json(200, {'status': 'ok', 'model': model_name, **batcher.metrics()})
+            else:
+                self._send_json(404, {'error': f'알 수 없는 경로입니다: {self.path}'})
+
+        def do_POST(self):
+            if self.path.rstrip('/') != '/predict':
+                self._send_json(404, {'error': f'알 수 없는 경로입니다: {self.path}'})
+                return
+
+            start = time.perf_counter()
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+            except ValueError:
+                self.close_connection = True  # 본문 길이를 모르므로 연결을 재사용할 수 없음
+                self._send_json(400, {'error': 'Content-Length 헤더가 올바르지 않습니다.'})
+                return
+            if length > max_request_bytes:
+                self.close_connection = True  # 읽지 않은 본문이 남아 있으므로 연결을 닫음
+                self._send_json(413, {'error': f'요청 본문이 너무 큽니다: {length}바이트 (최대 {max_request_bytes}바이트)'})
+                return
+            if length <= 0:
+                self._send_json(400, {'error': '요청 본문에 이미지 데이터가 없습니다.'})
+                return
+
+            try:
+                # 디코딩은 요청 스레드에서 병렬로 처리하고, 모델에는 배치로만 접근
+                image = load_and_resize(io.BytesIO(self.rfile.read(length)), batcher.imgsz)
+            except Exception as e:
+                self._send_json(400, {'error': f'이미지를 디코딩할 수 없습니다: {e}'})
+                return
+
+            try:
+                future = batcher.submit(image)
+            except queue.Full:
+                self._send_json(503, {'error': '대기열이 가득 찼습니다. 잠시 후 다시 시도하세요.'})
+                return
+
+            try:
+                pred, batch_size = future.result()
+            except Exception as e:
+                self._send_json(500, {'error': f'예측 중 오류 발생: {e}'})
+                return
+
+            self._send_json(200, {
+                'top1': names[pred['top1']],
+                'top5': [{'label': names[idx], 'confidence': round(conf, 6)}
+                         for idx, conf in zip(pred['top5'], pred['top5conf'])],
+                'batch_size': batch_size,
+                'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+            })
+
+        def log_message(self, format, *args):
+            pass  # 요청마다 표준 출력에 로그를 남기지 않음
+
+    return PredictionHandler
+
+
+def serve(model_path, host=HOST, port=PORT, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+          imgsz=DEFAULT_IMGSZ, max_request_bytes=MAX_REQUEST_BYTES):
+    """체크포인트를 한 번 로드하고 HTTP 추론 서버를 실행합니다."""
+    model_path = Path(model_path)
+    if not model_path.exists():
+        print(f"❌ 오류: 모델 파일을 찾을 수 없습니다. 경로를 확인해주세요:\n -> {model_path}")
+        return
+
+    print(f"모델을 로드합니다: {model_path.name}")
+    model = load_model(model_path)
+    print("✅ 모델 로드 완료.")
+
+    batcher = MicroBatcher(model, imgsz=imgsz, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    server = ThreadingHTTPServer((host, port), make_handler(batcher, model.names, model_path.name,
+                                                                max_request_bytes))
+    print(f"🚀 추론 서버 시작: http://{host}:{port}  (POST /predict, GET /health)")
+    print(f" - 마이크로 배치: 최대 {max_batch_size}개 / 최대 대기 {max_wait_ms}ms")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n서버를 종료합니다.")
+    finally:
+        server.server_close()
+
+
+def request_prediction(image_path, url=f"http://{HOST}:{PORT}", timeout=60):
+    """로컬 테스트용 클라이언트: 이미지 파일을 서버에 보내고 JSON 결과를 반환합니다."""
+    data = Path(image_path).read_bytes()
+    req = urllib.request.Request(f"{url}/predict", data=data, method='POST',
+                                 headers={'Content-Type': 'application/octet-stream'})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read().decode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO 분류 모델 HTTP 추론 서버 (동적 마이크로 배치)")
+    parser.add_argument('--model', default=MODEL_PATH, help="체크포인트 경로 (.pt, .onnx 또는 *_openvino_model 폴더)")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--imgsz', type=int, default=DEFAULT_IMGSZ)
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+    parser.add_argument('--max-request-bytes', type=int, default=MAX_REQUEST_BYTES)
+    parser.add_argument('--client', nargs='+', metavar='IMAGE',
+                        help="서버 대신 클라이언트로 실행하여 이미지들을 동시에 전송합니다.")
+    args = parser.parse_args()
+
+    if args.client:
+        url = f"http://{args.host}:{args.port}"
+        results = {}
+
+        def send(path):
+            try:
+                results[path] = request_prediction(path, url)
+            except Exception as e:
+                results[path] = {'error': str(e)}
+
+        threads = [threading.Thread(target=send, args=(p,)) for p in args.client]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for path in args.client:
+            print(f"{path}: {json.dumps(results[path], ensure_ascii=False)}")
+        return
+
+    serve(args.model, args.host, args.port, args.max_batch_size, args.max_wait_ms, args.imgsz, args.max_request_bytes)
+
+
+if __name__ == '__main__':
+    main()
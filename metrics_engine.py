@@ -0,0 +1,177 @@
+import numpy as np
+
+# --------------------------------------------------
+# 📐 예측 결과를 NumPy 배열로 모아 한 번에 계산하는 지표 모음
+# --------------------------------------------------
+# 예측을 (정답 번호, top-k 번호, top-k 신뢰도) 배열로만 보관하고,
+# 혼동 행렬 / top-k 정확도 / 클래스별 정밀도·재현율·F1 / 신뢰도 보정 구간을
+# 파이썬 반복문 없이 벡터 연산으로 계산합니다.
+DEFAULT_TOPK = 5
+DEFAULT_CALIBRATION_BINS = 15
+METRICS_FORMAT_VERSION = 1
+
+
+class PredictionCollector:
+    """예측 결과를 미리 잡아 둔 배열에 이어 붙입니다. 공간이 부족하면 두 배로 늘립니다."""
+
+    def __init__(self, num_classes, k=DEFAULT_TOPK, capacity=1024):
+        self.num_classes = num_classes
+        self.k = k
+        self.count = 0
+        self.true_idx = np.full(capacity, -1, dtype=np.int32)
+        self.topk_idx = np.full((capacity, k), -1, dtype=np.int32)
+        self.topk_conf = np.zeros((capacity, k), dtype=np.float32)
+
+    def _reserve(self, n):
+        if self.count + n <= len(self.true_idx):
+            return
+        capacity = max(self.count + n, len(self.true_idx) * 2)
+        for name in ('true_idx', 'topk_idx', 'topk_conf'):
+            old = getattr(self, name)
+            new = np.full((capacity,) + old.shape[1:], -1 if old.dtype == np.int32 else 0, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def add(self, true_idx, topk_idx, topk_conf):
+        """예측 하나를 추가합니다. 정답이 모델 클래스에 없으면 true_idx는 -1입니다."""
+        self._reserve(1)
+        i = self.count
+        n = min(self.k, len(topk_idx))
+        self.true_idx[i] = true_idx
+        self.topk_idx[i, :n] = topk_idx[:n]
+        self.topk_conf[i, :n] = topk_conf[:n]
+        self.count += 1
+
+    def arrays(self):
+        """(정답 번호, top-k 번호, top-k 신뢰도) 배열을 실제 개수만큼 잘라 반환합니다."""
+        n = self.count
+        return self.true_idx[:n], self.topk_idx[:n], self.topk_conf[:n]
+
+
+def confusion_matrix(true_idx, pred_idx, num_classes):
+    """행: 정답, 열: 예측인 (num_classes x num_classes) 혼동 행렬. 정답이 -1인 예측은 제외합니다."""
+    valid = true_idx >= 0
+    flat = true_idx[valid].astype(np.int64) * num_classes + pred_idx[valid]
+    return np.bincount(flat, minlength=num_classes * num_classes).reshape(num_classes, num_classes)
+
+
+def topk_accuracy(true_idx, topk_idx, k):
+    if len(true_idx) == 0:
+        return 0.0
+    return float((topk_idx[:, :k] == true_idx[:, None]).any(axis=1).mean() * 100)
+
+
+def per_class_metrics(cm):
+    """혼동 행렬에서 클래스별 (지원 수, 정밀도, 재현율, F1) 배열을 계산합니다. 값이 없는 칸은 0입니다."""
+    tp = np.diag(cm).astype(np.float64)
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+    denom = precision + recall
+    f1 = np.divide(2 * precision * recall, denom, out=np.zeros_like(tp), where=denom > 0)
+    return support, precision, recall, f1
+
+
+def calibration_bins(confidence, correct, n_bins=DEFAULT_CALIBRATION_BINS):
+    """
+    top-1 신뢰도를 같은 폭의 구간으로 나눠 구간별 (개수, 평균 신뢰도, 정확도)와 ECE를 계산합니다.
+    ECE는 구간별 |정확도 - 평균 신뢰도| 를 개수로 가중 평균한 값입니다.
+    """
+    edges = np.linspace(0.0, 1.0, n_bins + 1)
+    bins = np.clip(np.digitize(confidence, edges[1:-1], right=True), 0, n_bins - 1)
+    counts = np.bincount(bins, minlength=n_bins)
+    conf_sum = np.bincount(bins, weights=confidence, minlength=n_bins)
+    correct_sum = np.bincount(bins, weights=correct.astype(np.float64), minlength=n_bins)
+    mean_conf = np.divide(conf_sum, counts, out=np.zeros(n_bins), where=counts > 0)
+    accuracy = np.divide(correct_sum, counts, out=np.zeros(n_bins), where=counts > 0)
+    ece = float(np.abs(accuracy - mean_conf) @ counts / counts.sum()) if counts.sum() else 0.0
+    return {'edges': edges, 'counts': counts, 'mean_conf': mean_conf, 'accuracy': accuracy, 'ece': ece}
+
+
+def threshold_sweep(confidence, correct, thresholds):
+    """
+    임계값마다 (신뢰도가 임계값 이상인 예측의 비율, 그 예측들의 정확도)를 계산합니다.
+    임계값 미만을 '판단 보류'로 처리할 때의 적용 범위와 정확도 관계를 봅니다.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    covered = confidence[None, :] >= thresholds[:, None]
+    n_covered = covered.sum(axis=1)
+    n_correct = (covered & correct[None, :]).sum(axis=1)
+    coverage = n_covered / max(1, len(confidence))
+    accuracy = np.divide(n_correct, n_covered, out=np.zeros(len(thresholds)), where=n_covered > 0)
+    return coverage, accuracy
+
+
+def top_confusions(cm, n=10):
+    """대각선을 뺀 혼동 행렬에서 가장 많이 헷갈린 (정답, 예측, 개수) n개를 반환합니다."""
+    off = cm.copy()
+    np.fill_diagonal(off, 0)
+    flat = off.ravel()
+    n = min(n, int(np.count_nonzero(flat)))
+    if n == 0:
+        return []
+    top = np.argpartition(flat, -n)[-n:]
+    top = top[np.argsort(flat[top])[::-1]]
+    rows, cols = np.divmod(top, cm.shape[1])
+    return [(int(r), int(c), int(flat[t])) for r, c, t in zip(rows, cols, top)]
+
+
+def compute_report(true_idx, topk_idx, topk_conf, num_classes, n_bins=DEFAULT_CALIBRATION_BINS):
+    """수집한 배열로 전체 지표를 계산합니다."""
+    pred_idx = topk_idx[:, 0]
+    correct = pred_idx == true_idx
+    cm = confusion_matrix(true_idx, pred_idx, num_classes)
+    support, precision, recall, f1 = per_class_metrics(cm)
+    present = support > 0
+    return {
+        'total': int(len(true_idx)),
+        'top1_accuracy': topk_accuracy(true_idx, topk_idx, 1),
+        'top5_accuracy': topk_accuracy(true_idx, topk_idx, topk_idx.shape[1]),
+        'confusion_matrix': cm,
+        'support': support,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'macro_f1': float(f1[present].mean() * 100) if present.any() else 0.0,
+        'calibration': calibration_bins(topk_conf[:, 0].astype(np.float64), correct, n_bins),
+    }
+
+
+def save_metrics(path, true_idx, topk_idx, topk_conf, report, class_names):
+    """
+    예측 배열과 지표를 압축된 .npz 하나로 저장합니다.
+    혼동 행렬은 0이 아닌 칸만 (행, 열, 개수)로 저장해 클래스가 많아도 작게 유지합니다.
+    """
+    cm = report['confusion_matrix']
+    rows, cols = np.nonzero(cm)
+    calib = report['calibration']
+    np.savez_compressed(
+        path,
+        version=METRICS_FORMAT_VERSION,
+        class_names=np.array(class_names),
+        true_idx=true_idx,
+        topk_idx=topk_idx,
+        topk_conf=topk_conf.astype(np.float16),
+        cm_rows=rows.astype(np.int32),
+        cm_cols=cols.astype(np.int32),
+        cm_counts=cm[rows, cols].astype(np.int32),
+        support=report['support'],
+        precision=report['precision'],
+        recall=report['recall'],
+        f1=report['f1'],
+        calib_edges=calib['edges'],
+        calib_counts=calib['counts'],
+        calib_mean_conf=calib['mean_conf'],
+        calib_accuracy=calib['accuracy'],
+    )
+
+
+def load_metrics(path):
+    """save_metrics()로 저장한 파일을 읽어 (배열 딕셔너리, 밀집 혼동 행렬)을 반환합니다."""
+    with np.load(path) as data:
+        arrays = {k: data[k] for k in data.files}
+    num_classes = len(arrays['class_names'])
+    cm = np.zeros((num_classes, num_classes), dtype=np.int64)
+    cm[arrays['cm_rows'], arrays['cm_cols']] = arrays['cm_counts']
+    return arrays, cm
@@ -0,0 +1,143 @@
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from PIL import ImageDraw, ImageFont
+from inference_engine import decode_image
+
+# --------------------------------------------------
+# ✅ 기본 설정
+# --------------------------------------------------
+RENDER_MODES = ('none', 'errors', 'all')  # 저장 안 함 / 오답만 저장 / 전부 저장
+DEFAULT_RENDER_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+DEFAULT_MAX_OUTPUT_SIZE = 1024   # 저장 이미지의 긴 변 최대 크기 (None이면 원본 크기)
+DEFAULT_JPEG_QUALITY = 85
+DEFAULT_QUEUE_SIZE = 256         # 렌더링 대기열 최대 길이 (메모리 보호용)
+# --------------------------------------------------
+
+_worker_font = None
+
+
+def _init_worker(font_path, font_size):
+    """렌더링 프로세스마다 폰트를 한 번만 로드합니다."""
+    global _worker_font
+    try:
+        _worker_font = ImageFont.truetype(font_path, font_size)
+    except (IOError, TypeError, AttributeError):  # font_path=None이면 Pillow 버전에 따라 AttributeError
+        _worker_font = ImageFont.load_default()
+
+
+def draw_top5_box(img, text_lines, font):
+    """이미지 왼쪽 위에 반투명 박스와 top-5 텍스트를 그립니다. text_lines는 (텍스트, 색상) 목록입니다."""
+    draw = ImageDraw.Draw(img)
+
+    text_height_per_line = font.getbbox("Tg")[3] - font.getbbox("Tg")[1]
+    total_text_height = len(text_lines) * (text_height_per_line + 2)
+
+    box_start_x, box_start_y = 10, 10
+    box_end_x = box_start_x + 250
+    box_end_y = box_start_y + total_text_height + 10
+
+    draw.rectangle([box_start_x, box_start_y, box_end_x, box_end_y], fill=(0, 0, 0, 128))
+
+    y_offset = box_start_y + 5
+    for text, color in text_lines:
+        draw.text((box_start_x + 5, y_offset), text, font=font, fill=color)
+        y_offset += (text_height_per_line + 2)
+    return img
+
+
+def render_overlay(image_path, save_path, text_lines, max_size=DEFAULT_MAX_OUTPUT_SIZE,
+                   jpeg_quality=DEFAULT_JPEG_QUALITY):
+    """원본 이미지를 열어 (필요하면 축소 후) top-5 박스를 그리고 저장합니다. 워커 프로세스에서 실행됩니다."""
+    font = _worker_font or ImageFont.load_default()
+    img = decode_image(image_path, display_size=max_size)
+    if max_size:
+        img.thumbnail((max_size, max_size))
+
+    draw_top5_box(img, text_lines, font)
+    img.save(save_path, quality=jpeg_quality)
+    return str(save_path)
+
+
+def should_render(mode, is_correct):
+    if mode == 'all':
+        return True
+    if mode == 'errors':
+        return not is_correct
+    return False
+
+
+class OverlayRenderer:
+    """
+    예측 결과를 대기열에 넣으면 별도 프로세스 풀이 오버레이 이미지를 그려 저장합니다.
+    추론 루프는 submit()만 호출하므로 렌더링 속도에 묶이지 않습니다.
+    """
+
+    def __init__(self, mode='all', font_path=None, font_size=16, max_size=DEFAULT_MAX_OUTPUT_SIZE,
+                 jpeg_quality=DEFAULT_JPEG_QUALITY, num_workers=DEFAULT_RENDER_WORKERS,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+        if mode not in RENDER_MODES:
+            raise ValueError(f"알 수 없는 렌더링 모드입니다: {mode} (가능한 값: {RENDER_MODES})")
+        self.mode = mode
+        self.max_size = max_size
+        self.jpeg_quality = jpeg_quality
+        self.rendered = 0
+        self.failed = []
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._pool = None
+        self._dispatcher = None
+        self._in_flight = threading.BoundedSemaphore(max(1, num_workers) * 2)
+
+        if mode != 'none':
+            self._pool = ProcessPoolExecutor(max_workers=max(1, num_workers),
+                                             initializer=_init_worker, initargs=(font_path, font_size))
+            self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+            self._dispatcher.start()
+
+    def submit(self, image_path, save_path, text_lines, is_correct):
+        """렌더링 모드에 해당하는 예측만 대기열에 넣습니다. 대기열이 가득 차면 잠시 기다립니다."""
+        if self._pool is None or not should_render(self.mode, is_correct):
+            return False
+        self._queue.put((image_path, save_path, text_lines))
+        return True
+
+    def _dispatch(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            image_path, save_path, text_lines = job
+            self._in_flight.acquire()
+            try:
+                future = self._pool.submit(render_overlay, image_path, save_path, text_lines,
+                                           self.max_size, self.jpeg_quality)
+            except Exception as e:
+                # 풀이 깨져도(BrokenProcessPool 등) 디스패처는 계속 대기열을 비워야 submit()/close()가 멈추지 않음
+                self._in_flight.release()
+                self.failed.append((image_path, e))
+                continue
+            future.add_done_callback(lambda f, p=image_path: self._on_done(f, p))
+
+    def _on_done(self, future, image_path):
+        self._in_flight.release()
+        try:
+            future.result()
+            self.rendered += 1
+        except Exception as e:
+            self.failed.append((image_path, e))
+
+    def close(self):
+        """대기 중인 렌더링 작업을 모두 마치고 프로세스 풀을 종료합니다."""
+        if self._pool is None:
+            return
+        self._queue.put(None)
+        self._dispatcher.join()
+        self._pool.shutdown(wait=True)
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
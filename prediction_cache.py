@@ -0,0 +1,401 @@
+import os
+import json
+import hashlib
+import threading
+import contextlib
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+from inference_engine import (DEFAULT_IMGSZ, DEFAULT_BATCH_SIZE, DEFAULT_PREFETCH_BATCHES, iter_image_batches,
+                              list_class_images, load_and_resize, predict_batch)
+from metrics_engine import topk_accuracy, threshold_sweep
+from file_lock import FileLock
+
+# --------------------------------------------------
+# ✅ 설정 부분 (python prediction_cache.py 로 실행하면 모델 없이 캐시만으로 분석)
+# --------------------------------------------------
+BASE_DIR = Path(__file__).resolve().parent
+
+# 예측 확률 캐시가 저장될 폴더 (모델/전처리 설정마다 하위 폴더가 하나씩 생깁니다)
+CACHE_ROOT = BASE_DIR.parent / "prediction_cache"
+
+MODEL_PATH = r"C:\Users\sega0\Desktop\code\runs\classify\test10\weights\best.pt"
+TEST_DATASET_PATH = r"C:\Users\sega0\Desktop\code\try\dataset\test"
+IMGSZ = DEFAULT_IMGSZ
+CONFIDENCE_THRESHOLDS = [0.0, 0.3, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95]
+HASH_WORKERS = 8
+# --------------------------------------------------
+
+# inference_engine.load_and_resize()의 동작이 바뀌면 올려서 이전 캐시를 쓰지 않도록 합니다.
+PREPROCESS_VERSION = 3  # 2: JPEG 축소 디코딩(draft) 적용, 3: load_for_display()도 imgsz 기준 배율로 디코딩
+CACHE_FORMAT_VERSION = 1
+
+_fingerprint_memo = {}
+
+
+def _sha1_update_file(h, path):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+
+
+def model_fingerprint(model_path):
+    """
+    모델 파일(또는 OpenVINO 폴더 안의 모든 파일) 내용의 sha1을 계산합니다.
+    같은 프로세스에서는 크기/수정 시각이 같으면 다시 계산하지 않습니다.
+    """
+    model_path = Path(model_path)
+    if model_path.suffix.lower() == '.xml':
+        model_path = model_path.parent
+    files = sorted(p for p in model_path.rglob('*') if p.is_file()) if model_path.is_dir() else [model_path]
+    stamp = (str(model_path.resolve()), tuple((str(p), p.stat().st_size, p.stat().st_mtime_ns) for p in files))
+    if stamp not in _fingerprint_memo:
+        h = hashlib.sha1()
+        for p in files:
+            h.update(p.relative_to(model_path).as_posix().encode() if model_path.is_dir() else b'')
+            _sha1_update_file(h, p)
+        _fingerprint_memo[stamp] = h.hexdigest()
+    return _fingerprint_memo[stamp]
+
+
+def preprocess_key(imgsz):
+    return f"short-side-bilinear-v{PREPROCESS_VERSION}|imgsz={imgsz}"
+
+
+def topk_from_probs(probs, k=5):
+    """확률 벡터 하나를 predict_batch()와 같은 형식(top1/top1conf/top5/top5conf)으로 바꿉니다."""
+    k = min(k, len(probs))
+    top = np.argpartition(probs, -k)[-k:]
+    top = top[np.argsort(probs[top])[::-1]]
+    return {
+        'top1': int(top[0]),
+        'top1conf': float(probs[top[0]]),
+        'top5': [int(i) for i in top],
+        'top5conf': [float(probs[i]) for i in top],
+    }
+
+
+class ImageKeyStore:
+    """
+    이미지 경로 -> (크기, 수정 시각, sha1) 기록입니다. 파일이 바뀌지 않았으면 다시 읽지 않고 내용 해시를 재사용합니다.
+    모든 모델의 캐시가 함께 사용합니다. 새로 해시한 이미지는 jsonl 파일에 한 줄씩 덧붙이므로
+    기록이 많아져도 파일 전체를 다시 쓰지 않습니다. (같은 경로가 여러 줄이면 마지막 줄이 유효)
+    여러 프로세스가 함께 쓰므로 덧붙이기/정리는 lock 파일을 잡고 합니다.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path) if path else None
+        self.entries = {}
+        if not self.path:
+            return
+        self._file_lock = FileLock(str(self.path) + '.lock')
+        with self._file_lock:
+            lines, good_end = 0, 0
+            if self.path.is_file():
+                with open(self.path, 'rb') as f:
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            break  # 기록 중 끊긴 마지막 줄
+                        try:
+                            path_str, size, mtime_ns, sha1 = json.loads(line)
+                        except ValueError:
+                            break
+                        good_end += len(line)
+                        lines += 1
+                        self.entries[path_str] = [size, mtime_ns, sha1]
+            if lines > 2 * len(self.entries) + 1000:
+                self._rewrite()  # 변경된 파일의 옛 줄이 쌓였으면 정리
+            elif self.path.is_file() and self.path.stat().st_size != good_end:
+                with open(self.path, 'r+b') as f:
+                    f.truncate(good_end)
+
+    def _rewrite(self):
+        """lock을 잡은 상태에서 호출합니다."""
+        tmp_path = Path(str(self.path) + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for path_str, entry in self.entries.items():
+                f.write(json.dumps([path_str, *entry], ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def key(self, src):
+        if hasattr(src, 'read_bytes') and not isinstance(src, (str, os.PathLike)):
+            return hashlib.sha1(src.read_bytes()).hexdigest()  # 샤드 샘플은 메모리에서 바로 해시
+        path = os.path.abspath(src)
+        st = os.stat(path)
+        known = self.entries.get(path)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2]
+        h = hashlib.sha1()
+        _sha1_update_file(h, path)
+        entry = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        self.entries[path] = entry
+        if self.path:
+            # 다른 프로세스가 정리(_rewrite)로 파일을 바꿔 놓았을 수 있으므로 매번 lock을 잡고 열어서 덧붙임
+            with self._file_lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps([path, *entry], ensure_ascii=False) + '\n')
+        return entry[2]
+
+
+class PredictionCache:
+    """
+    (모델 내용 해시, 이미지 내용 해시, 전처리 설정)별 클래스 확률을 디스크에 보관합니다.
+    확률은 float16 행을 이어 붙인 probs.f16 파일(memmap으로 읽음)에, 이미지 해시 -> 행 번호는 index.jsonl에 저장합니다.
+    두 파일 모두 뒤에 덧붙이기만 하므로 중간에 종료돼도 이미 기록된 행은 그대로 쓸 수 있습니다.
+    같은 캐시 폴더를 여러 프로세스/인스턴스가 함께 써도 되도록, put()은 폴더의 lock 파일을 잡고
+    다른 인스턴스가 덧붙인 index 줄을 먼저 읽은 뒤 probs.f16의 실제 끝에 이어 씁니다.
+    cache_root=None이면 임시 폴더를 사용하고 close()에서 지웁니다.
+    """
+
+    def __init__(self, model_path, num_classes=None, imgsz=DEFAULT_IMGSZ, cache_root=CACHE_ROOT, class_names=None):
+        self._temp_root = None
+        if cache_root is None:
+            cache_root = self._temp_root = tempfile.mkdtemp(prefix='prediction_cache_')
+        cache_root = Path(cache_root)
+        self.model_sha1 = model_fingerprint(model_path)
+        self.preprocess = preprocess_key(imgsz)
+        key = hashlib.sha1(f"{self.model_sha1}|{self.preprocess}".encode()).hexdigest()[:16]
+        self.dir = cache_root / key
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._file_lock = FileLock(self.dir / 'write.lock')
+
+        meta_path = self.dir / 'meta.json'
+        with self._file_lock:
+            if meta_path.is_file():
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    self.meta = json.load(f)
+            elif num_classes is None:
+                raise FileNotFoundError(f"'{Path(model_path).name}'({self.preprocess})에 대한 예측 캐시가 없습니다.")
+            else:
+                self.meta = {
+                    'version': CACHE_FORMAT_VERSION,
+                    'model_path': str(model_path),
+                    'model_sha1': self.model_sha1,
+                    'preprocess': self.preprocess,
+                    'num_classes': int(num_classes),
+                    'class_names': list(class_names) if class_names is not None else None,
+                }
+                with open(meta_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        self.num_classes = self.meta['num_classes']
+        self.class_names = self.meta['class_names']
+
+        self._probs_path = self.dir / 'probs.f16'
+        self._index_path = self.dir / 'index.jsonl'
+        self._row_bytes = self.num_classes * 2
+        self._rows = {}
+        self._index_pos = 0  # index.jsonl에서 읽은 바이트 수
+        self._n_rows = 0
+        self._lock = threading.RLock()
+        with self._file_lock:
+            self._sync()
+        self._mm = None
+        self._image_keys = ImageKeyStore(None if self._temp_root else cache_root / 'image_keys.jsonl')
+
+    def _sync(self):
+        """
+        lock을 잡은 상태에서, 아직 읽지 않은 index.jsonl 줄(다른 인스턴스가 덧붙인 것)을 읽어 들입니다.
+        기록 중 종료돼 남은 끊긴 꼬리는 잘라냅니다. index.jsonl은 마지막 온전한 줄까지, probs.f16은 index가 가리키는
+        마지막 행까지 남겨야 이후 put()이 깨진 줄/행 뒤에 이어 붙지 않습니다. (lock 안에서는 쓰는 중인 다른 인스턴스가 없음)
+        """
+        file_rows = (self._probs_path.stat().st_size // self._row_bytes) if self._probs_path.is_file() else 0
+        if self._index_path.is_file():
+            good_end = self._index_pos
+            with open(self._index_path, 'rb') as f:
+                f.seek(self._index_pos)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # 기록 중 끊긴 마지막 줄
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    if entry['row'] >= file_rows:
+                        break  # 확률 행이 기록되지 않은 항목
+                    good_end += len(line)
+                    self._rows[entry['key']] = entry['row']
+                    self._n_rows = max(self._n_rows, entry['row'] + 1)
+            if self._index_path.stat().st_size != good_end:
+                with open(self._index_path, 'r+b') as f:
+                    f.truncate(good_end)
+            self._index_pos = good_end
+        if self._probs_path.is_file() and self._probs_path.stat().st_size != self._n_rows * self._row_bytes:
+            with open(self._probs_path, 'r+b') as f:
+                f.truncate(self._n_rows * self._row_bytes)
+        self._mm = None  # 다음 읽기에서 늘어난 크기로 다시 매핑
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def image_key(self, src):
+        return self._image_keys.key(src)
+
+    def image_keys(self, sources, workers=HASH_WORKERS):
+        """이미지 목록의 내용 해시를 병렬로 계산합니다. 바뀌지 않은 파일은 기록된 해시를 재사용합니다."""
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            return list(pool.map(self.image_key, sources))
+
+    def _array(self):
+        if self._mm is None and self._n_rows:
+            self._mm = np.memmap(self._probs_path, dtype=np.float16, mode='r', shape=(self._n_rows, self.num_classes))
+        return self._mm
+
+    def get(self, key):
+        """캐시된 확률 벡터(float32)를 반환합니다. 없으면 None입니다."""
+        with self._lock:
+            row = self._rows.get(key)
+            return None if row is None else np.asarray(self._array()[row], dtype=np.float32)
+
+    def get_many(self, keys):
+        """여러 이미지의 확률을 (N, 클래스 수) 배열로 한 번에 읽습니다. 모든 키가 캐시에 있어야 합니다."""
+        with self._lock:
+            rows = np.fromiter((self._rows[k] for k in keys), dtype=np.int64, count=len(keys))
+            if len(rows) == 0:
+                return np.zeros((0, self.num_classes), dtype=np.float32)
+            return np.asarray(self._array()[rows], dtype=np.float32)
+
+    def put(self, keys, probs):
+        """(N, 클래스 수) 확률 배열을 추가합니다. 이미 있는 키(다른 인스턴스가 추가한 키 포함)는 건너뜁니다."""
+        probs = np.asarray(probs, dtype=np.float16).reshape(-1, self.num_classes)
+        with self._lock, self._file_lock:
+            self._sync()
+            new = dict((k, p) for k, p in zip(keys, probs) if k not in self._rows)
+            if not new:
+                return
+            start = (self._probs_path.stat().st_size // self._row_bytes) if self._probs_path.is_file() else 0
+            with open(self._probs_path, 'ab') as f:
+                f.write(np.stack(list(new.values())).tobytes())
+            with open(self._index_path, 'a', encoding='utf-8') as f:
+                for offset, k in enumerate(new):
+                    self._rows[k] = start + offset
+                    f.write(json.dumps({'key': k, 'row': start + offset}) + '\n')
+            self._n_rows = start + len(new)
+            self._index_pos = self._index_path.stat().st_size
+            self._mm = None
+
+    def close(self):
+        with self._lock:
+            self._mm = None
+        if self._temp_root:
+            shutil.rmtree(self._temp_root, ignore_errors=True)
+            self._temp_root = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_cache(model, model_path, imgsz, cache_root, cache):
+    """이미 열어 둔 캐시가 있으면 그대로(닫지 않음), 없으면 새로 열어 with 문에서 닫히도록 반환합니다."""
+    if cache is not None:
+        return contextlib.nullcontext(cache)
+    class_names = [model.names[i] for i in range(len(model.names))]
+    return PredictionCache(model_path, len(class_names), imgsz, cache_root, class_names)
+
+
+def predict_image_cached(model, model_path, image_path, imgsz=DEFAULT_IMGSZ, cache_root=CACHE_ROOT, image=None,
+                         cache=None, model_lock=None):
+    """
+    이미지 한 장을 예측합니다. 같은 모델/이미지의 예측이 캐시에 있으면 추론 없이 재사용합니다.
+    image에 이미 디코딩한 모델 입력(load_for_display() 결과 등)을 주면 파일을 다시 디코딩하지 않습니다.
+    cache에 열어 둔 PredictionCache를 주면 호출할 때마다 색인을 다시 읽지 않습니다. (GUI처럼 여러 번 호출하는 경우)
+    model_lock을 주면 추론하는 동안 잡습니다. (ultralytics 모델은 여러 스레드가 동시에 predict 하면 안 됨)
+    (predict_batch() 형식의 예측 결과, 캐시 적중 여부)를 반환합니다.
+    """
+    with _open_cache(model, model_path, imgsz, cache_root, cache) as cache:
+        key = cache.image_key(image_path)
+        probs = cache.get(key)
+        if probs is not None:
+            return topk_from_probs(probs), True
+        if image is None:
+            image = load_and_resize(image_path, imgsz)
+        with model_lock or contextlib.nullcontext():
+            pred = predict_batch(model, [image], imgsz=imgsz)[0]
+        cache.put([key], [pred['probs']])
+        return pred, False
+
+
+def iter_predictions_cached(model, model_path, image_paths, imgsz=DEFAULT_IMGSZ, batch_size=DEFAULT_BATCH_SIZE,
+                            prefetch_batches=DEFAULT_PREFETCH_BATCHES, cache_root=CACHE_ROOT, stop_event=None,
+                            cache=None, model_lock=None):
+    """
+    여러 이미지를 예측하며 (경로, 예측 결과, 캐시 적중 여부, 예외)를 한 장씩 바로 yield 합니다.
+    캐시에 있는 이미지를 먼저 내보내고, 나머지는 미리 디코딩한 배치 단위로 예측하면서 캐시에 추가합니다.
+    실패한 이미지는 예측 결과가 None이고 예외가 함께 전달됩니다. stop_event가 설정되면 다음 배치 전에 멈춥니다.
+    cache, model_lock은 predict_image_cached()와 같습니다. (model_lock은 배치마다 잡았다 놓음)
+    """
+    with _open_cache(model, model_path, imgsz, cache_root, cache) as cache:
+        key_of, misses = {}, []
+        for path in image_paths:
+            try:
+                key_of[path] = key = cache.image_key(path)
+            except OSError as e:
+                yield path, None, False, e
+                continue
+            probs = cache.get(key)
+            if probs is not None:
+                yield path, topk_from_probs(probs), True, None
+            else:
+                misses.append(path)
+
+        for paths, images, errors in iter_image_batches(misses, imgsz=imgsz, batch_size=batch_size,
+                                                        prefetch_batches=prefetch_batches):
+            if stop_event is not None and stop_event.is_set():
+                return
+            for path, err in errors:
+                yield path, None, False, err
+            try:
+                with model_lock or contextlib.nullcontext():
+                    predictions = predict_batch(model, images, imgsz=imgsz)
+            except Exception as e:
+                for path in paths:
+                    yield path, None, False, e
+                continue
+            cache.put([key_of[p] for p in paths], [pred['probs'] for pred in predictions])
+            for path, pred in zip(paths, predictions):
+                yield path, pred, False, None
+
+
+def main():
+    """모델을 불러오지 않고, 캐시된 예측 확률만으로 top-k 정확도와 신뢰도 임계값별 결과를 계산합니다."""
+    import pandas as pd  # GUI 등에서 이 모듈을 import할 때 pandas 로드 비용이 들지 않도록
+    try:
+        cache = PredictionCache(MODEL_PATH, imgsz=IMGSZ)
+    except FileNotFoundError as e:
+        print(f"❌ 오류: {e} evaluation.py를 먼저 실행하세요.")
+        return
+
+    with cache:
+        items = list_class_images(TEST_DATASET_PATH)
+        keys = cache.image_keys([p for p, _ in items])
+        cached = [(k, label) for k, (_, label) in zip(keys, items) if k in cache]
+        print(f"🗃️ 테스트 이미지 {len(items)}개 중 {len(cached)}개의 예측이 캐시에 있습니다.")
+        if not cached:
+            return
+
+        name_to_idx = {name: i for i, name in enumerate(cache.class_names)}
+        probs = cache.get_many([k for k, _ in cached])
+        true_idx = np.array([name_to_idx.get(label, -1) for _, label in cached], dtype=np.int64)
+        k = min(5, cache.num_classes)
+        topk_idx = np.argsort(-probs, axis=1)[:, :k]
+
+        print("\n📊 Top-k 정확도")
+        for i in range(1, k + 1):
+            print(f" - Top-{i}: {topk_accuracy(true_idx, topk_idx, i):.2f}%")
+
+        confidence = probs[np.arange(len(probs)), topk_idx[:, 0]]
+        coverage, accuracy = threshold_sweep(confidence, topk_idx[:, 0] == true_idx, CONFIDENCE_THRESHOLDS)
+        df = pd.DataFrame({'신뢰도 임계값': CONFIDENCE_THRESHOLDS, '적용 비율 (%)': coverage * 100,
+                           '정확도 (%)': accuracy * 100})
+        print("\n📈 신뢰도 임계값별 결과 (임계값 미만은 '판단 보류')")
+        print(df.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,16 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, scrolledtext
 from PIL import Image, ImageTk, ImageDraw, ImageFont
-from ultralytics import YOLO
+from inference_engine import load_for_display, load_model, IMAGE_EXTENSIONS
+from prediction_cache import PredictionCache, predict_image_cached, iter_predictions_cached
+from startup_timing import StartupTimer, import_ml_backend
 from pathlib import Path
+import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import threading
+import queue
+import time
 
 # --------------------------------------------------
 # ✨ 프로그램 설정
@@ -11,22 +18,134 @@ import threading
 FONT_PATH = "C:/Windows/Fonts/malgunbd.ttf"  # 윈도우 맑은 고딕 볼드
 DEFAULT_FONT_SIZE = 14
 PREDICTION_IMAGE_SIZE = (600, 600)  # GUI에 표시될 이미지 최대 크기
+MODEL_CACHE_SIZE = 3                # 메모리에 유지할 모델 개수 (LRU)
+WARMUP_IMAGE_SIZE = 384             # 워밍업용 더미 이미지 크기 (학습 imgsz와 동일)
+# 창을 먼저 띄운 뒤 백그라운드에서 ultralytics/torch를 불러오고, 마지막으로 사용한 모델을 미리 로드합니다.
+PRELOAD_LAST_MODEL = True
+SETTINGS_PATH = Path(__file__).resolve().parent / "predictor_app_settings.json"
+
+# 폴더(여러 이미지) 일괄 예측
+BATCH_PREDICTION_SIZE = 16          # 한 번의 forward에 넣을 이미지 수
+THUMBNAIL_SIZE = (400, 400)         # 표에서 선택한 이미지의 미리보기 크기
+THUMBNAIL_CACHE_SIZE = 200          # 메모리에 유지할 미리보기 개수 (LRU)
+UI_POLL_MS = 50                     # 작업 스레드 -> 화면 메시지를 확인하는 주기
+UI_MAX_MESSAGES_PER_POLL = 200      # 한 번에 처리할 최대 메시지 수 (결과가 몰려도 화면이 멈추지 않도록)
+
+# --------------------------------------------------
+# 🧠 모델 캐시 (클릭할 때마다 체크포인트를 다시 읽지 않도록)
+# --------------------------------------------------
+class ModelCache:
+    """(경로, 파일 수정 시각)을 키로 로드된 모델을 LRU 방식으로 보관합니다."""
+
+    def __init__(self, max_size=MODEL_CACHE_SIZE):
+        self.max_size = max_size
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}  # 키 -> 로딩 완료 이벤트 (같은 모델을 두 번 로드하지 않도록)
+        self._sessions = {}  # 키 -> (추론 잠금, 열어 둔 예측 캐시). 모델이 LRU에서 빠져도 유지
+        self.timings = {}   # 키 -> {'model_load': 초, 'first_inference': 초} (시작 시간 보고용)
+
+    @staticmethod
+    def make_key(model_path):
+        model_path = Path(model_path).resolve()
+        return (str(model_path), model_path.stat().st_mtime_ns)
+
+    def get(self, model_path):
+        """
+        캐시된 모델을 반환하고, 없으면 로드 + 워밍업 후 캐시에 넣습니다.
+        (모델, 로드 시간(초)) 튜플을 반환하며, 캐시 적중 시 로드 시간은 0입니다.
+        """
+        key = self.make_key(model_path)
+        while True:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key], 0.0
+                event = self._loading.get(key)
+                if event is None:
+                    event = self._loading[key] = threading.Event()
+                    break
+            # 다른 스레드가 같은 모델을 로드 중이면 끝날 때까지 기다렸다가 다시 확인
+            event.wait()
+
+        start = time.perf_counter()
+        try:
+            model = load_model(key[0])
+            loaded = time.perf_counter()
+            # 더미 이미지로 한 번 추론해 첫 예측의 초기화 비용을 미리 치릅니다.
+            model.predict(Image.new("RGB", (WARMUP_IMAGE_SIZE, WARMUP_IMAGE_SIZE)), verbose=False)
+            load_time = time.perf_counter() - start
+            self.timings[key] = {'model_load': loaded - start, 'first_inference': load_time - (loaded - start)}
+            with self._lock:
+                self._models[key] = model
+                self._models.move_to_end(key)
+                while len(self._models) > self.max_size:
+                    self._models.popitem(last=False)
+            return model, load_time
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+
+    def session(self, model_path, model):
+        """
+        모델마다 하나인 (추론 잠금, 예측 캐시)를 반환합니다. 단일 예측과 폴더 일괄 예측 스레드가 함께 씁니다.
+        ultralytics 모델은 동시에 predict 하면 안 되고, 예측 캐시는 한 폴더에 인스턴스 하나만 써야 하기 때문입니다.
+        """
+        key = self.make_key(model_path)
+        with self._lock:
+            if key not in self._sessions:
+                class_names = [model.names[i] for i in range(len(model.names))]
+                self._sessions[key] = (threading.Lock(), PredictionCache(key[0], len(class_names),
+                                                                         class_names=class_names))
+            return self._sessions[key]
+
+def load_settings():
+    try:
+        with open(SETTINGS_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_settings(**values):
+    try:
+        settings = {**load_settings(), **values}
+        with open(SETTINGS_PATH, 'w', encoding='utf-8') as f:
+            json.dump(settings, f, ensure_ascii=False, indent=2)
+    except OSError:
+        pass  # 설정 저장 실패는 무시 (다음 실행에서 미리 로드만 안 됨)
+
+_font_cache = {}
+
+def load_font(size=20):
+    """TrueType 폰트를 한 번만 로드하고 재사용합니다."""
+    if size not in _font_cache:
+        try:
+            _font_cache[size] = ImageFont.truetype(FONT_PATH, size)
+        except IOError:
+            _font_cache[size] = ImageFont.load_default()
+    return _font_cache[size]
 
 # --------------------------------------------------
 # 🎯 핵심 예측 로직 (기존 코드 기반)
 # --------------------------------------------------
-def perform_prediction(model_path, image_path):
-    """YOLO 모델로 이미지를 예측하고, 결과 텍스트와 시각화된 이미지를 반환합니다."""
+def perform_prediction(model, image_path, model_path, cache=None, model_lock=None):
+    """
+    로드된 YOLO 모델로 이미지를 예측하고, 결과 텍스트와 시각화된 이미지, 추론 시간(초), 캐시 적중 여부를 반환합니다.
+    같은 모델/이미지의 예측이 예측 캐시에 있으면 추론하지 않습니다. (cache, model_lock은 ModelCache.session() 값)
+    """
     try:
-        model = YOLO(model_path)
         true_label = image_path.parent.name
         
-        results = model.predict(image_path, verbose=False)
-        result = results[0]
+        start = time.perf_counter()
+        # 한 번만 디코딩(JPEG은 화면 크기에 맞춰 축소 디코딩)해 모델 입력과 화면 표시에 함께 사용
+        model_input, img = load_for_display(image_path, display_size=max(PREDICTION_IMAGE_SIZE))
+        pred, from_cache = predict_image_cached(model, model_path, image_path, image=model_input,
+                                                cache=cache, model_lock=model_lock)
+        infer_time = time.perf_counter() - start
 
         # 텍스트 결과 생성
-        pred_label = model.names[result.probs.top1]
-        pred_confidence = result.probs.top1conf.item()
+        pred_label = model.names[pred['top1']]
+        pred_confidence = pred['top1conf']
         is_correct = (true_label == pred_label)
         
         result_lines = []
@@ -36,25 +155,21 @@ def perform_prediction(model_path, image_path):
         result_lines.append(f"▶ 정답 여부: {'✅ 맞음' if is_correct else '❌ 틀림'}")
         result_lines.append("\n--- Top-5 예측 ---")
 
-        top5_indices = result.probs.top5
-        top5_confs = result.probs.top5conf
+        top5_indices = pred['top5']
+        top5_confs = pred['top5conf']
         for i, (idx, conf) in enumerate(zip(top5_indices, top5_confs)):
-            result_lines.append(f"{i+1}. {model.names[idx]} ({conf.item()*100:.1f}%)")
+            result_lines.append(f"{i+1}. {model.names[idx]} ({conf*100:.1f}%)")
         
         result_text = "\n".join(result_lines)
         
         # 이미지 시각화
-        img = Image.open(image_path).convert("RGB")
         draw = ImageDraw.Draw(img)
-        try:
-            font = ImageFont.truetype(FONT_PATH, 20)
-        except IOError:
-            font = ImageFont.load_default()
+        font = load_font(20)
 
         box_y = 10
         for i, (idx, conf) in enumerate(zip(top5_indices, top5_confs)):
             class_name = model.names[idx]
-            text = f"{i+1}. {class_name} ({conf.item()*100:.1f}%)"
+            text = f"{i+1}. {class_name} ({conf*100:.1f}%)"
             text_color = "lime" if class_name == true_label else "white"
             text_bbox = draw.textbbox((10, box_y), text, font=font)
             bg_bbox = [text_bbox[0]-5, text_bbox[1]-5, text_bbox[2]+5, text_bbox[3]+5]
@@ -62,22 +177,59 @@ def perform_prediction(model_path, image_path):
             draw.text((10, box_y), text, font=font, fill=text_color)
             box_y += text_bbox[3] - text_bbox[1] + 10
             
-        return result_text, img
+        return result_text, img, infer_time, from_cache
 
     except Exception as e:
-        return f"오류 발생:\n{e}", None
+        return f"오류 발생:\n{e}", None, 0.0, False
+
+def list_folder_images(folder):
+    """폴더(하위 폴더 포함) 안의 이미지 파일 목록을 경로 순으로 반환합니다."""
+    return sorted(p for p in Path(folder).rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS and p.is_file())
+
+def make_thumbnail(image_path, size=THUMBNAIL_SIZE):
+    """미리보기용으로 축소한 PIL 이미지를 만듭니다. (JPEG은 draft로 작은 크기로 바로 디코딩)"""
+    with Image.open(image_path) as img:
+        img.draft("RGB", size)
+        img = img.convert("RGB")
+    img.thumbnail(size)
+    return img
 
 # --------------------------------------------------
 # 💻 GUI 애플리케이션 클래스
 # --------------------------------------------------
+BATCH_COLUMNS = (
+    # (열 id, 제목, 너비, 정렬용 값 변환)
+    ('file', '파일', 220, str),
+    ('true', '실제 라벨', 130, str),
+    ('pred', '예측', 130, str),
+    ('conf', '신뢰도(%)', 80, float),
+    ('correct', '정답', 50, str),
+    ('source', '출처', 60, str),
+)
+
 class App:
     def __init__(self, root):
         self.root = root
         self.root.title("YOLO 이미지 분류기")
-        self.root.geometry("1000x700")
+        self.root.geometry("1100x750")
 
         self.model_path = tk.StringVar()
         self.image_path = tk.StringVar()
+        self.model_status = tk.StringVar(value="⏳ 라이브러리 로딩 중...")
+        self.batch_status = tk.StringVar(value="폴더 또는 여러 이미지를 선택하세요.")
+        self.model_cache = ModelCache()
+        self.timer = StartupTimer('predictor_app')
+        self.model_chosen = threading.Event()  # 사용자가 모델을 고르면 마지막 모델 미리 로드를 건너뜀
+
+        # 작업 스레드는 Tk 위젯을 직접 건드리지 않고 이 큐에 (종류, 값...) 메시지만 넣습니다.
+        self.ui_queue = queue.Queue()
+        self.batch_paths = []
+        self.batch_stop = None
+        self.batch_rows = {}  # 표 항목 id -> 이미지 경로
+        self.sort_state = {}  # 열 id -> 내림차순 여부
+        self.thumbnails = OrderedDict()  # 이미지 경로 -> 미리보기 PIL 이미지 (LRU)
+        self.thumbnail_pool = ThreadPoolExecutor(max_workers=2)
+        self.thumbnail_wanted = None
 
         # --- 위젯 생성 ---
         main_frame = ttk.Frame(root, padding="10")
@@ -87,33 +239,147 @@ class App:
         file_frame = ttk.LabelFrame(main_frame, text="파일 선택", padding="10")
         file_frame.pack(fill=tk.X, pady=5)
 
-        ttk.Button(file_frame, text="모델 파일 선택 (.pt)", command=self.select_model).pack(side=tk.LEFT, padx=5)
+        ttk.Button(file_frame, text="모델 파일 선택 (.pt/.onnx/.xml)", command=self.select_model).pack(side=tk.LEFT, padx=5)
         ttk.Label(file_frame, textvariable=self.model_path, wraplength=800).pack(side=tk.LEFT, fill=tk.X, expand=True)
-        
-        image_file_frame = ttk.LabelFrame(main_frame, text="이미지 선택", padding="10")
+        ttk.Label(file_frame, textvariable=self.model_status).pack(side=tk.RIGHT, padx=5)
+
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(fill=tk.BOTH, expand=True, pady=5)
+        single_tab = ttk.Frame(notebook, padding="5")
+        batch_tab = ttk.Frame(notebook, padding="5")
+        notebook.add(single_tab, text="단일 이미지")
+        notebook.add(batch_tab, text="폴더 일괄 예측")
+
+        # --- 단일 이미지 탭 ---
+        image_file_frame = ttk.LabelFrame(single_tab, text="이미지 선택", padding="10")
         image_file_frame.pack(fill=tk.X, pady=5)
-        
+
         ttk.Button(image_file_frame, text="이미지 파일 선택", command=self.select_image).pack(side=tk.LEFT, padx=5)
         ttk.Label(image_file_frame, textvariable=self.image_path, wraplength=800).pack(side=tk.LEFT, fill=tk.X, expand=True)
-        
+
         # 실행 버튼
-        self.predict_button = ttk.Button(main_frame, text="예측 실행", command=self.start_prediction)
+        self.predict_button = ttk.Button(single_tab, text="예측 실행", command=self.start_prediction)
         self.predict_button.pack(fill=tk.X, pady=10)
 
         # 결과 표시 프레임
-        result_frame = ttk.Frame(main_frame)
+        result_frame = ttk.Frame(single_tab)
         result_frame.pack(fill=tk.BOTH, expand=True, pady=5)
-        
+
         self.result_text = scrolledtext.ScrolledText(result_frame, wrap=tk.WORD, height=10, width=40, font=("맑은 고딕", 12))
         self.result_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
-        
+
         self.image_label = ttk.Label(result_frame, text="예측 결과 이미지가 여기에 표시됩니다.", style="TLabel")
         self.image_label.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5)
 
+        # --- 폴더 일괄 예측 탭 ---
+        batch_select_frame = ttk.Frame(batch_tab)
+        batch_select_frame.pack(fill=tk.X, pady=5)
+        ttk.Button(batch_select_frame, text="폴더 선택", command=self.select_folder).pack(side=tk.LEFT, padx=5)
+        ttk.Button(batch_select_frame, text="여러 이미지 선택", command=self.select_images).pack(side=tk.LEFT, padx=5)
+        self.batch_button = ttk.Button(batch_select_frame, text="일괄 예측 실행", command=self.start_batch_prediction)
+        self.batch_button.pack(side=tk.LEFT, padx=5)
+        self.stop_button = ttk.Button(batch_select_frame, text="중지", command=self.stop_batch_prediction, state=tk.DISABLED)
+        self.stop_button.pack(side=tk.LEFT, padx=5)
+
+        progress_frame = ttk.Frame(batch_tab)
+        progress_frame.pack(fill=tk.X, pady=5)
+        self.progress = ttk.Progressbar(progress_frame, mode='determinate')
+        self.progress.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        ttk.Label(progress_frame, textvariable=self.batch_status, width=45).pack(side=tk.RIGHT, padx=5)
+
+        batch_result_frame = ttk.Frame(batch_tab)
+        batch_result_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.tree = ttk.Treeview(batch_result_frame, columns=[c[0] for c in BATCH_COLUMNS], show='headings')
+        for col, title, width, _ in BATCH_COLUMNS:
+            self.tree.heading(col, text=title, command=lambda c=col: self.sort_tree(c))
+            self.tree.column(col, width=width, anchor=tk.W if col == 'file' else tk.CENTER)
+        self.tree.tag_configure('wrong', foreground='red')
+        self.tree.tag_configure('error', foreground='gray')
+        tree_scroll = ttk.Scrollbar(batch_result_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=tree_scroll.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        tree_scroll.pack(side=tk.LEFT, fill=tk.Y)
+        self.tree.bind('<<TreeviewSelect>>', self.on_tree_select)
+
+        self.thumbnail_label = ttk.Label(batch_result_frame, text="표에서 이미지를 선택하면\n미리보기가 표시됩니다.",
+                                         width=50, anchor=tk.CENTER)
+        self.thumbnail_label.pack(side=tk.RIGHT, fill=tk.BOTH, padx=5)
+
+        self.root.after(UI_POLL_MS, self.poll_ui_queue)
+        # 창이 그려진 직후를 기록하고, 무거운 import와 모델 로드는 백그라운드에서 진행
+        self.root.after_idle(self.timer.mark, 'window_shown')
+        threading.Thread(target=self.startup_thread, daemon=True).start()
+
+    def startup_thread(self):
+        """ultralytics(torch) import 후, 마지막으로 사용한 모델을 로드 + 워밍업해 둡니다."""
+        try:
+            with self.timer.stage('import'):
+                import_ml_backend()
+        except Exception as e:
+            self.ui_queue.put(('model_status', f"❌ 라이브러리 로드 실패: {e}"))
+            return
+        last_model = load_settings().get('last_model')
+        if not (PRELOAD_LAST_MODEL and last_model and Path(last_model).exists()) or self.model_chosen.is_set():
+            if not self.model_chosen.is_set():
+                self.ui_queue.put(('model_status', "모델 미선택"))
+            self.ui_queue.put(('startup_report',))
+            return
+
+        self.ui_queue.put(('last_model', last_model))
+        try:
+            self.model_cache.get(last_model)
+            for name, seconds in self.model_cache.timings.get(ModelCache.make_key(last_model), {}).items():
+                self.timer.add(name, seconds)
+            status = "✅ 마지막 사용 모델 준비 완료"
+        except Exception as e:
+            status = f"❌ 마지막 사용 모델 로드 실패: {e}"
+        self.timer.mark('model_ready')
+        if not self.model_chosen.is_set():
+            self.ui_queue.put(('model_status', status))
+        self.ui_queue.put(('startup_report',))
+
+    def on_last_model(self, path):
+        if not self.model_chosen.is_set():
+            self.model_path.set(path)
+            self.model_status.set("⏳ 마지막 사용 모델 로딩 중...")
+
+    def on_startup_report(self):
+        print(self.timer.report())
+        self.timer.save()
+
+    # --- 작업 스레드 -> 화면 메시지 처리 (메인 스레드) ---
+    def poll_ui_queue(self):
+        for _ in range(UI_MAX_MESSAGES_PER_POLL):
+            try:
+                kind, *args = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            getattr(self, f"on_{kind}")(*args)
+        self.root.after(UI_POLL_MS, self.poll_ui_queue)
+
+    def on_model_status(self, status):
+        self.model_status.set(status)
+
     def select_model(self):
-        path = filedialog.askopenfilename(title="모델 .pt 파일을 선택하세요", filetypes=[("PyTorch Model", "*.pt")])
+        path = filedialog.askopenfilename(
+            title="모델 파일을 선택하세요",
+            filetypes=[("PyTorch Model", "*.pt"), ("ONNX Model", "*.onnx"), ("OpenVINO Model (.xml)", "*.xml")],
+        )
         if path:
+            self.model_chosen.set()
             self.model_path.set(path)
+            save_settings(last_model=path)
+            # 선택 즉시 백그라운드에서 모델 로드 + 워밍업 시작
+            self.model_status.set("⏳ 모델 로딩 중...")
+            threading.Thread(target=self.preload_model_thread, args=(Path(path),), daemon=True).start()
+
+    def preload_model_thread(self, model_p):
+        try:
+            _, load_time = self.model_cache.get(model_p)
+            status = f"✅ 모델 준비 완료 ({load_time:.2f}초)" if load_time else "✅ 모델 준비 완료 (캐시)"
+        except Exception as e:
+            status = f"❌ 모델 로드 실패: {e}"
+        self.ui_queue.put(('model_status', status))
 
     def select_image(self):
         path = filedialog.askopenfilename(title="이미지 파일을 선택하세요", filetypes=[("Image Files", "*.jpg *.jpeg *.png *.bmp")])
@@ -128,32 +394,190 @@ class App:
 
         self.predict_button.config(state=tk.DISABLED, text="예측 중...")
         self.result_text.delete(1.0, tk.END)
-        self.result_text.insert(tk.END, "모델 로딩 및 예측 중...")
-        
+        self.result_text.insert(tk.END, "예측 중...")
+
         # GUI가 멈추지 않도록 별도의 스레드에서 예측 실행
-        threading.Thread(target=self.run_prediction_thread, daemon=True).start()
-        
-    def run_prediction_thread(self):
         model_p = Path(self.model_path.get())
         image_p = Path(self.image_path.get())
-        
-        result_text, visualized_img = perform_prediction(model_p, image_p)
+        threading.Thread(target=self.run_prediction_thread, args=(model_p, image_p), daemon=True).start()
+
+    def run_prediction_thread(self, model_p, image_p):
+        try:
+            model, load_time = self.model_cache.get(model_p)
+            model_lock, cache = self.model_cache.session(model_p, model)
+        except Exception as e:
+            self.ui_queue.put(('result', f"오류 발생:\n모델을 로드할 수 없습니다: {e}", None))
+            return
+
+        result_text, visualized_img, infer_time, from_cache = perform_prediction(model, image_p, model_p,
+                                                                                 cache, model_lock)
+        result_text += (f"\n\n--- 소요 시간 ---\n모델 로드: {load_time:.3f}초{' (캐시 사용)' if load_time == 0 else ''}"
+                        f"\n추론: {infer_time:.3f}초{' (예측 캐시 사용)' if from_cache else ''}")
+
+        if visualized_img:
+            visualized_img.thumbnail(PREDICTION_IMAGE_SIZE)  # 축소는 작업 스레드에서 미리 해 둠
+        self.ui_queue.put(('result', result_text, visualized_img))
 
+    def on_result(self, result_text, visualized_img):
         self.result_text.delete(1.0, tk.END)
         self.result_text.insert(tk.END, result_text)
-        
+
         if visualized_img:
-            visualized_img.thumbnail(PREDICTION_IMAGE_SIZE)
             photo = ImageTk.PhotoImage(visualized_img)
             self.image_label.config(image=photo)
             self.image_label.image = photo  # 참조 유지
-        
+
         self.predict_button.config(state=tk.NORMAL, text="예측 실행")
 
+    # --- 폴더 일괄 예측 ---
+    def select_folder(self):
+        folder = filedialog.askdirectory(title="이미지 폴더를 선택하세요")
+        if folder:
+            self.set_batch_paths(list_folder_images(folder), folder)
+
+    def select_images(self):
+        paths = filedialog.askopenfilenames(title="이미지 파일들을 선택하세요",
+                                            filetypes=[("Image Files", "*.jpg *.jpeg *.png")])
+        if paths:
+            self.set_batch_paths([Path(p) for p in paths], f"{len(paths)}개 파일")
+
+    def set_batch_paths(self, paths, source):
+        self.batch_paths = paths
+        self.batch_status.set(f"{source}: 이미지 {len(paths)}개 선택됨")
+
+    def start_batch_prediction(self):
+        if not self.model_path.get() or not self.batch_paths:
+            self.batch_status.set("오류: 모델과 이미지(폴더)를 모두 선택해야 합니다.")
+            return
+
+        self.tree.delete(*self.tree.get_children())
+        self.batch_rows.clear()
+        self.progress.config(maximum=len(self.batch_paths), value=0)
+        self.batch_status.set("⏳ 모델 준비 중...")
+        self.batch_button.config(state=tk.DISABLED)
+        self.stop_button.config(state=tk.NORMAL)
+
+        self.batch_stop = threading.Event()
+        args = (Path(self.model_path.get()), list(self.batch_paths), self.batch_stop)
+        threading.Thread(target=self.run_batch_thread, args=args, daemon=True).start()
+
+    def stop_batch_prediction(self):
+        if self.batch_stop is not None:
+            self.batch_stop.set()
+            self.batch_status.set("⏹️ 중지하는 중... (현재 배치까지 처리)")
+
+    def run_batch_thread(self, model_p, paths, stop_event):
+        """모델 하나로 모든 이미지를 배치 예측하고, 결과를 한 장씩 ui_queue로 보냅니다."""
+        try:
+            model, _ = self.model_cache.get(model_p)
+            model_lock, cache = self.model_cache.session(model_p, model)
+        except Exception as e:
+            self.ui_queue.put(('batch_done', f"❌ 모델을 로드할 수 없습니다: {e}"))
+            return
+
+        names = set(model.names.values())
+        start = time.perf_counter()
+        done = correct = labeled = 0
+        try:
+            for path, pred, from_cache, err in iter_predictions_cached(model, model_p, paths,
+                                                                        batch_size=BATCH_PREDICTION_SIZE,
+                                                                        stop_event=stop_event, cache=cache,
+                                                                        model_lock=model_lock):
+                done += 1
+                true_label = path.parent.name if path.parent.name in names else ''
+                if pred is None:
+                    row = (path.name, true_label or '-', f"오류: {err}", '', '', '')
+                    tag = 'error'
+                else:
+                    pred_label = model.names[pred['top1']]
+                    is_correct = true_label == pred_label if true_label else None
+                    labeled += is_correct is not None
+                    correct += bool(is_correct)
+                    mark = '' if is_correct is None else ('✅' if is_correct else '❌')
+                    row = (path.name, true_label or '-', pred_label, f"{pred['top1conf']*100:.1f}", mark,
+                           '캐시' if from_cache else '추론')
+                    tag = 'wrong' if is_correct is False else ''
+                elapsed = time.perf_counter() - start
+                self.ui_queue.put(('batch_row', path, row, tag, done, len(paths), done / elapsed if elapsed > 0 else 0.0))
+                if stop_event.is_set():
+                    break
+        except Exception as e:
+            self.ui_queue.put(('batch_done', f"❌ 예측 중 오류 발생: {e}"))
+            return
+
+        elapsed = time.perf_counter() - start
+        accuracy = f", 정확도 {correct / labeled * 100:.1f}% ({labeled}개 라벨)" if labeled else ""
+        status = "⏹️ 중지됨" if stop_event.is_set() else "✅ 완료"
+        self.ui_queue.put(('batch_done', f"{status}: {done}/{len(paths)}개, {elapsed:.1f}초{accuracy}"))
+
+    def on_batch_row(self, path, row, tag, done, total, rate):
+        iid = self.tree.insert('', tk.END, values=row, tags=(tag,) if tag else ())
+        self.batch_rows[iid] = path
+        self.progress.config(value=done)
+        self.batch_status.set(f"{done}/{total}개 처리 ({rate:.1f} images/sec)")
+
+    def on_batch_done(self, status):
+        self.batch_status.set(status)
+        self.batch_button.config(state=tk.NORMAL)
+        self.stop_button.config(state=tk.DISABLED)
+        self.batch_stop = None
+
+    def sort_tree(self, col):
+        """열 제목을 누르면 그 열 기준으로 정렬합니다. 다시 누르면 순서가 뒤집힙니다."""
+        convert = next(c[3] for c in BATCH_COLUMNS if c[0] == col)
+        descending = self.sort_state[col] = not self.sort_state.get(col, True)
+
+        def key(iid):
+            value = self.tree.set(iid, col)
+            try:
+                return (0, convert(value))
+            except ValueError:
+                return (1, value)  # 빈 값/오류는 항상 뒤로
+
+        items = sorted(self.tree.get_children(''), key=key, reverse=descending)
+        for index, iid in enumerate(items):
+            self.tree.move(iid, '', index)
+
+    def on_tree_select(self, _event):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        path = self.batch_rows[selection[0]]
+        self.thumbnail_wanted = path
+        if path in self.thumbnails:
+            self.thumbnails.move_to_end(path)
+            self.show_thumbnail(path, self.thumbnails[path])
+        else:
+            # 미리보기는 선택했을 때만 백그라운드에서 만듭니다.
+            self.thumbnail_pool.submit(self.load_thumbnail, path)
+
+    def load_thumbnail(self, path):
+        try:
+            img = make_thumbnail(path)
+        except Exception as e:
+            img = e
+        self.ui_queue.put(('thumbnail', path, img))
+
+    def on_thumbnail(self, path, img):
+        if isinstance(img, Exception):
+            if path == self.thumbnail_wanted:
+                self.thumbnail_label.config(image='', text=f"미리보기를 만들 수 없습니다:\n{img}")
+            return
+        self.thumbnails[path] = img
+        while len(self.thumbnails) > THUMBNAIL_CACHE_SIZE:
+            self.thumbnails.popitem(last=False)
+        if path == self.thumbnail_wanted:  # 그 사이 다른 항목을 선택했으면 표시하지 않음
+            self.show_thumbnail(path, img)
+
+    def show_thumbnail(self, path, img):
+        photo = ImageTk.PhotoImage(img)
+        self.thumbnail_label.config(image=photo, text='')
+        self.thumbnail_label.image = photo  # 참조 유지
+
 # --------------------------------------------------
 # 🚀 프로그램 실행
 # --------------------------------------------------
 if __name__ == "__main__":
     root = tk.Tk()
     app = App(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+from pathlib import Path
+import pandas as pd
+from metrics_engine import PredictionCollector
+
+# --------------------------------------------------
+# 📝 이미지별 예측 결과를 JSONL 파일에 바로 덧붙이는 기록기
+# --------------------------------------------------
+# 첫 줄은 실행 정보({"_meta": {...}}), 이후 한 줄에 이미지 하나씩 기록합니다.
+# 중간에 종료돼도 마지막 flush까지의 결과는 파일에 남고, resume으로 이어서 평가할 수 있습니다.
+DEFAULT_FLUSH_EVERY = 256        # 이만큼 기록할 때마다 디스크에 flush
+DEFAULT_FLUSH_SECONDS = 5.0      # 또는 마지막 flush 후 이 시간이 지나면 flush
+STREAM_FORMAT_VERSION = 1
+
+
+def record_id(image_path, true_label):
+    """'클래스/파일명' 형식의 이미지 식별자. 폴더 경로와 샤드 샘플 모두 같은 값이 됩니다."""
+    return f"{true_label}/{image_path.name}"
+
+
+def _scan_existing(path):
+    """기존 기록 파일의 (meta, 기록된 이미지 id 집합, 마지막으로 온전한 줄의 끝 위치)를 읽습니다."""
+    meta, ids, good_end = None, set(), 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # 기록 중 끊긴 마지막 줄
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            good_end += len(line)
+            if meta is None and '_meta' in entry:
+                meta = entry['_meta']
+            else:
+                ids.add(entry['id'])
+    return meta, ids, good_end
+
+
+def read_stream_info(path):
+    """기록 파일의 (meta, 기록된 이미지 id 집합)을 반환합니다."""
+    meta, ids, _ = _scan_existing(path)
+    return meta, ids
+
+
+def iter_records(path):
+    """기록 파일의 이미지별 결과를 한 줄씩 읽습니다. (파일 전체를 메모리에 올리지 않음)"""
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # 기록 중 끊긴 마지막 줄
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            if '_meta' not in entry:
+                yield entry
+
+
+class ResultStreamWriter:
+    """
+    평가 결과를 한 장씩 JSONL 파일에 덧붙입니다.
+    resume=True이고 같은 설정(meta)으로 기록된 파일이 있으면 이어서 쓰고, 이미 기록된 이미지 id를 recorded에 담습니다.
+    설정이 다르면(모델이 바뀐 경우 등) 기존 파일을 .prev로 옮기고 새로 시작합니다.
+    """
+
+    def __init__(self, path, meta, resume=True, flush_every=DEFAULT_FLUSH_EVERY, flush_seconds=DEFAULT_FLUSH_SECONDS):
+        self.path = Path(path)
+        self.meta = {'version': STREAM_FORMAT_VERSION, **meta}
+        self.flush_every = max(1, flush_every)
+        self.flush_seconds = flush_seconds
+        self.recorded = set()
+        self.resumed = False
+        self.written = 0
+
+        if self.path.is_file():
+            if resume:
+                old_meta, ids, good_end = _scan_existing(self.path)
+                if old_meta == self.meta:
+                    with open(self.path, 'r+b') as f:
+                        f.truncate(good_end)  # 끊긴 마지막 줄을 잘라내고 이어서 기록
+                    self.recorded = ids
+                    self.resumed = True
+            if not self.resumed:
+                os.replace(self.path, self.path.with_name(self.path.name + '.prev'))
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if not self.resumed:
+            self._file.write(json.dumps({'_meta': self.meta}, ensure_ascii=False) + '\n')
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def __contains__(self, rid):
+        return rid in self.recorded
+
+    def write(self, rid, true_label, pred_label, pred, is_correct):
+        """이미지 하나의 결과(top-5 번호와 신뢰도 포함)를 기록합니다."""
+        entry = {
+            'id': rid,
+            'label': true_label,
+            'pred': pred_label,
+            'conf': round(float(pred['top1conf']), 6),
+            'correct': bool(is_correct),
+            'top5': [int(i) for i in pred['top5']],
+            'top5conf': [round(float(c), 6) for c in pred['top5conf']],
+        }
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.recorded.add(rid)
+        self.written += 1
+        self._pending += 1
+        if self._pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def summarize_stream(path, class_names, all_classes=None, keep_ids=None):
+    """
+    기록 파일을 한 줄씩 읽어 클래스별 요약표(클래스, 총 이미지 수, 정답 수, 정확도)와
+    전체 지표 계산용 PredictionCollector를 만듭니다.
+    keep_ids를 주면 그 id의 기록만 집계합니다. (test 폴더에서 빠진 이미지의 예전 기록 제외)
+    """
+    name_to_idx = {name: i for i, name in enumerate(class_names)}
+    counts = {}  # 클래스명 -> [총 이미지 수, 정답 수]
+    collector = PredictionCollector(num_classes=len(class_names))
+    for entry in iter_records(path):
+        if keep_ids is not None and entry['id'] not in keep_ids:
+            continue
+        c = counts.setdefault(entry['label'], [0, 0])
+        c[0] += 1
+        c[1] += entry['correct']
+        collector.add(name_to_idx.get(entry['label'], -1), entry['top5'], entry['top5conf'])
+
+    # 예측된 이미지가 하나도 없는 클래스도 요약표에 포함
+    for class_name in all_classes or []:
+        counts.setdefault(class_name, [0, 0])
+    rows = [[label, total, correct, (correct / total * 100) if total > 0 else 0]
+            for label, (total, correct) in counts.items()]
+    df = pd.DataFrame(rows, columns=['클래스', '총 이미지 수', '정답 수', '정확도 (%)'])
+    return df, collector
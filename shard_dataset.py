@@ -0,0 +1,210 @@
+import io
+import os
+import json
+import mmap
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+
+# --------------------------------------------------
+# ✅ 설정 부분
+# --------------------------------------------------
+BASE_DIR = Path(__file__).resolve().parent
+
+# split_images_cls.py가 만든 데이터셋 폴더 (train/val/test)
+DATASET_PATH = BASE_DIR / "dataset"
+# 샤드 파일이 저장될 폴더 (dataset_shards/<split>/shard-00000.bin ...)
+SHARD_OUTPUT_PATH = BASE_DIR / "dataset_shards"
+
+SHARD_SIZE_MB = 512          # 샤드 파일 하나의 최대 크기
+READ_WORKERS = 16            # 원본 파일을 읽을 스레드 수
+READ_AHEAD = 64              # 기록을 기다리며 메모리에 들고 있을 최대 파일 수 (큰 파일이 많아도 메모리가 일정)
+SPLITS = ('train', 'val', 'test')
+# --------------------------------------------------
+
+SHARD_FORMAT_VERSION = 1
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp')
+INDEX_DTYPE = np.dtype([('cls', '<u4'), ('shard', '<u4'), ('offset', '<u8'), ('length', '<u4')])
+
+
+def _read_ahead(pool, fn, items, depth):
+    """pool.map처럼 순서대로 결과를 내주지만, 한 번에 최대 depth개만 미리 제출합니다."""
+    items = iter(items)
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= depth:
+            break
+    while pending:
+        result = pending.popleft().result()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            break
+        yield result
+
+
+def pack_split(split_dir, output_dir, shard_size_mb=SHARD_SIZE_MB, read_workers=READ_WORKERS, read_ahead=READ_AHEAD):
+    """
+    클래스 폴더 구조의 split 하나(train 등)를 몇 개의 큰 샤드 파일과 인덱스로 묶습니다.
+    인덱스는 샘플마다 (클래스, 샤드 번호, 오프셋, 길이)를 담은 index.npy와 meta.json으로 저장됩니다.
+    """
+    split_dir, output_dir = Path(split_dir), Path(output_dir)
+    classes = sorted(d.name for d in split_dir.iterdir() if d.is_dir())
+    files = []
+    for cls_idx, class_name in enumerate(classes):
+        with os.scandir(split_dir / class_name) as it:
+            names = sorted(e.name for e in it if e.is_file() and e.name.lower().endswith(IMAGE_SUFFIXES))
+        files.extend((cls_idx, class_name, name) for name in names)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for old in output_dir.glob('shard-*.bin'):
+        old.unlink()
+
+    shard_limit = shard_size_mb * 1024 * 1024
+    index = np.zeros(len(files), dtype=INDEX_DTYPE)
+    shard_names, shard_idx, offset = [], -1, 0
+    fout = None
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, read_workers)) as pool:
+            # 순서를 유지하며 병렬로 읽어 순차적으로 기록 (pool.map은 모든 파일을 한꺼번에 읽어 두므로 사용하지 않음)
+            datas = _read_ahead(pool, lambda f: (split_dir / f[1] / f[2]).read_bytes(), files,
+                                max(read_ahead, read_workers))
+            for i, ((cls_idx, _, _), data) in enumerate(zip(files, datas)):
+                if fout is None or (offset > 0 and offset + len(data) > shard_limit):
+                    if fout is not None:
+                        fout.close()
+                    shard_idx += 1
+                    shard_names.append(f"shard-{shard_idx:05d}.bin")
+                    fout = open(output_dir / shard_names[-1], 'wb')
+                    offset = 0
+                fout.write(data)
+                index[i] = (cls_idx, shard_idx, offset, len(data))
+                offset += len(data)
+    finally:
+        if fout is not None:
+            fout.close()
+
+    np.save(output_dir / 'index.npy', index)
+    meta = {
+        'version': SHARD_FORMAT_VERSION,
+        'classes': classes,
+        'shards': shard_names,
+        'names': [name for _, _, name in files],
+    }
+    with open(output_dir / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return len(files), len(shard_names), int(index['length'].sum())
+
+
+# 프로세스별 mmap 캐시 (DataLoader 워커/렌더링 프로세스마다 따로 열림)
+_mmaps = {}
+
+
+def _get_mmap(shard_path):
+    key = (os.getpid(), shard_path)
+    mm = _mmaps.get(key)
+    if mm is None:
+        with open(shard_path, 'rb') as f:
+            mm = _mmaps[key] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mm
+
+
+class ShardSample:
+    """
+    샤드 안의 이미지 하나를 가리키는 가벼운 참조입니다. Path처럼 name/read_bytes()를 제공하고
+    pickle이 가능하므로 다른 프로세스(렌더링 등)로 넘겨도 됩니다.
+    """
+    __slots__ = ('shard_path', 'offset', 'length', 'name', 'label')
+
+    def __init__(self, shard_path, offset, length, name, label):
+        self.shard_path = shard_path
+        self.offset = offset
+        self.length = length
+        self.name = name
+        self.label = label
+
+    def read_bytes(self):
+        return _get_mmap(self.shard_path)[self.offset:self.offset + self.length]
+
+    @property
+    def suffix(self):
+        return os.path.splitext(self.name)[1]
+
+    def __getstate__(self):
+        return tuple(getattr(self, k) for k in self.__slots__)
+
+    def __setstate__(self, state):
+        for k, v in zip(self.__slots__, state):
+            setattr(self, k, v)
+
+    def __eq__(self, other):
+        return isinstance(other, ShardSample) and self.__getstate__() == other.__getstate__()
+
+    def __hash__(self):
+        return hash((self.shard_path, self.offset))
+
+    def __repr__(self):
+        return f"ShardSample({self.label}/{self.name})"
+
+
+def as_image_source(src):
+    """Image.open()에 넘길 수 있는 형태로 바꿉니다. (경로는 그대로, 샤드 샘플은 메모리 버퍼로)"""
+    if isinstance(src, (str, os.PathLike)) or hasattr(src, 'read'):
+        return src
+    return io.BytesIO(src.read_bytes())
+
+
+class ShardReader:
+    """pack_split()으로 만든 split 하나를 mmap으로 읽습니다."""
+
+    def __init__(self, shard_dir):
+        self.shard_dir = Path(shard_dir)
+        with open(self.shard_dir / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != SHARD_FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 샤드 형식 버전입니다: {meta.get('version')}")
+        self.classes = meta['classes']
+        self.names = meta['names']
+        self.shard_paths = [str(self.shard_dir / s) for s in meta['shards']]
+        self.index = np.load(self.shard_dir / 'index.npy', mmap_mode='r')
+
+    def __len__(self):
+        return len(self.index)
+
+    def sample(self, i):
+        cls_idx, shard, offset, length = self.index[i]
+        return ShardSample(self.shard_paths[shard], int(offset), int(length), self.names[i], self.classes[cls_idx])
+
+    def read_bytes(self, i):
+        return self.sample(i).read_bytes()
+
+    def label_index(self, i):
+        return int(self.index[i]['cls'])
+
+    def items(self):
+        """evaluation.py 등에서 쓰는 (이미지 참조, 실제 라벨) 목록을 반환합니다."""
+        return [(s, s.label) for s in (self.sample(i) for i in range(len(self)))]
+
+
+def main():
+    if not DATASET_PATH.is_dir():
+        print(f"❌ 오류: '{DATASET_PATH}' 폴더를 찾을 수 없습니다. split_images_cls.py를 먼저 실행하세요.")
+        return
+
+    for split in SPLITS:
+        split_dir = DATASET_PATH / split
+        if not split_dir.is_dir():
+            print(f" - ⚠️ 경고: '{split}' 폴더가 없어 건너뜁니다.")
+            continue
+        print(f"▶ '{split}' 패킹 중...")
+        start = time.perf_counter()
+        n_files, n_shards, total_bytes = pack_split(split_dir, SHARD_OUTPUT_PATH / split)
+        print(f" - ✅ {n_files}개 이미지 → {n_shards}개 샤드 ({total_bytes / 1024**2:.1f}MB, {time.perf_counter() - start:.1f}초)")
+
+    print(f"\n✅ 샤드 데이터셋이 저장되었습니다: {SHARD_OUTPUT_PATH}")
+
+
+if __name__ == '__main__':
+    main()
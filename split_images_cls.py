@@ -1,8 +1,14 @@
+import os
 import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import pandas as pd
 import random
 import json
+from dataset_scanner import load_broken_files
+import image_hash_index
+from test_manifest import TestManifest
 
 # --------------------------------------------------
 # ✅ 설정 부분
@@ -18,98 +24,418 @@ NEW_DATASET_PATH = BASE_DIR / "dataset"
 
 # 추가 처리 대상을 정할 CSV 파일
 CSV_FILE_PATH = BASE_DIR / "종별이미지개수.csv"
-# Test 데이터를 고정할 JSON 파일
+# Test 데이터를 고정할 JSON 파일 (test_manifest.json이 없을 때 사용하는 기존 형식)
 PREDEFINED_TEST_JSON_PATH = BASE_DIR / "exclude_files.json"
+# 클래스별/내용 해시 기반 Test 매니페스트 (test_manifest.py로 생성). 있으면 이 파일을 우선 사용합니다.
+TEST_MANIFEST_PATH = BASE_DIR / "test_manifest.json"
+# (선택) dataset_scanner.py가 만든 파일별 메타데이터 표. 디코딩할 수 없는 이미지는 제외합니다.
+METADATA_CSV_PATH = BASE_DIR / "이미지메타데이터.csv"
 
 # 각종 옵션
 TRAIN_RATIO = 0.8
 NUM_TOP_CLASSES = 10
 RANDOM_SEED = 42
 
+# ✨ 데이터셋 생성 방식
+# 'copy'     : 기존처럼 실제 복사 (기본값)
+# 'hardlink' : 하드링크 (같은 디스크에서 가장 빠르고 용량을 차지하지 않음. ⚠️ dataset 안의 파일을 수정하면 원본도 바뀜)
+# 'reflink'  : 복사 후 쓰기(CoW) 복제 (btrfs/XFS 등 지원 파일시스템에서만. 수정해도 원본은 그대로)
+# 'symlink'  : 심볼릭 링크 (⚠️ 하드링크와 마찬가지로 수정하면 원본이 바뀜)
+# 링크를 만들 수 없으면(다른 디스크 등) 자동으로 복사로 대체합니다.
+MATERIALIZE_MODE = 'copy'
+INCREMENTAL = True      # True: 바뀐 파일만 추가/삭제, False: 기존처럼 dataset 폴더를 지우고 새로 생성
+DRY_RUN = False         # True: 실제로 파일을 건드리지 않고 계획만 출력
+SYNC_WORKERS = 8        # 파일 링크/복사에 사용할 스레드 수
+
+# ✨ 내용 기반 중복/누수 차단 (image_hash_index.py의 해시 인덱스 사용, 새 파일만 추가로 해시 계산)
+USE_HASH_INDEX = True
+HASH_INDEX_PATH = image_hash_index.HASH_INDEX_PATH
+NEAR_DUPLICATE_DISTANCE = image_hash_index.NEAR_DUPLICATE_DISTANCE  # dHash 해밍 거리 기준 (0이면 완전 동일만)
+
+# ✨ 클래스별 상한: 이미지가 많은 클래스의 train/val을 줄여 epoch 시간을 예측 가능하게 유지 (test는 그대로)
+MAX_IMAGES_PER_CLASS = None     # 클래스당 train+val 최대 개수 (None이면 제한 없음, 예: 800)
+CLASS_CAP_OVERRIDES = {}        # 클래스별 상한 예외 (예: {'Pica_serica': 1200})
+# 클래스별 샘플링 가중치 파일 (None이면 만들지 않음). train 개수에 반비례하고 평균이 1이 되도록 정규화합니다.
+SAMPLING_WEIGHTS_PATH = None   # 예: BASE_DIR / "class_sampling_weights.json"
+# 상한/중복 검사로 빠진 이미지 보고서 (split, 클래스, 파일, 원본 경로, 사유)
+DROPPED_REPORT_PATH = BASE_DIR / "split_dropped_report.csv"
+
 # --------------------------------------------------
 
-def create_combined_dataset(original_path, fixed_path, new_path, csv_path, json_path, num_top, train_ratio, random_seed):
+MATERIALIZE_MODES = ('hardlink', 'reflink', 'symlink', 'copy')
+FICLONE = 0x40049409  # linux/fs.h: 파일 단위 reflink ioctl
+
+
+def _reflink(src, dst):
+    import fcntl  # 리눅스 전용
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def materialize_file(src, dst, mode):
+    """src를 dst 위치에 지정한 방식으로 만들고, 실제로 사용한 방식을 반환합니다. 실패하면 복사로 대체합니다."""
+    if mode != 'copy':
+        try:
+            if mode == 'hardlink':
+                os.link(src, dst)
+            elif mode == 'symlink':
+                os.symlink(os.path.abspath(src), dst)
+            elif mode == 'reflink':
+                _reflink(src, dst)
+            return mode
+        except (OSError, ImportError):
+            if os.path.lexists(dst):
+                os.remove(dst)
+    shutil.copy2(src, dst)
+    return 'copy'
+
+
+def is_up_to_date(dst, src):
+    """dataset 안의 파일(dst)이 원본(src)과 같은 내용을 가리키는지 빠르게 확인합니다."""
+    try:
+        if os.path.islink(dst):
+            return os.readlink(dst) == os.path.abspath(src)
+        dst_stat, src_stat = os.stat(dst), os.stat(src)
+    except OSError:
+        return False
+    if (dst_stat.st_dev, dst_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+        return True
+    return dst_stat.st_size == src_stat.st_size and int(dst_stat.st_mtime) == int(src_stat.st_mtime)
+
+
+def list_files(root):
+    """root 아래의 모든 파일(링크 포함)을 root 기준 상대 경로(str) 집합으로 반환합니다."""
+    root = Path(root)
+    files = set()
+    if not root.is_dir():
+        return files
+    for dirpath, _, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        for filename in filenames:
+            files.add(os.path.normpath(os.path.join(rel_dir, filename)))
+    return files
+
+
+def compute_split_plan(original_path, fixed_path, csv_path, json_path, num_top, train_ratio, random_seed):
     """
-    새로운 순서에 따라 데이터셋을 생성하는 함수
-    1. 'other' 폴더를 'dataset'으로 먼저 복사
-    2. CSV 목록의 클래스에 대해 Test 데이터 생성 및 Train/Val 데이터 추가
+    최종 dataset 폴더의 목표 구성을 계산합니다.
+    {dataset 기준 상대 경로: 원본 파일 경로} 딕셔너리와 클래스별 요약 목록을 반환합니다.
+    같은 입력과 RANDOM_SEED에 대해 항상 같은 결과가 나오도록 파일 목록을 정렬한 뒤 섞습니다.
     """
-    random.seed(random_seed)
-    
-    # --- 1단계: 'other' 폴더를 'dataset'의 기본 베이스로 복사 ---
-    print("--- 1단계: 'other' 폴더를 'dataset'으로 초기 복사 시작 ---")
-    if new_path.exists():
-        shutil.rmtree(new_path)
-        print(f" - 기존 '{new_path.name}' 폴더 삭제 완료.")
-        
-    try:
-        shutil.copytree(fixed_path, new_path)
-        print(f"✅ '{fixed_path.name}' 폴더를 '{new_path.name}'(으)로 복사 완료.")
-    except FileNotFoundError:
-        print(f" - ⚠️ 경고: '{fixed_path.name}' 폴더를 찾을 수 없어 빈 'dataset' 폴더를 생성합니다.")
-        new_path.mkdir()
-
-    # --- 2단계 & 3단계: CSV/JSON 정보로 Test 생성 및 Train/Val 추가 ---
-    print("\n--- 2 & 3단계: CSV 목록 기준으로 데이터 추가 작업 시작 ---")
-    
-    try:
+    rng = random.Random(random_seed)
+    plan = {}
+
+    # --- 1단계: 'other' 폴더 구성을 그대로 기본 베이스로 사용 ---
+    if Path(fixed_path).is_dir():
+        for rel in sorted(list_files(fixed_path)):
+            plan[rel] = Path(fixed_path) / rel
+        print(f"✅ '{Path(fixed_path).name}' 폴더에서 {len(plan)}개의 기본 파일을 계획에 포함했습니다.")
+    else:
+        print(f" - ⚠️ 경고: '{Path(fixed_path).name}' 폴더를 찾을 수 없어 빈 'dataset' 폴더에서 시작합니다.")
+
+    # --- 2단계 & 3단계: 매니페스트(또는 JSON)/CSV 정보로 Test 생성 및 Train/Val 추가 ---
+    manifest = TestManifest.load(TEST_MANIFEST_PATH)
+    if manifest is not None:
+        print(f"✅ '{TEST_MANIFEST_PATH.name}'에서 {len(manifest.names_by_class)}개 클래스, {len(manifest)}개의 고정 Test 이미지를 불러왔습니다.")
+    else:
         with open(json_path, 'r', encoding='utf-8') as f:
-            test_files_set = set(json.load(f)['exclude'])
-        print(f"✅ '{json_path.name}' 파일에서 {len(test_files_set)}개의 고정 Test 이미지 목록을 불러왔습니다.")
-    except Exception as e:
-        print(f"❌ Test 목록 파일('{json_path.name}') 처리 중 오류: {e}")
-        return
+            test_files_set = frozenset(json.load(f)['exclude'])
+        print(f"✅ '{Path(json_path).name}' 파일에서 {len(test_files_set)}개의 고정 Test 이미지 목록을 불러왔습니다.")
 
-    try:
-        df = pd.read_csv(csv_path)
-        top_folders = df.nlargest(num_top, 'file_count')['folder'].tolist()
-        print(f"✅ CSV 파일에서 추가 처리할 상위 {num_top}개 폴더를 선정했습니다.")
-        print(" - 대상 폴더:", top_folders)
-    except Exception as e:
-        print(f"❌ CSV 파일 처리 중 오류: {e}")
-        return
+    df = pd.read_csv(csv_path)
+    top_folders = df.nlargest(num_top, 'file_count')['folder'].tolist()
+    print(f"✅ CSV 파일에서 추가 처리할 상위 {num_top}개 폴더를 선정했습니다.")
+    print(" - 대상 폴더:", top_folders)
 
-    train_path = new_path / 'train'
-    val_path = new_path / 'val'
-    test_path = new_path / 'test'
-    train_path.mkdir(exist_ok=True)
-    val_path.mkdir(exist_ok=True)
-    test_path.mkdir(exist_ok=True)
+    broken_files = load_broken_files(METADATA_CSV_PATH)
+    if broken_files:
+        print(f"✅ 메타데이터 표에서 디코딩할 수 없는 이미지 {len(broken_files)}개를 제외 대상으로 불러왔습니다.")
 
+    summary = []
     for class_name in top_folders:
-        print(f"\n▶ '{class_name}' 클래스 추가 처리 중...")
-        class_dir = original_path / class_name
-        
+        class_dir = Path(original_path) / class_name
         if not class_dir.is_dir():
             print(f" - ⚠️ 경고: 원본 폴더 '{class_dir}'를 찾을 수 없어 건너뜁니다.")
             continue
 
-        # train/val/test 각 클래스 폴더가 없으면 생성 (덮어쓰기가 아닌 추가이므로)
-        (train_path / class_name).mkdir(exist_ok=True)
-        (val_path / class_name).mkdir(exist_ok=True)
-        (test_path / class_name).mkdir(exist_ok=True)
-
-        # Test 데이터 분리
-        all_images = list(class_dir.glob('*.*'))
-        predefined_test_images = [img for img in all_images if img.name in test_files_set]
-        remaining_images = [img for img in all_images if img.name not in test_files_set]
-        
-        # Test 이미지 복사
-        for img in predefined_test_images:
-            shutil.copy(img, test_path / class_name)
-
-        # 나머지 이미지로 Train/Val 데이터 추가 분할
-        random.shuffle(remaining_images)
+        # 파일시스템마다 glob 순서가 다르므로 정렬 후 분할해야 결과가 재현됩니다.
+        # 클래스 폴더를 한 번만 읽고, 매니페스트가 있으면 해당 클래스의 Test 목록과만 비교
+        class_test_names = manifest.names(class_name) if manifest is not None else test_files_set
+        predefined_test_images, remaining_images = [], []
+        for img in sorted(class_dir.glob('*.*')):
+            if (class_name, img.name) in broken_files:
+                continue
+            (predefined_test_images if img.name in class_test_names else remaining_images).append(img)
+
+        rng.shuffle(remaining_images)
         split_point = int(len(remaining_images) * train_ratio)
         train_images = remaining_images[:split_point]
         val_images = remaining_images[split_point:]
 
-        for img in train_images:
-            shutil.copy(img, train_path / class_name)
-        for img in val_images:
-            shutil.copy(img, val_path / class_name)
-        
-        print(f" - ✅ 처리 완료: Test({len(predefined_test_images)}개), Train({len(train_images)}개), Val({len(val_images)}개) 이미지 추가.")
+        for split, images in (('test', predefined_test_images), ('train', train_images), ('val', val_images)):
+            for img in images:
+                plan[os.path.join(split, class_name, img.name)] = img
+        summary.append((class_name, len(predefined_test_images), len(train_images), len(val_images)))
+
+    return plan, summary, manifest
+
+
+def filter_plan_by_content(plan, lookup, max_distance=NEAR_DUPLICATE_DISTANCE, extra_test_sha1=frozenset()):
+    """
+    해시 인덱스로 계획을 정리합니다.
+    1. test 이미지와 내용이 같거나(sha1) 거의 같은(dHash) train/val 이미지를 제거 (파일명이 달라도 누수 차단)
+    2. train/val 안에서 내용이 완전히 같은 파일은 하나만 남김
+    3. 같은 클래스 안의 거의 같은 사진(재업로드/재압축본)은 하나만 남김
+    제거된 항목의 {상대 경로: 사유} 딕셔너리를 반환합니다.
+    """
+    dropped = {}
+    test_keys = [k for k in plan if k.split(os.sep, 1)[0] == 'test']
+    test_sha1 = {lookup[os.path.abspath(plan[k])][0] for k in test_keys if os.path.abspath(plan[k]) in lookup}
+    test_sha1 |= extra_test_sha1  # 매니페스트에 기록된 Test 이미지의 내용 해시
+    test_dhash = [h for k in test_keys for h in [lookup.get(os.path.abspath(plan[k]), (None, None))[1]] if h is not None]
+
+    candidates, unknown = [], 0
+    for key in sorted(plan):
+        if key.split(os.sep, 1)[0] == 'test':
+            continue
+        entry = lookup.get(os.path.abspath(plan[key]))
+        if entry is None:
+            unknown += 1
+        else:
+            candidates.append((key, entry[0], entry[1]))
+    if unknown:
+        print(f" - ⚠️ 해시 인덱스에 없는 파일 {unknown}개는 중복 검사 없이 포함합니다.")
+
+    # 1. test 누수 차단
+    with_dhash = [(k, h) for k, _, h in candidates if h is not None]
+    near_test = image_hash_index.near_duplicate_mask([h for _, h in with_dhash], test_dhash, max_distance)
+    near_test_keys = {k for (k, _), hit in zip(with_dhash, near_test) if hit}
+    remaining = []
+    for key, sha1, h in candidates:
+        if sha1 in test_sha1:
+            dropped[key] = 'test와 동일한 내용'
+        elif key in near_test_keys:
+            dropped[key] = 'test와 거의 같은 이미지'
+        else:
+            remaining.append((key, sha1, h))
+
+    # 2. 완전히 같은 파일 중복 제거 (정렬 순서상 처음 것만 남김)
+    seen, unique = set(), []
+    for key, sha1, h in remaining:
+        if sha1 in seen:
+            dropped[key] = '중복 파일'
+        else:
+            seen.add(sha1)
+            unique.append((key, h))
+
+    # 3. 클래스별 근접 중복 제거 (train/val을 함께 보아 둘 사이의 누수도 차단)
+    by_class = {}
+    for key, h in unique:
+        if h is not None:
+            by_class.setdefault(key.split(os.sep)[1], []).append((key, h))
+    for items in by_class.values():
+        kept = set(image_hash_index.dedupe_group([k for k, _ in items], [h for _, h in items], max_distance))
+        for key, _ in items:
+            if key not in kept:
+                dropped[key] = '거의 같은 이미지'
+
+    for key in dropped:
+        del plan[key]
+    return dropped
+
+
+def _sample_rank(random_seed, rel):
+    """시드와 파일 경로로 정해지는 순위. 파일이 추가/삭제돼도 나머지 파일의 선택 여부는 바뀌지 않습니다."""
+    return hashlib.sha1(f"{random_seed}|{rel}".encode('utf-8')).hexdigest()
+
+
+def cap_plan(plan, max_per_class=MAX_IMAGES_PER_CLASS, overrides=CLASS_CAP_OVERRIDES, random_seed=RANDOM_SEED):
+    """
+    클래스마다 train+val 이미지가 상한을 넘으면 train/val 비율을 유지한 채(층화) 결정적으로 골라 줄입니다.
+    test 이미지는 건드리지 않습니다. 제거된 항목의 {상대 경로: 사유} 딕셔너리와
+    {클래스: (줄이기 전 train 수, 줄인 후 train 수, 줄이기 전 val 수, 줄인 후 val 수)}를 반환합니다.
+    """
+    by_class = {}
+    for rel in plan:
+        split, class_name = rel.split(os.sep)[:2]
+        if split in ('train', 'val'):
+            by_class.setdefault(class_name, {'train': [], 'val': []})[split].append(rel)
+
+    dropped, stats = {}, {}
+    for class_name, splits in sorted(by_class.items()):
+        n_train, n_val = len(splits['train']), len(splits['val'])
+        cap = overrides.get(class_name, max_per_class)
+        if cap is None or n_train + n_val <= cap:
+            stats[class_name] = (n_train, n_train, n_val, n_val)
+            continue
+        keep_train = min(n_train, round(cap * n_train / (n_train + n_val)))
+        keep = {'train': keep_train, 'val': min(n_val, cap - keep_train)}
+        for split, rels in splits.items():
+            for rel in sorted(rels, key=lambda r: _sample_rank(random_seed, r))[keep[split]:]:
+                dropped[rel] = '클래스 상한 초과'
+        stats[class_name] = (n_train, keep['train'], n_val, keep['val'])
+
+    for rel in dropped:
+        del plan[rel]
+    return dropped, stats
+
+
+def write_sampling_weights(stats, path, max_per_class=MAX_IMAGES_PER_CLASS):
+    """클래스별 train 개수와 샘플링 가중치(개수에 반비례, 평균 1)를 JSON으로 저장합니다."""
+    counts = {c: kept for c, (_, kept, _, _) in stats.items() if kept > 0}
+    mean = sum(counts.values()) / len(counts) if counts else 0
+    classes = {c: {'train_available': stats[c][0], 'train': n, 'weight': round(mean / n, 6)}
+               for c, n in counts.items()}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'max_images_per_class': max_per_class, 'classes': classes}, f, ensure_ascii=False, indent=2)
+
+
+def write_dropped_report(dropped, sources, path):
+    """제외된 train/val 이미지 목록을 CSV로 저장합니다."""
+    rows = [{'split': rel.split(os.sep)[0], 'class': rel.split(os.sep)[1], 'file': os.path.basename(rel),
+             'source': str(sources[rel]), 'reason': reason} for rel, reason in sorted(dropped.items())]
+    pd.DataFrame(rows, columns=['split', 'class', 'file', 'source', 'reason']).to_csv(path, index=False, encoding='utf-8-sig')
+
+
+def diff_plan(plan, new_path):
+    """목표 구성과 현재 dataset 폴더를 비교해 (추가할 목록, 삭제할 목록, 그대로 둘 개수)를 반환합니다."""
+    existing = list_files(new_path)
+    to_add, unchanged = [], 0
+    for rel, src in sorted(plan.items()):
+        if rel in existing and is_up_to_date(Path(new_path) / rel, src):
+            unchanged += 1
+        else:
+            to_add.append(rel)
+    to_remove = sorted(existing - plan.keys())
+    return to_add, to_remove, unchanged
+
+
+def apply_plan(plan, new_path, to_add, to_remove, mode, num_workers=SYNC_WORKERS):
+    """계획에 따라 파일을 삭제/추가하고, 사용한 방식별 파일 수를 반환합니다."""
+    new_path = Path(new_path)
+    for rel in to_remove:
+        os.remove(new_path / rel)
+    # 비게 된 폴더 정리 (깊은 폴더부터)
+    for dirpath, dirnames, filenames in os.walk(new_path, topdown=False):
+        if dirpath != str(new_path) and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+    for rel in to_add:
+        (new_path / rel).parent.mkdir(parents=True, exist_ok=True)
+
+    def add(rel):
+        dst = new_path / rel
+        if os.path.lexists(dst):
+            os.remove(dst)
+        return materialize_file(plan[rel], dst, mode)
+
+    used = {}
+    with ThreadPoolExecutor(max_workers=max(1, num_workers)) as pool:
+        for used_mode in pool.map(add, to_add):
+            used[used_mode] = used.get(used_mode, 0) + 1
+
+    for split in ('train', 'val', 'test'):
+        (new_path / split).mkdir(parents=True, exist_ok=True)
+    return used
+
+
+def create_combined_dataset(original_path, fixed_path, new_path, csv_path, json_path, num_top, train_ratio, random_seed,
+                            mode=MATERIALIZE_MODE, incremental=INCREMENTAL, dry_run=DRY_RUN):
+    """
+    새로운 순서에 따라 데이터셋을 생성하는 함수
+    1. 'other' 폴더를 'dataset'의 기본 베이스로 사용
+    2. CSV 목록의 클래스에 대해 Test 데이터 생성 및 Train/Val 데이터 추가
+    3. 목표 구성을 현재 'dataset' 폴더와 비교해 바뀐 파일만 링크/복사 (incremental=True)
+    """
+    if mode not in MATERIALIZE_MODES:
+        print(f"❌ 알 수 없는 생성 방식입니다: {mode} (가능한 값: {MATERIALIZE_MODES})")
+        return
+
+    print("--- 1~3단계: 목표 데이터셋 구성 계산 ---")
+    try:
+        plan, summary, manifest = compute_split_plan(original_path, fixed_path, csv_path, json_path,
+                                                     num_top, train_ratio, random_seed)
+    except Exception as e:
+        print(f"❌ 데이터셋 구성 계산 중 오류: {e}")
+        return
+
+    for class_name, n_test, n_train, n_val in summary:
+        print(f" - ▶ '{class_name}': Test({n_test}개), Train({n_train}개), Val({n_val}개)")
+
+    sources = dict(plan)  # 제외 보고서에 원본 경로를 남기기 위해 필터링 전 구성을 보관
+    if USE_HASH_INDEX:
+        print("\n--- 내용 기반 중복/누수 검사 ---")
+        index_df, n_hashed = image_hash_index.update_index([original_path, fixed_path], HASH_INDEX_PATH,
+                                                           save=not dry_run)
+        print(f" - 해시 인덱스 {'계산 (DRY RUN: 저장 안 함)' if dry_run else '갱신'}: "
+              f"전체 {len(index_df)}개 중 {n_hashed}개 새로 계산")
+        dropped = filter_plan_by_content(plan, image_hash_index.to_lookup(index_df),
+                                         extra_test_sha1=manifest.sha1s if manifest is not None else frozenset())
+        reasons = {}
+        for reason in dropped.values():
+            reasons[reason] = reasons.get(reason, 0) + 1
+        print(f" - 제외된 train/val 이미지 {len(dropped)}개: {reasons or '없음'}")
+    else:
+        dropped = {}
+
+    if MAX_IMAGES_PER_CLASS is not None or CLASS_CAP_OVERRIDES:
+        print(f"\n--- 클래스별 상한 적용 (기본 {MAX_IMAGES_PER_CLASS}개, 예외 {len(CLASS_CAP_OVERRIDES)}개 클래스) ---")
+    capped, cap_stats = cap_plan(plan, MAX_IMAGES_PER_CLASS, CLASS_CAP_OVERRIDES, random_seed)
+    for class_name, (n_train, kept_train, n_val, kept_val) in cap_stats.items():
+        if (kept_train, kept_val) != (n_train, n_val):
+            print(f" - ✂️ '{class_name}': Train {n_train}→{kept_train}개, Val {n_val}→{kept_val}개")
+    if capped:
+        before = sum(s[0] for s in cap_stats.values())
+        after = sum(s[1] for s in cap_stats.values())
+        print(f" - epoch당 train 이미지: {before}개 → {after}개 ({after / before * 100 if before else 0:.1f}%)")
+    dropped.update(capped)
+
+    if SAMPLING_WEIGHTS_PATH:
+        if dry_run:
+            print(f" - (DRY RUN) 클래스별 샘플링 가중치 저장 위치: {SAMPLING_WEIGHTS_PATH}")
+        else:
+            write_sampling_weights(cap_stats, SAMPLING_WEIGHTS_PATH, MAX_IMAGES_PER_CLASS)
+            print(f" - 클래스별 샘플링 가중치 저장: {SAMPLING_WEIGHTS_PATH}")
+    if DROPPED_REPORT_PATH:
+        if dry_run:
+            print(f" - (DRY RUN) 제외된 이미지 {len(dropped)}개 보고서 저장 위치: {DROPPED_REPORT_PATH}")
+        else:
+            write_dropped_report(dropped, sources, DROPPED_REPORT_PATH)
+            print(f" - 제외된 이미지 {len(dropped)}개 보고서 저장: {DROPPED_REPORT_PATH}")
+
+    print(f"\n--- 4단계: '{Path(new_path).name}' 폴더와 비교 ---")
+    if incremental:
+        to_add, to_remove, unchanged = diff_plan(plan, new_path)
+    else:
+        existing = list_files(new_path)
+        to_add, to_remove, unchanged = sorted(plan), sorted(existing), 0
+    print(f" - 추가/갱신 {len(to_add)}개, 삭제 {len(to_remove)}개, 변경 없음 {unchanged}개 (방식: {mode})")
+
+    if dry_run:
+        print("\n🔎 DRY RUN: 실제 파일은 변경하지 않습니다.")
+        for rel in to_add[:20]:
+            print(f"   + {rel}  <-  {plan[rel]}")
+        if len(to_add) > 20:
+            print(f"   ... 외 {len(to_add) - 20}개 추가")
+        for rel in to_remove[:20]:
+            print(f"   - {rel}")
+        if len(to_remove) > 20:
+            print(f"   ... 외 {len(to_remove) - 20}개 삭제")
+        return plan
+
+    if not incremental and Path(new_path).exists():
+        shutil.rmtree(new_path)
+        print(f" - 기존 '{Path(new_path).name}' 폴더 삭제 완료.")
+        to_remove = []
+    Path(new_path).mkdir(parents=True, exist_ok=True)
+
+    used = apply_plan(plan, new_path, to_add, to_remove, mode)
+    if used.get('copy') and mode != 'copy':
+        print(f" - ⚠️ {used['copy']}개 파일은 '{mode}'을(를) 만들 수 없어 복사로 대체했습니다.")
+    added = ', '.join(f'{k} {v}개' for k, v in used.items()) or '추가 없음'
+    print(f"✅ 동기화 완료: {added}, 삭제 {len(to_remove)}개")
+    return plan
 
 # --------------------------------------------------
 
@@ -124,4 +450,4 @@ if __name__ == '__main__':
         TRAIN_RATIO,
         RANDOM_SEED
     )
-    print("\n✅ 모든 작업이 완료되었습니다.")
\ No newline at end of file
+    print("\n✅ 모든 작업이 완료되었습니다.")
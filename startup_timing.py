@@ -0,0 +1,73 @@
+import os
+import csv
+import time
+import contextlib
+from pathlib import Path
+
+# --------------------------------------------------
+# ⏱️ 시작 시간(cold start) 측정
+# --------------------------------------------------
+# 각 도구가 라이브러리 import / 모델 로드 / 첫 추론에 쓴 시간을 단계별로 기록합니다.
+# 실행할 때마다 startup_timing.csv에 한 줄씩(도구, 단계, 초) 덧붙이므로 도구가 늘어나도 추세를 볼 수 있습니다.
+BASE_DIR = Path(__file__).resolve().parent
+STARTUP_LOG_PATH = BASE_DIR / "startup_timing.csv"
+# --------------------------------------------------
+
+_MODULE_START = time.perf_counter()
+
+try:
+    import psutil  # 있으면 인터프리터 시작 시각부터 측정
+    _PROCESS_START = _MODULE_START - (time.time() - psutil.Process().create_time())
+except Exception:
+    _PROCESS_START = _MODULE_START
+
+
+def import_ml_backend():
+    """ultralytics(torch 포함)를 import 합니다. 이미 불러왔으면 바로 반환합니다."""
+    import ultralytics  # noqa: F401
+
+
+class StartupTimer:
+    """
+    단계별 소요 시간과 '프로세스 시작 후 몇 초에 도달했는지'(이정표)를 기록합니다.
+    여러 스레드에서 stage()/mark()를 호출해도 됩니다.
+    """
+
+    def __init__(self, tool):
+        self.tool = tool
+        self.stages = {}      # 단계 -> 소요 시간(초)
+        self.milestones = {}  # 이정표 -> 프로세스 시작 후 경과 시간(초)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def mark(self, name):
+        self.milestones.setdefault(name, time.perf_counter() - _PROCESS_START)
+
+    def report(self):
+        parts = [f"{name} {seconds:.2f}초" for name, seconds in self.stages.items()]
+        parts += [f"{name} @{seconds:.2f}초" for name, seconds in self.milestones.items()]
+        return f"⏱️ [{self.tool}] 시작 시간: " + (", ".join(parts) or "기록 없음")
+
+    def save(self, path=STARTUP_LOG_PATH):
+        """측정값을 CSV에 덧붙입니다. 저장에 실패해도 도구 실행에는 영향을 주지 않습니다."""
+        try:
+            new_file = not Path(path).is_file()
+            timestamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+            with open(path, 'a', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(['timestamp', 'tool', 'kind', 'name', 'seconds', 'pid'])
+                for kind, values in (('stage', self.stages), ('milestone', self.milestones)):
+                    for name, seconds in values.items():
+                        writer.writerow([timestamp, self.tool, kind, name, round(seconds, 4), os.getpid()])
+        except OSError as e:
+            print(f"⚠️ 시작 시간 기록 저장 실패: {e}")
@@ -0,0 +1,185 @@
+import os
+import sys
+import json
+import queue
+import itertools
+import subprocess
+import threading
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pandas as pd
+from Yolo_cls import BASE_DIR, DATASET_PATH, SAVE_PATH, USE_IMAGE_CACHE, get_next_experiment_name
+
+# --------------------------------------------------
+# ✅ 스윕 설정 (학습 결과는 Yolo_cls.py와 같은 SAVE_PATH/classify 아래에 저장)
+# --------------------------------------------------
+SWEEP_BASE_NAME = 'sweep'
+# 1) 격자 탐색: 각 값 목록의 모든 조합을 실행 (Yolo_cls.TRAIN_ARGS에 덮어씀)
+SWEEP_GRID = {
+    'lr0': [0.01, 0.003],
+    'mixup': [0.0, 0.3],
+}
+# 2) 또는 실행할 설정 목록을 직접 지정 (None이 아니면 SWEEP_GRID 대신 사용)
+SWEEP_CONFIGS = None  # 예: [{'lr0': 0.01}, {'lr0': 0.003, 'batch': 64}, {'model': 'yolov8s-cls.pt'}]
+
+MAX_CONCURRENT_JOBS = 2               # 동시에 실행할 학습 수
+TOTAL_CPU_CORES = os.cpu_count() or 1  # 스윕 전체가 사용할 CPU 코어 수 (작업마다 나눠서 배정)
+DEVICES = [0]                          # 작업 슬롯별로 돌아가며 배정할 장치 (예: [0, 1] 또는 ['cpu'])
+
+SWEEP_INDEX_PATH = SAVE_PATH / "classify" / "sweep_index.csv"
+# --------------------------------------------------
+
+INDEX_COLUMNS = ['experiment', 'status', 'params', 'device', 'cpu_cores', 'workers',
+                 'wall_seconds', 'epochs_run', 'best_epoch', 'best_top1', 'best_top5', 'final_top1']
+
+
+def expand_grid(grid):
+    """{'lr0': [a, b], 'batch': [c]} 를 [{'lr0': a, 'batch': c}, {'lr0': b, 'batch': c}] 로 펼칩니다."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def job_budget(total_cores, max_jobs):
+    """작업 하나에 줄 (CPU 코어 수, 데이터로더 워커 수). 학습 프로세스 자신에게 코어 하나를 남깁니다."""
+    cores = max(1, total_cores // max(1, max_jobs))
+    return cores, max(0, cores - 1)
+
+
+def slot_cores(slot, cores_per_job):
+    """
+    작업 슬롯마다 겹치지 않는 코어 번호 목록을 배정합니다.
+    CPU 고정(affinity)을 지원하지 않는 OS(Windows 등)에서는 빈 목록을 반환하고 스레드 수 제한만 적용합니다.
+    """
+    if not hasattr(os, 'sched_getaffinity'):
+        return []
+    available = sorted(os.sched_getaffinity(0))
+    start = (slot * cores_per_job) % len(available)
+    return sorted({available[(start + i) % len(available)] for i in range(cores_per_job)})
+
+
+def read_final_metrics(run_dir):
+    """ultralytics가 남긴 results.csv에서 최고/마지막 epoch의 top-1/top-5 정확도를 읽습니다."""
+    results_csv = Path(run_dir) / 'results.csv'
+    if not results_csv.is_file():
+        return {}
+    df = pd.read_csv(results_csv)
+    df.columns = [c.strip() for c in df.columns]
+    if df.empty or 'metrics/accuracy_top1' not in df:
+        return {}
+    best = df['metrics/accuracy_top1'].idxmax()
+    return {
+        'epochs_run': len(df),
+        'best_epoch': int(df.loc[best, 'epoch']) if 'epoch' in df else int(best) + 1,
+        'best_top1': float(df.loc[best, 'metrics/accuracy_top1']),
+        'best_top5': float(df.loc[best, 'metrics/accuracy_top5']) if 'metrics/accuracy_top5' in df else None,
+        'final_top1': float(df['metrics/accuracy_top1'].iloc[-1]),
+    }
+
+
+def run_job(experiment_name, params, cores, workers, device, cpu_list):
+    """
+    학습 하나를 별도 프로세스로 실행하고 끝날 때까지 기다립니다. 반환값은 색인에 들어갈 한 줄입니다.
+    스레드 수 환경 변수는 torch가 로드되기 전에 적용돼야 하므로 자식 프로세스를 새로 띄웁니다.
+    """
+    run_dir = SAVE_PATH / "classify" / experiment_name
+    env = dict(os.environ)
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        env[var] = str(cores)
+    job = {'experiment': experiment_name, 'params': params, 'cores': cores, 'workers': workers,
+           'device': device, 'cpu_list': cpu_list}
+
+    start = time.perf_counter()
+    with open(run_dir / 'sweep_job.log', 'w', encoding='utf-8') as log:
+        proc = subprocess.run([sys.executable, str(Path(__file__).resolve()), '--run-job', json.dumps(job)],
+                              cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    wall = time.perf_counter() - start
+
+    row = {'experiment': experiment_name, 'status': 'ok' if proc.returncode == 0 else f'failed({proc.returncode})',
+           'params': json.dumps(params, ensure_ascii=False), 'device': device, 'cpu_cores': cores,
+           'workers': workers, 'wall_seconds': round(wall, 1)}
+    row.update(read_final_metrics(run_dir))
+    return row
+
+
+def run_sweep(configs, max_jobs=MAX_CONCURRENT_JOBS, total_cores=TOTAL_CPU_CORES, devices=DEVICES,
+              base_name=SWEEP_BASE_NAME, index_path=SWEEP_INDEX_PATH):
+    """
+    설정 목록을 최대 max_jobs개씩 동시에 학습합니다.
+    작업이 하나 끝날 때마다 색인 CSV를 다시 써서, 중간에 멈춰도 끝난 실험의 결과는 남습니다.
+    """
+    cores, workers = job_budget(total_cores, max_jobs)
+    index_path = Path(index_path)
+    previous = pd.read_csv(index_path, encoding='utf-8-sig') if index_path.is_file() else pd.DataFrame(columns=INDEX_COLUMNS)
+    rows, rows_lock = [], threading.Lock()
+
+    # 작업 슬롯: 동시에 도는 작업끼리 장치/CPU 코어가 겹치지 않도록 슬롯 번호로 배정
+    free_slots = queue.Queue()
+    for slot in range(max_jobs):
+        free_slots.put(slot)
+
+    def worker(params):
+        # 폴더를 먼저 예약해 두므로 다른 스윕/Yolo_cls.py와 동시에 실행해도 이름이 겹치지 않습니다.
+        name = get_next_experiment_name(SAVE_PATH, base_name)
+        slot = free_slots.get()
+        try:
+            device = devices[slot % len(devices)]
+            cpu_list = slot_cores(slot, cores)
+            print(f"▶ [{name}] 시작: {params} (장치 {device}, CPU 코어 {cores}개, 워커 {workers}개)")
+            row = run_job(name, params, cores, workers, device, cpu_list)
+        finally:
+            free_slots.put(slot)
+        top1 = f"{row['best_top1']:.4f}" if row.get('best_top1') is not None else '-'
+        print(f"✅ [{name}] {row['status']} ({row['wall_seconds']:.0f}초) best top-1: {top1}")
+        with rows_lock:
+            rows.append(row)
+            df = pd.concat([previous, pd.DataFrame(rows)], ignore_index=True).reindex(columns=INDEX_COLUMNS)
+            df.to_csv(index_path, index=False, encoding='utf-8-sig')
+        return row
+
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    if USE_IMAGE_CACHE:
+        # 모든 작업이 같은 이미지 캐시를 쓰므로 시작 전에 한 번만 만들어 둡니다.
+        from image_cache import get_or_build_cache, describe
+        print(f"🗂️ {describe(get_or_build_cache(DATASET_PATH)[1])}")
+    with ThreadPoolExecutor(max_workers=max(1, max_jobs)) as pool:
+        list(pool.map(worker, configs))
+    return pd.DataFrame(rows, columns=INDEX_COLUMNS)
+
+
+def _run_job_in_child(job):
+    """자식 프로세스: CPU 예산을 적용한 뒤 Yolo_cls.train_experiment()로 학습합니다."""
+    if hasattr(os, 'sched_setaffinity') and job['cpu_list']:
+        os.sched_setaffinity(0, job['cpu_list'])
+    import torch
+    torch.set_num_threads(job['cores'])
+    from Yolo_cls import train_experiment
+    overrides = {**job['params'], 'workers': job['workers'], 'device': job['device']}
+    train_experiment(job['experiment'], overrides)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yolo_cls 하이퍼파라미터 스윕 실행기")
+    parser.add_argument('--run-job', help=argparse.SUPPRESS)  # 내부용: 작업 하나를 실행하는 자식 프로세스
+    parser.add_argument('--jobs', type=int, default=MAX_CONCURRENT_JOBS, help="동시에 실행할 학습 수")
+    parser.add_argument('--cores', type=int, default=TOTAL_CPU_CORES, help="스윕 전체가 사용할 CPU 코어 수")
+    args = parser.parse_args()
+
+    if args.run_job:
+        _run_job_in_child(json.loads(args.run_job))
+        return
+
+    configs = SWEEP_CONFIGS if SWEEP_CONFIGS is not None else expand_grid(SWEEP_GRID)
+    cores, workers = job_budget(args.cores, args.jobs)
+    print(f"🧪 총 {len(configs)}개 설정을 최대 {args.jobs}개씩 동시에 학습합니다. "
+          f"(작업당 CPU 코어 {cores}개, 데이터로더 워커 {workers}개)")
+    start = time.perf_counter()
+    results = run_sweep(configs, max_jobs=args.jobs, total_cores=args.cores)
+    print(f"\n\n{'='*60}\n🏆 스윕 결과 ({time.perf_counter() - start:.0f}초)\n{'='*60}")
+    print(results.sort_values('best_top1', ascending=False).to_string(index=False))
+    print(f"\n💾 실험 색인: {SWEEP_INDEX_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import os
+import json
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# --------------------------------------------------
+# ✅ 설정 부분
+# --------------------------------------------------
+BASE_DIR = Path(__file__).resolve().parent
+
+# 고정 Test 세트 폴더 (test/<클래스>/<이미지>)
+TEST_DATASET_PATH = Path(r'C:\Users\sega0\Desktop\code\try\dataset\test')
+# 생성할 매니페스트 파일 (exclude_files.json을 대체)
+TEST_MANIFEST_PATH = BASE_DIR / "test_manifest.json"
+
+HASH_WORKERS = 8
+# --------------------------------------------------
+
+MANIFEST_VERSION = 1
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+
+
+def _sha1_file(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def scan_class(class_dir, previous=None, map_fn=map):
+    """클래스 폴더 하나의 파일 목록을 만듭니다. 크기/수정 시각이 같은 파일은 이전 해시를 재사용합니다."""
+    known = {f['name']: f for f in (previous or {}).get('files', [])}
+    entries = []
+    with os.scandir(class_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_SUFFIXES):
+                st = entry.stat()
+                entries.append((entry.name, entry.path, st.st_size, st.st_mtime_ns))
+    entries.sort()
+
+    to_hash = [e for e in entries
+               if not (e[0] in known and known[e[0]]['size'] == e[2] and known[e[0]]['mtime_ns'] == e[3])]
+    hashes = dict(zip([e[0] for e in to_hash], map_fn(_sha1_file, [e[1] for e in to_hash])))
+
+    files = []
+    for name, _, size, mtime_ns in entries:
+        sha1 = hashes[name] if name in hashes else known[name]['sha1']
+        files.append({'name': name, 'path': f"{Path(class_dir).name}/{name}", 'size': size,
+                      'mtime_ns': mtime_ns, 'sha1': sha1})
+    return files, len(to_hash)
+
+
+def update_test_manifest(target_folder=TEST_DATASET_PATH, manifest_path=TEST_MANIFEST_PATH, workers=HASH_WORKERS):
+    """
+    test 폴더를 클래스별로 훑어 매니페스트를 갱신합니다.
+    폴더 수정 시각이 그대로인 클래스는 건너뛰므로, 바뀐 클래스 폴더만 다시 읽고 해시합니다.
+    (매니페스트 딕셔너리, 다시 읽은 클래스 수, 새로 해시한 파일 수)를 반환합니다.
+    """
+    target_folder = Path(target_folder)
+    old = load_manifest_dict(manifest_path)
+    old_classes = old['classes'] if old and old.get('root') == str(target_folder) else {}
+
+    classes, rescanned, hashed = {}, 0, 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        with os.scandir(target_folder) as it:
+            class_dirs = sorted((e.name, e.path, e.stat().st_mtime_ns) for e in it if e.is_dir())
+        for name, path, dir_mtime_ns in class_dirs:
+            previous = old_classes.get(name)
+            if previous and previous['dir_mtime_ns'] == dir_mtime_ns:
+                classes[name] = previous
+                continue
+            files, n_hashed = scan_class(path, previous, pool.map)
+            classes[name] = {'dir_mtime_ns': dir_mtime_ns, 'files': files}
+            rescanned += 1
+            hashed += n_hashed
+
+    manifest = {'version': MANIFEST_VERSION, 'root': str(target_folder), 'classes': classes}
+    tmp_path = Path(str(manifest_path) + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, manifest_path)
+    return manifest, rescanned, hashed
+
+
+def load_manifest_dict(manifest_path):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"지원하지 않는 매니페스트 버전입니다: {manifest.get('version')}")
+    return manifest
+
+
+class TestManifest:
+    """매니페스트를 클래스별 파일명 집합과 전체 내용 해시 집합으로 읽어 빠르게 조회합니다."""
+
+    def __init__(self, manifest):
+        self.names_by_class = {c: frozenset(f['name'] for f in info['files'])
+                               for c, info in manifest['classes'].items()}
+        self.sha1s = frozenset(f['sha1'] for info in manifest['classes'].values() for f in info['files'])
+
+    @classmethod
+    def load(cls, manifest_path=TEST_MANIFEST_PATH):
+        manifest = load_manifest_dict(manifest_path)
+        return cls(manifest) if manifest else None
+
+    def names(self, class_name):
+        return self.names_by_class.get(class_name, frozenset())
+
+    def __len__(self):
+        return sum(len(v) for v in self.names_by_class.values())
+
+
+def main():
+    if not TEST_DATASET_PATH.is_dir():
+        print(f"❌ 오류: '{TEST_DATASET_PATH}' 폴더를 찾을 수 없습니다. 경로를 다시 확인해주세요.")
+        return
+    start = time.perf_counter()
+    manifest, rescanned, hashed = update_test_manifest()
+    total = sum(len(info['files']) for info in manifest['classes'].values())
+    print(f"✅ 매니페스트 갱신 완료 ({time.perf_counter() - start:.2f}초): {len(manifest['classes'])}개 클래스, {total}개 파일")
+    print(f" - 다시 읽은 클래스 {rescanned}개, 새로 해시한 파일 {hashed}개")
+    print(f" -> {TEST_MANIFEST_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import numpy as np
+from embedding_index import EmbeddingIndex, blend_scores, normalize
+
+
+def _new_index(tmp_path, head_names=('a', 'b'), dim=3):
+    model_path = tmp_path / 'model.pt'
+    if not model_path.exists():
+        model_path.write_bytes(b'model')
+    return EmbeddingIndex(tmp_path / 'index', model_path, dim=dim, imgsz=32, class_names=list(head_names))
+
+
+def _hand_built(tmp_path):
+    """a, b는 분류기도 아는 클래스, c는 색인에만 추가한 새 종입니다."""
+    index = _new_index(tmp_path)
+    rows = {'a1.jpg': ('a', [1, 0, 0]), 'a2.jpg': ('a', [0.9, 0.1, 0]), 'b1.jpg': ('b', [0, 1, 0]),
+            'c1.jpg': ('c', [0, 0, 1]), 'c2.jpg': ('c', [0.1, 0, 0.9])}
+    index.add(list(rows), [label for label, _ in rows.values()], normalize(np.array([v for _, v in rows.values()])))
+    return index
+
+
+def test_knn_and_class_scores_find_index_only_class(tmp_path):
+    index = _hand_built(tmp_path)
+    assert index.class_names == ['a', 'b', 'c']
+    query = normalize(np.array([[0.05, 0, 1]]))
+
+    idx, sim = index.knn(query, k=2)
+    assert sorted(index.paths[i] for i in idx[0]) == ['c1.jpg', 'c2.jpg']
+    assert sim[0, 0] >= sim[0, 1]
+
+    knn = index.class_scores(query, 'knn', k=2)
+    np.testing.assert_allclose(knn, [[0, 0, 1]], atol=1e-6)
+    centroid = index.class_scores(query, 'centroid')
+    assert centroid.argmax() == 2
+    np.testing.assert_allclose(centroid.sum(axis=1), [1], atol=1e-6)
+
+
+def test_blend_scores_aligns_head_and_index_classes(tmp_path):
+    index = _hand_built(tmp_path)
+    index_scores = np.array([[0.0, 0.0, 1.0]], dtype=np.float32)
+    # 분류기 클래스 순서가 색인과 다르고, 색인에 없는 클래스 x도 있음
+    head_names = ['b', 'x', 'a']
+    head_probs = np.array([[0.6, 0.1, 0.3]])
+
+    combined, names = blend_scores(index, head_probs, head_names, index_scores, blend=0.5)
+    assert names == ['a', 'b', 'c', 'x']
+    np.testing.assert_allclose(combined, [[0.15, 0.3, 0.5, 0.05]], atol=1e-6)
+
+
+def test_two_writers_share_rows_and_classes(tmp_path):
+    first = _new_index(tmp_path)
+    second = EmbeddingIndex(tmp_path / 'index')
+    first.add(['p1.jpg'], ['new1'], [[1, 0, 0]])
+    second.add(['p2.jpg', 'p1.jpg'], ['new2', 'new1'], [[0, 1, 0], [0, 0, 1]])  # p1은 이미 추가됨
+
+    index = EmbeddingIndex(tmp_path / 'index')
+    assert index.class_names == ['a', 'b', 'new1', 'new2']
+    assert index.paths == ['p1.jpg', 'p2.jpg']
+    assert [index.class_names[i] for i in index.labels] == ['new1', 'new2']
+    np.testing.assert_array_equal(np.asarray(index.matrix()), [[1, 0, 0], [0, 1, 0]])
+
+
+def test_torn_tail_is_truncated_on_open(tmp_path):
+    index = _new_index(tmp_path)
+    index.add(['x.jpg'], ['a'], [[1, 0, 0]])
+    # 다음 add 도중 종료: 임베딩 행 절반과 끊긴 items 줄, 그리고 행 없이 기록된 줄
+    with open(index._emb_path, 'ab') as f:
+        f.write(np.asarray([0.5], dtype=np.float16).tobytes())
+    with open(index._items_path, 'a', encoding='utf-8') as f:
+        f.write('{"path": "y.jpg", "label": "b"}\n{"path": "z.jpg", "la')
+
+    index = EmbeddingIndex(tmp_path / 'index')
+    assert index.paths == ['x.jpg']
+    index.add(['w.jpg'], ['b'], [[0, 1, 0]])
+
+    index = EmbeddingIndex(tmp_path / 'index')
+    assert index.paths == ['x.jpg', 'w.jpg']
+    np.testing.assert_array_equal(np.asarray(index.matrix()), [[1, 0, 0], [0, 1, 0]])
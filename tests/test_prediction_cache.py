@@ -0,0 +1,88 @@
+import numpy as np
+from prediction_cache import PredictionCache
+
+
+def _open(tmp_path):
+    model_path = tmp_path / 'model.pt'
+    if not model_path.exists():
+        model_path.write_bytes(b'model')
+    return PredictionCache(model_path, num_classes=3, imgsz=32, cache_root=tmp_path / 'cache')
+
+
+def test_put_after_crash_with_torn_tail(tmp_path):
+    cache = _open(tmp_path)
+    cache.put(['k1'], [[0.1, 0.2, 0.7]])
+    cache.close()
+
+    # 두 번째 put 도중 종료: 확률 행은 절반만, index 줄은 끊긴 채로 남음
+    with open(cache._probs_path, 'ab') as f:
+        f.write(np.asarray([0.5], dtype=np.float16).tobytes())
+    with open(cache._index_path, 'a', encoding='utf-8') as f:
+        f.write('{"key": "k2", "ro')
+
+    cache = _open(tmp_path)
+    assert 'k1' in cache and 'k2' not in cache
+    cache.put(['k3'], [[0.6, 0.3, 0.1]])
+    cache.close()
+
+    cache = _open(tmp_path)
+    np.testing.assert_allclose(cache.get('k1'), [0.1, 0.2, 0.7], atol=1e-3)
+    np.testing.assert_allclose(cache.get('k3'), [0.6, 0.3, 0.1], atol=1e-3)
+    assert len(cache) == 2
+    assert cache._probs_path.stat().st_size == 2 * 3 * 2
+
+
+def test_orphan_probs_row_is_dropped(tmp_path):
+    cache = _open(tmp_path)
+    cache.put(['k1'], [[0.1, 0.2, 0.7]])
+    cache.close()
+
+    # 확률 행은 기록됐지만 index 줄을 쓰기 전에 종료
+    with open(cache._probs_path, 'ab') as f:
+        f.write(np.asarray([0.3, 0.3, 0.4], dtype=np.float16).tobytes())
+
+    cache = _open(tmp_path)
+    cache.put(['k2'], [[0.9, 0.05, 0.05]])
+    cache.close()
+
+    cache = _open(tmp_path)
+    np.testing.assert_allclose(cache.get('k2'), [0.9, 0.05, 0.05], atol=1e-3)
+
+
+def test_two_instances_on_one_directory(tmp_path):
+    a = _open(tmp_path)
+    b = _open(tmp_path)
+    a.put(['imgA'], [[1.0, 0.0, 0.0]])
+    b.put(['imgB'], [[0.0, 1.0, 0.0]])
+    b.put(['imgA'], [[0.0, 0.0, 1.0]])  # a가 이미 기록한 키는 건너뜀
+    a.put(['imgC'], [[0.0, 0.0, 1.0]])
+    a.close()
+    b.close()
+
+    cache = _open(tmp_path)
+    assert len(cache) == 3
+    np.testing.assert_allclose(cache.get('imgA'), [1, 0, 0])
+    np.testing.assert_allclose(cache.get('imgB'), [0, 1, 0])
+    np.testing.assert_allclose(cache.get('imgC'), [0, 0, 1])
+    assert cache._probs_path.stat().st_size == 3 * 3 * 2
+
+
+def test_image_keys_are_appended_and_reused(tmp_path):
+    from prediction_cache import ImageKeyStore
+
+    images = []
+    for i in range(3):
+        images.append(tmp_path / f'img_{i}.jpg')
+        images[-1].write_bytes(bytes([i]) * 10)
+    store_path = tmp_path / 'image_keys.jsonl'
+
+    store = ImageKeyStore(store_path)
+    first = [store.key(p) for p in images[:2]]
+    assert len(store_path.read_text(encoding='utf-8').splitlines()) == 2
+
+    store.key(images[2])  # 새 이미지는 한 줄만 덧붙임
+    assert len(store_path.read_text(encoding='utf-8').splitlines()) == 3
+
+    reopened = ImageKeyStore(store_path)
+    assert [reopened.key(p) for p in images[:2]] == first
+    assert len(store_path.read_text(encoding='utf-8').splitlines()) == 3
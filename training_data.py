@@ -0,0 +1,136 @@
+import abc
+from pathlib import Path
+from PIL import Image
+import torch
+from shard_dataset import ShardReader, as_image_source
+from image_cache import ImageCacheReader
+
+# --------------------------------------------------
+# 🧩 ultralytics 학습에 폴더 대신 다른 저장 형식을 연결하는 부분
+# --------------------------------------------------
+# ultralytics의 ClassificationTrainer는 dataset/<split>/<class>/ 폴더만 읽습니다.
+# 여기서는 build_dataset()만 바꿔 끼워서, 같은 증강/전처리를 유지한 채
+# 샘플을 샤드(shard_dataset.py)나 리사이즈 캐시(image_cache.py)에서 읽도록 합니다.
+
+
+class ExternalClassificationDataset(torch.utils.data.Dataset, abc.ABC):
+    """
+    ultralytics ClassificationDataset과 같은 형식({'img': 텐서, 'cls': 클래스 번호})을 돌려주는 공통 베이스입니다.
+    samples는 (이미지 참조, 클래스 번호) 목록이며, 하위 클래스는 load_image()만 구현하면 됩니다.
+    """
+
+    def __init__(self, samples, args, augment=False):
+        from ultralytics.data.augment import classify_augmentations, classify_transforms
+
+        self.samples = samples
+        self.torch_transforms = (
+            classify_augmentations(
+                size=args.imgsz,
+                scale=(1.0 - args.scale, 1.0),
+                hflip=args.fliplr,
+                vflip=args.flipud,
+                erasing=args.erasing,
+                auto_augment=args.auto_augment,
+                hsv_h=args.hsv_h,
+                hsv_s=args.hsv_s,
+                hsv_v=args.hsv_v,
+            )
+            if augment
+            else classify_transforms(size=args.imgsz)
+        )
+
+    @abc.abstractmethod
+    def load_image(self, ref):
+        """샘플 참조(ref)를 PIL RGB 이미지로 읽어 반환합니다."""
+
+    def __getitem__(self, i):
+        ref, j = self.samples[i]
+        return {"img": self.torch_transforms(self.load_image(ref)), "cls": j}
+
+    def __len__(self):
+        return len(self.samples)
+
+
+def align_to_model_names(classes, names):
+    """split 안의 클래스 이름 순서를 모델의 클래스 번호(names)에 맞춘 매핑을 반환합니다."""
+    index = {n: i for i, n in names.items()}
+    return {c: index[c] for c in classes if c in index}
+
+
+class ShardClassificationDataset(ExternalClassificationDataset):
+    """샤드 파일을 mmap으로 읽어 학습/검증 샘플을 제공합니다."""
+
+    def __init__(self, shard_dir, args, augment=False, names=None):
+        reader = ShardReader(shard_dir)
+        mapping = align_to_model_names(reader.classes, names) if names else {c: i for i, c in enumerate(reader.classes)}
+        samples = []
+        for i in range(len(reader)):
+            sample = reader.sample(i)
+            if sample.label in mapping:
+                samples.append((sample, mapping[sample.label]))
+        super().__init__(samples, args, augment)
+
+    def load_image(self, ref):
+        with Image.open(as_image_source(ref)) as img:
+            return img.convert("RGB")
+
+
+def shard_dataset_factory(shard_root):
+    """dataset/<split> 경로를 같은 이름의 dataset_shards/<split> 샤드로 바꿔 읽는 팩토리를 만듭니다."""
+    shard_root = Path(shard_root)
+
+    def factory(img_path, args, augment, names):
+        shard_dir = shard_root / Path(img_path).name
+        if not (shard_dir / 'meta.json').is_file():
+            return None  # 샤드가 없는 split은 기존 폴더 방식으로 읽음
+        return ShardClassificationDataset(shard_dir, args, augment=augment, names=names)
+
+    return factory
+
+
+class CachedClassificationDataset(ExternalClassificationDataset):
+    """
+    image_cache.py로 미리 리사이즈해 둔 uint8 memmap 캐시에서 학습/검증 샘플을 제공합니다.
+    train 이미지는 비율을 유지한 채(짧은 변만 리사이즈) 저장되어 있어 증강이 원본과 같은 영역을 봅니다.
+    """
+
+    def __init__(self, cache_dir, split, args, augment=False, names=None):
+        self.reader = ImageCacheReader(cache_dir, split)
+        classes = self.reader.classes
+        mapping = align_to_model_names(classes, names) if names else {c: i for i, c in enumerate(classes)}
+        samples = [(i, mapping[classes[cls_idx]]) for i, cls_idx in enumerate(self.reader.labels)
+                   if classes[cls_idx] in mapping and i not in self.reader.failed]
+        super().__init__(samples, args, augment)
+
+    def load_image(self, ref):
+        return Image.fromarray(self.reader.image(ref))
+
+
+def image_cache_factory(cache_dir):
+    """dataset/<split> 경로를 이미지 캐시의 같은 split으로 바꿔 읽는 팩토리를 만듭니다."""
+    cache_dir = Path(cache_dir)
+
+    def factory(img_path, args, augment, names):
+        split = Path(img_path).name
+        if not (cache_dir / f"{split}.json").is_file():
+            return None  # 캐시에 없는 split(test 등)은 기존 폴더 방식으로 읽음
+        return CachedClassificationDataset(cache_dir, split, args, augment=augment, names=names)
+
+    return factory
+
+
+def make_trainer(dataset_factory):
+    """
+    build_dataset()에서 dataset_factory(img_path, args, augment, names)를 먼저 시도하는
+    ClassificationTrainer 하위 클래스를 만듭니다. model.train(trainer=...)에 넘겨 사용합니다.
+    """
+    from ultralytics.models.yolo.classify import ClassificationTrainer
+
+    class ExternalDataTrainer(ClassificationTrainer):
+        def build_dataset(self, img_path, mode="train", batch=None):
+            dataset = dataset_factory(img_path, self.args, mode == "train", self.data["names"])
+            if dataset is None:
+                return super().build_dataset(img_path, mode, batch)
+            return dataset
+
+    return ExternalDataTrainer
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import itertools
+from pathlib import Path
+import pandas as pd
+
+# --------------------------------------------------
+# ✅ 보정(calibration) 모드 설정 (python training_profiler.py 로 실행)
+# --------------------------------------------------
+# 워커 수 x 배치 크기 조합마다 짧게 학습해 보고 가장 빠른 조합을 추천합니다.
+CALIBRATION_WORKERS = [2, 4, 8, 16]
+CALIBRATION_BATCH_SIZES = [32, 64]
+CALIBRATION_STEPS = 200        # 조합마다 측정할 학습 step 수
+CALIBRATION_WARMUP_STEPS = 20  # 워커 시작/캐시 예열 구간 (측정에서 제외)
+CALIBRATION_BASE_NAME = 'calibration'
+# --------------------------------------------------
+
+PROFILE_FILENAME = 'input_pipeline_profile.csv'
+SUMMARY_FILENAME = 'input_pipeline_summary.json'
+CALIBRATION_FILENAME = 'input_pipeline_calibration.csv'
+# 데이터 대기 시간이 이 비율(%)을 넘으면 입력 파이프라인(디코딩/증강) 병목으로 판단
+DATA_BOUND_THRESHOLD = 30.0
+
+try:
+    import psutil  # ultralytics 의존성이라 보통 설치돼 있음. 없으면 워커 사용률만 생략
+except ImportError:
+    psutil = None
+
+
+def _cpu_seconds(proc):
+    try:
+        t = proc.cpu_times()
+        return t.user + t.system
+    except Exception:  # 측정 중에 끝난 프로세스
+        return 0.0
+
+
+class InputPipelineProfiler:
+    """
+    ultralytics 콜백으로 학습 step마다 '데이터로더를 기다린 시간'과 '연산 시간'을 나눠 기록합니다.
+    - 데이터 대기: 이전 batch 끝 ~ 다음 batch 시작 (워커가 디코딩/증강한 batch를 받는 시간)
+    - 연산: batch 시작 ~ 끝 (forward/backward/optimizer, CUDA면 동기화 후 측정)
+    epoch마다 runs/classify/<exp>/input_pipeline_profile.csv에 한 줄씩 추가합니다.
+    warmup_steps 이후의 step만 measured에 누적하고, max_steps에 도달하면 학습을 멈춥니다. (보정 모드용)
+    """
+
+    def __init__(self, warmup_steps=0, max_steps=None, write_files=True):
+        self.warmup_steps = warmup_steps
+        self.max_steps = max_steps
+        self.write_files = write_files
+        self.records = []
+        self.measured = {'steps': 0, 'samples': 0, 'data_wait': 0.0, 'compute': 0.0}
+        self._global_step = 0
+        self._sync = None
+
+    def attach(self, model):
+        for event in ('on_train_epoch_start', 'on_train_batch_start', 'on_train_batch_end',
+                      'on_train_epoch_end', 'on_train_end'):
+            model.add_callback(event, getattr(self, event))
+        return self
+
+    def _worker_cpu(self):
+        if psutil is None:
+            return None
+        main = psutil.Process()
+        return _cpu_seconds(main), {p.pid: _cpu_seconds(p) for p in main.children(recursive=True)}
+
+    def on_train_epoch_start(self, trainer):
+        if self._sync is None:
+            import torch
+            self._sync = torch.cuda.synchronize if trainer.device.type == 'cuda' else (lambda: None)
+        self._epoch = {'steps': 0, 'data_wait': 0.0, 'compute': 0.0}
+        self._cpu_start = self._worker_cpu()
+        self._epoch_start = self._last_end = time.perf_counter()
+
+    def on_train_batch_start(self, trainer):
+        now = time.perf_counter()
+        self._wait = now - self._last_end
+        self._batch_start = now
+
+    def on_train_batch_end(self, trainer):
+        self._sync()
+        now = time.perf_counter()
+        compute = now - self._batch_start
+        self._last_end = now
+        self._epoch['steps'] += 1
+        self._epoch['data_wait'] += self._wait
+        self._epoch['compute'] += compute
+
+        self._global_step += 1
+        if self._global_step > self.warmup_steps:
+            self.measured['steps'] += 1
+            self.measured['samples'] += trainer.batch_size
+            self.measured['data_wait'] += self._wait
+            self.measured['compute'] += compute
+        if self.max_steps and self._global_step >= self.max_steps:
+            trainer.stop = True  # 다음 step 전에 학습 루프를 멈춤
+
+    def on_train_epoch_end(self, trainer):
+        wall = time.perf_counter() - self._epoch_start
+        steps = self._epoch['steps']
+        samples = min(steps * trainer.batch_size, len(trainer.train_loader.dataset))
+        num_workers = getattr(trainer.train_loader, 'num_workers', trainer.args.workers)
+        record = {
+            'epoch': trainer.epoch + 1,
+            'batch': trainer.batch_size,
+            'workers': num_workers,
+            'steps': steps,
+            'samples': samples,
+            'wall_s': round(wall, 3),
+            'data_wait_s': round(self._epoch['data_wait'], 3),
+            'compute_s': round(self._epoch['compute'], 3),
+            'data_wait_pct': round(self._epoch['data_wait'] / wall * 100, 1) if wall > 0 else 0.0,
+            'samples_per_sec': round(samples / wall, 2) if wall > 0 else 0.0,
+            'main_cpu_pct': None,
+            'worker_cpu_util_pct': None,
+        }
+        cpu_end = self._worker_cpu()
+        if cpu_end and self._cpu_start and wall > 0:
+            main_start, workers_start = self._cpu_start
+            main_end, workers_end = cpu_end
+            worker_cpu = sum(t - workers_start.get(pid, 0.0) for pid, t in workers_end.items())
+            record['main_cpu_pct'] = round((main_end - main_start) / wall * 100, 1)
+            if num_workers:
+                # 워커 하나가 코어 하나를 100% 쓰는 경우를 100%로 봄
+                record['worker_cpu_util_pct'] = round(worker_cpu / (wall * num_workers) * 100, 1)
+        self.records.append(record)
+
+        if self.write_files:
+            pd.DataFrame(self.records).to_csv(Path(trainer.save_dir) / PROFILE_FILENAME, index=False)
+
+    def on_train_end(self, trainer):
+        if not self.records:
+            return
+        summary = self.summary()
+        if self.write_files:
+            with open(Path(trainer.save_dir) / SUMMARY_FILENAME, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"\n⏱️ 입력 파이프라인 프로파일: {describe(summary)}")
+
+    def summary(self):
+        df = pd.DataFrame(self.records)
+        wall = df['wall_s'].sum()
+        data_wait_pct = float(df['data_wait_s'].sum() / wall * 100) if wall > 0 else 0.0
+        return {
+            'epochs': len(df),
+            'samples_per_sec': float(df['samples'].sum() / wall) if wall > 0 else 0.0,
+            'data_wait_pct': round(data_wait_pct, 1),
+            'worker_cpu_util_pct': (float(df['worker_cpu_util_pct'].mean())
+                                    if df['worker_cpu_util_pct'].notna().any() else None),
+            'bound': 'input' if data_wait_pct > DATA_BOUND_THRESHOLD else 'compute',
+        }
+
+
+def describe(summary):
+    bound = "입력 파이프라인(디코딩/증강) 병목" if summary['bound'] == 'input' else "연산(forward/backward) 병목"
+    util = summary.get('worker_cpu_util_pct')
+    util_text = f", 워커 CPU 사용률 {util:.0f}%" if util is not None else ""
+    return (f"{summary['samples_per_sec']:.1f} samples/sec, 데이터 대기 {summary['data_wait_pct']:.1f}%"
+            f"{util_text} -> {bound}")
+
+
+def calibrate(worker_counts=CALIBRATION_WORKERS, batch_sizes=CALIBRATION_BATCH_SIZES, steps=CALIBRATION_STEPS,
+              warmup_steps=CALIBRATION_WARMUP_STEPS, overrides=None, base_name=CALIBRATION_BASE_NAME):
+    """
+    (워커 수, 배치 크기) 조합마다 Yolo_cls.TRAIN_ARGS 설정으로 warmup_steps + steps만큼 학습하며 처리 속도를 잽니다.
+    결과 표(samples/sec 내림차순)와 결과가 저장된 폴더를 반환합니다.
+    """
+    from ultralytics import YOLO
+    from Yolo_cls import DATASET_PATH, SAVE_PATH, TRAIN_ARGS, build_train_kwargs, get_next_experiment_name
+
+    calib_name = get_next_experiment_name(SAVE_PATH, base_name)
+    calib_dir = SAVE_PATH / "classify" / calib_name
+    train_kwargs = build_train_kwargs()
+    base_args = {**TRAIN_ARGS, **(overrides or {})}
+    model_weights = base_args.pop('model', 'yolov8n-cls.pt')
+
+    rows = []
+    for workers, batch in itertools.product(worker_counts, batch_sizes):
+        print(f"\n▶ 워커 {workers}개, 배치 {batch}: {warmup_steps}+{steps} step 측정")
+        profiler = InputPipelineProfiler(warmup_steps=warmup_steps, max_steps=warmup_steps + steps, write_files=False)
+        model = YOLO(model_weights)
+        profiler.attach(model)
+        row = {'workers': workers, 'batch': batch}
+        try:
+            model.train(**train_kwargs, **{**base_args, 'epochs': 1, 'batch': batch, 'workers': workers},
+                        data=DATASET_PATH, project=calib_dir, name=f"w{workers}_b{batch}", exist_ok=True,
+                        val=False, plots=False, verbose=False)
+        except Exception as e:  # 예: 배치가 커서 메모리 부족
+            row['error'] = str(e).splitlines()[0] if str(e) else type(e).__name__
+        m = profiler.measured
+        measured_time = m['data_wait'] + m['compute']
+        row.update({
+            'steps': m['steps'],
+            'samples_per_sec': round(m['samples'] / measured_time, 2) if measured_time > 0 else 0.0,
+            'data_wait_pct': round(m['data_wait'] / measured_time * 100, 1) if measured_time > 0 else 0.0,
+            # ultralytics는 CPU 학습 등에서 워커 수를 줄이기도 하므로 실제로 사용된 워커 수를 함께 기록
+            'workers_used': profiler.records[-1]['workers'] if profiler.records else None,
+            'worker_cpu_util_pct': profiler.records[-1]['worker_cpu_util_pct'] if profiler.records else None,
+        })
+        rows.append(row)
+        print(f"  -> {row['samples_per_sec']:.1f} samples/sec (데이터 대기 {row['data_wait_pct']:.1f}%)"
+              + (f" ⚠️ {row['error']}" if 'error' in row else ""))
+
+    df = pd.DataFrame(rows).sort_values('samples_per_sec', ascending=False)
+    df.to_csv(calib_dir / CALIBRATION_FILENAME, index=False)
+    return df, calib_dir
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    worker_counts = [w for w in CALIBRATION_WORKERS if w <= cpu_count] or [cpu_count]
+    print(f"🔧 입력 파이프라인 보정: 워커 {worker_counts} x 배치 {CALIBRATION_BATCH_SIZES} "
+          f"(조합마다 {CALIBRATION_STEPS} step)")
+    df, calib_dir = calibrate(worker_counts=worker_counts)
+    print(f"\n\n{'='*60}\n🏆 보정 결과 (samples/sec 내림차순)\n{'='*60}")
+    print(df.to_string(index=False))
+    best = df.iloc[0]
+    if best['samples_per_sec'] > 0:
+        print(f"\n✅ 추천: Yolo_cls.py TRAIN_ARGS에 workers={int(best['workers'])}, batch={int(best['batch'])} "
+              f"({best['samples_per_sec']:.1f} samples/sec)")
+    print(f"💾 결과 저장 위치: {calib_dir / CALIBRATION_FILENAME}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,515 @@
+import os
+import json
+import time
+import queue
+import shutil
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from inference_engine import IMAGE_EXTENSIONS, DEFAULT_IMGSZ, load_and_resize, load_model, predict_batch
+from startup_timing import StartupTimer, import_ml_backend
+
+# --------------------------------------------------
+# ✅ 설정 부분 (python watch_ingest.py 로 실행, Ctrl+C로 종료)
+# --------------------------------------------------
+# 현장에서 올라오는 사진이 WATCH_DIR에 들어오면 모아서 분류하고 결과를 로그에 덧붙입니다.
+BASE_DIR = Path(__file__).resolve().parent
+MODEL_PATH = r"C:\Users\sega0\Desktop\code\runs\classify\test10\weights\best.pt"
+WATCH_DIR = BASE_DIR.parent / "incoming"
+# 처리한 파일: 'move' = PROCESSED_DIR/<예측 종>/ 으로 이동, 'mark' = 그대로 두고 로그에만 처리 완료로 기록
+AFTER_PROCESS = 'move'
+PROCESSED_DIR = BASE_DIR.parent / "processed"
+FAILED_DIR = BASE_DIR.parent / "processed_failed"  # 디코딩/예측에 실패한 파일 ('move'일 때)
+RESULTS_LOG_PATH = BASE_DIR.parent / "ingest_results.jsonl"
+# 감시 폴더에 아직 남아 있는 처리 완료 파일('move': 이동 대기, 'mark': 처리 완료)만 담는 상태 파일.
+# 재시작 시 결과 로그 전체 대신 이 파일만 읽습니다.
+STATE_PATH = BASE_DIR.parent / "ingest_state.jsonl"
+
+IMGSZ = DEFAULT_IMGSZ
+BATCH_SIZE = 32              # 이만큼 모이면 바로 예측
+BATCH_TIMEOUT_SECONDS = 2.0  # 또는 첫 파일이 들어온 뒤 이 시간이 지나면 모인 만큼 예측
+DECODE_WORKERS = 4
+MAX_PENDING_FILES = 2000     # 예측 대기 파일 수 상한 (가득 차면 감시 스레드가 기다림 = 역압)
+PREFETCH_BATCHES = 2         # 미리 디코딩해 둘 배치 수 상한
+SETTLE_SECONDS = 2.0         # (폴링) 마지막 수정 후 이 시간이 지나야 업로드가 끝난 것으로 간주
+POLL_SECONDS = 1.0           # 폴링 주기 (inotify 사용 시에는 이벤트 대기 시간)
+RESCAN_SECONDS = 60.0        # inotify를 쓰더라도 이 주기로 전체를 다시 훑어 놓친 파일을 찾음
+STATS_SECONDS = 30.0         # 처리량/지연 통계 출력 주기
+LOG_FSYNC_SECONDS = 5.0      # 결과 로그를 디스크에 fsync하는 주기
+MOVE_RETRY_SECONDS = 30.0    # ('move') 이동에 실패한 파일을 다시 옮겨 보는 주기 (다시 예측하지는 않음)
+STATE_COMPACT_SECONDS = 600.0  # 상태 파일에서 폴더에서 사라진 파일을 정리하고 다시 쓰는 주기
+# --------------------------------------------------
+
+try:
+    from inotify_simple import INotify, flags  # 선택 설치 (Linux). 없으면 폴링으로 감시
+except ImportError:
+    INotify = None
+
+_STOP = object()
+
+
+def file_key(path, st=None):
+    """(경로, 크기, 수정 시각) - 같은 이름으로 다른 사진이 다시 올라와도 구분합니다."""
+    st = st or os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+class IngestState:
+    """
+    감시 폴더에 아직 남아 있는 처리 완료 파일 {file_key: 로그 항목}을 기록하는 작은 상태 파일(jsonl)입니다.
+    추가/제거를 한 줄씩 덧붙이고(중간에 종료돼도 유지), 정리(compact)할 때 폴더에서 사라졌거나 바뀐 파일을 빼고
+    남은 항목만으로 다시 씁니다. 그래서 오래 실행해도 파일 크기와 메모리는 폴더에 남은 파일 수만큼만 늘어납니다.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._lines = 0
+        if self.path.is_file():
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # 기록 중 끊긴 마지막 줄
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        break
+                    key = tuple(op['key'])
+                    if 'entry' in op:
+                        self.entries[key] = op['entry']
+                    else:
+                        self.entries.pop(key, None)
+        self._file = None
+        self.compact()
+
+    def _append(self, op):
+        self._file.write(json.dumps(op, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self._lines += 1
+        if self._lines > 2 * len(self.entries) + 1000:
+            self._rewrite()
+
+    def _rewrite(self):
+        if self._file is not None:
+            self._file.close()
+        tmp_path = Path(str(self.path) + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for key, entry in self.entries.items():
+                f.write(json.dumps({'key': key, 'entry': entry}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._lines = len(self.entries)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def compact(self):
+        """폴더에서 사라졌거나(옮겨짐/삭제) 내용이 바뀐 파일을 빼고 상태 파일을 다시 씁니다."""
+        with self._lock:
+            for key in list(self.entries):
+                try:
+                    current = file_key(key[0])
+                except OSError:
+                    current = None
+                if current != key:
+                    del self.entries[key]
+            self._rewrite()
+
+    def add(self, key, entry):
+        with self._lock:
+            self.entries[key] = entry
+            self._append({'key': key, 'entry': entry})
+
+    def remove(self, key):
+        with self._lock:
+            if self.entries.pop(key, None) is not None:
+                self._append({'key': key})
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def items(self):
+        with self._lock:
+            return list(self.entries.items())
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def unique_destination(dst):
+    """같은 이름의 파일이 있으면 '이름_1.jpg'처럼 번호를 붙입니다."""
+    dst = Path(dst)
+    candidate, n = dst, 1
+    while candidate.exists():
+        candidate = dst.with_name(f"{dst.stem}_{n}{dst.suffix}")
+        n += 1
+    return candidate
+
+
+class IngestStats:
+    """누적/구간 처리량과 지연(발견 ~ 결과 기록) 카운터입니다. 여러 스레드에서 갱신합니다."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start = self.window_start = time.monotonic()
+        self.discovered = self.processed = self.failed = 0
+        self._window = {'processed': 0, 'lag_sum': 0.0, 'lag_max': 0.0}
+
+    def add(self, name, n=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def record(self, lag, failed=False):
+        with self.lock:
+            if failed:
+                self.failed += 1
+            else:
+                self.processed += 1
+            w = self._window
+            w['processed'] += 1
+            w['lag_sum'] += lag
+            w['lag_max'] = max(w['lag_max'], lag)
+
+    def report(self, pending, prefetched):
+        with self.lock:
+            now = time.monotonic()
+            w, elapsed = self._window, now - self.window_start
+            rate = w['processed'] / elapsed if elapsed > 0 else 0.0
+            lag = f"평균 {w['lag_sum'] / w['processed']:.1f}초 / 최대 {w['lag_max']:.1f}초" if w['processed'] else "-"
+            text = (f"📈 최근 {elapsed:.0f}초: {rate:.1f} images/sec, 지연 {lag} | 누적: 발견 {self.discovered}, "
+                    f"처리 {self.processed}, 실패 {self.failed} | 대기 {pending}개, 디코딩 완료 배치 {prefetched}개")
+            self._window = {'processed': 0, 'lag_sum': 0.0, 'lag_max': 0.0}
+            self.window_start = now
+            return text
+
+
+class FolderWatcher(threading.Thread):
+    """
+    WATCH_DIR(하위 폴더 포함)에 새로 들어온 이미지를 (경로, 발견 시각)으로 out_queue에 넣습니다.
+    inotify_simple이 있으면 쓰기 완료/이동 이벤트를, 없으면 주기적 폴링(수정 후 SETTLE_SECONDS 경과)을 사용합니다.
+    out_queue가 가득 차면 자리가 날 때까지 기다리므로, 업로드가 몰려도 메모리 사용량이 늘지 않습니다.
+    """
+
+    def __init__(self, root, out_queue, stop_event, stats, skip=None, exclude_dirs=(), use_inotify=True):
+        super().__init__(daemon=True)
+        self.root = Path(root)
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.stats = stats
+        self.skip = skip or (lambda key: False)
+        self.exclude_dirs = [os.path.abspath(d) for d in exclude_dirs]
+        self.use_inotify = use_inotify and INotify is not None
+        self._queued = set()  # 대기열에 들어갔지만 아직 처리되지 않은 경로 (중복 투입 방지)
+        self._lock = threading.Lock()
+
+    def done(self, path):
+        """처리가 끝난 파일을 알려줍니다. ('mark' 모드에서는 skip이 이후 재투입을 막음)"""
+        with self._lock:
+            self._queued.discard(os.path.abspath(path))
+
+    def _offer(self, path, st=None):
+        path = os.path.abspath(path)
+        if not path.lower().endswith(IMAGE_EXTENSIONS):
+            return
+        with self._lock:
+            if path in self._queued:
+                return
+        try:
+            if self.skip(file_key(path, st)):
+                return
+        except OSError:
+            return  # 그 사이 옮겨지거나 삭제된 파일
+        with self._lock:
+            self._queued.add(path)
+        self.stats.add('discovered')
+        while not self.stop_event.is_set():
+            try:
+                self.out_queue.put((path, time.monotonic()), timeout=0.5)
+                return
+            except queue.Full:
+                continue  # 역압: 예측이 따라잡을 때까지 대기
+
+    def _excluded(self, path):
+        return any(path == d or path.startswith(d + os.sep) for d in self.exclude_dirs)
+
+    def scan(self, settle_seconds=0.0):
+        """전체 폴더를 훑어 수정 후 settle_seconds가 지난 이미지를 투입하고, 발견한 하위 폴더 목록을 반환합니다."""
+        now = time.time()
+        dirs, stack = [str(self.root)], [str(self.root)]
+        while stack and not self.stop_event.is_set():
+            try:
+                entries = sorted(os.scandir(stack.pop()), key=lambda e: e.name)
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not self._excluded(os.path.abspath(entry.path)):
+                        stack.append(entry.path)
+                        dirs.append(entry.path)
+                elif entry.is_file():
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    if now - st.st_mtime >= settle_seconds:
+                        self._offer(entry.path, st)
+        return dirs
+
+    def run(self):
+        if self.use_inotify:
+            self._run_inotify()
+        else:
+            while not self.stop_event.is_set():
+                self.scan(SETTLE_SECONDS)
+                self.stop_event.wait(POLL_SECONDS)
+
+    def _run_inotify(self):
+        inotify = INotify()
+        mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE
+        watches = {}
+
+        def watch(directory):
+            try:
+                watches[inotify.add_watch(directory, mask)] = directory
+            except OSError:
+                pass
+
+        # 감시를 먼저 등록한 뒤 훑어야 그 사이에 들어온 파일을 놓치지 않습니다.
+        for directory in self.scan(settle_seconds=float('inf')):
+            watch(directory)
+        self.scan(SETTLE_SECONDS)
+        last_scan = time.monotonic()
+        while not self.stop_event.is_set():
+            overflow = False
+            for event in inotify.read(timeout=int(POLL_SECONDS * 1000)):
+                if event.mask & flags.Q_OVERFLOW:
+                    overflow = True
+                    continue
+                parent = watches.get(event.wd)
+                if parent is None:
+                    continue
+                path = os.path.join(parent, event.name)
+                if event.mask & flags.ISDIR:
+                    if event.mask & (flags.CREATE | flags.MOVED_TO) and not self._excluded(os.path.abspath(path)):
+                        for directory in self.scan(settle_seconds=float('inf')) if event.mask & flags.MOVED_TO else [path]:
+                            watch(directory)
+                        self.scan(SETTLE_SECONDS)  # 폴더째 옮겨 온 경우 안의 파일도 처리
+                elif event.mask & (flags.CLOSE_WRITE | flags.MOVED_TO):
+                    self._offer(path)
+            if overflow or time.monotonic() - last_scan >= RESCAN_SECONDS:
+                self.scan(SETTLE_SECONDS)  # 이벤트 유실 대비
+                last_scan = time.monotonic()
+        inotify.close()
+
+
+def batch_decoder(file_queue, batch_queue, stop_event, batch_size=BATCH_SIZE, timeout=BATCH_TIMEOUT_SECONDS,
+                  imgsz=IMGSZ, num_workers=DECODE_WORKERS):
+    """대기열에서 파일을 개수(batch_size) 또는 시간(timeout) 기준으로 묶어 디코딩한 뒤 batch_queue에 넣습니다."""
+
+    def decode(item):
+        try:
+            return item, load_and_resize(item[0], imgsz), None
+        except Exception as e:
+            return item, None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, num_workers)) as pool:
+        while not stop_event.is_set():
+            try:
+                items = [file_queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + timeout
+            while len(items) < batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(file_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            decoded = list(pool.map(decode, items))
+            while not stop_event.is_set():
+                try:
+                    batch_queue.put(decoded, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+    batch_queue.put(_STOP)
+
+
+class ResultLog:
+    """결과를 JSONL로 덧붙이고, LOG_FSYNC_SECONDS마다 디스크에 fsync 합니다."""
+
+    def __init__(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._last_sync = time.monotonic()
+
+    def write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def flush(self, force=False):
+        self._file.flush()
+        if force or time.monotonic() - self._last_sync >= LOG_FSYNC_SECONDS:
+            os.fsync(self._file.fileno())
+            self._last_sync = time.monotonic()
+
+    def close(self):
+        self.flush(force=True)
+        self._file.close()
+
+
+def plan_destination(source, pred_label):
+    """'move' 모드에서 옮길 위치: 예측 종 폴더 (실패 시 FAILED_DIR)."""
+    dst_dir = Path(PROCESSED_DIR) / pred_label if pred_label else Path(FAILED_DIR)
+    return unique_destination(dst_dir / Path(source).name)
+
+
+def move_file(source, dest):
+    """dest로 옮깁니다. 그 사이 같은 이름의 파일이 생겼으면 번호를 붙인 이름으로 옮깁니다."""
+    dest = unique_destination(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(source, dest)
+    return dest
+
+
+def run_ingest(model_path=MODEL_PATH, watch_dir=WATCH_DIR, after=AFTER_PROCESS, use_inotify=True, stop_event=None):
+    """감시 -> 묶기/디코딩 -> 예측 -> 로그/이동 파이프라인을 stop_event가 설정될 때까지 실행합니다."""
+    if after not in ('move', 'mark'):
+        raise ValueError(f"AFTER_PROCESS는 'move' 또는 'mark'여야 합니다: {after}")
+    watch_dir = Path(watch_dir)
+    watch_dir.mkdir(parents=True, exist_ok=True)
+    stop_event = stop_event or threading.Event()
+
+    timer = StartupTimer('watch_ingest')
+    with timer.stage('import'):
+        import_ml_backend()
+    with timer.stage('model_load'):
+        model = load_model(model_path)
+    print(timer.report())
+    timer.save()
+
+    # 처리 완료 상태 {file_key: 로그 항목}: 감시 스레드는 여기 있는 파일을 다시 투입하지 않습니다.
+    # 'mark'면 폴더에 남아 있는 처리한 파일, 'move'면 아직 옮기지 못한 파일만 남습니다. (이동만 재시도)
+    state = IngestState(STATE_PATH)
+
+    def try_move(key, entry, report=True):
+        try:
+            move_file(entry['source'], entry.get('dest') or plan_destination(entry['source'], entry.get('pred')))
+        except OSError as e:
+            if report:
+                print(f"  - ⚠️ 파일 이동 실패 ({MOVE_RETRY_SECONDS:.0f}초마다 다시 시도): {entry['source']} ({e})")
+            return False
+        state.remove(key)
+        return True
+
+    # 재시작: 상태 파일에 있는 파일은 다시 예측하지 않음 ('move'면 이동만 마저 진행)
+    if after == 'move' and len(state):
+        moved = sum(try_move(key, entry) for key, entry in state.items())
+        print(f"📦 지난 실행에서 이동하지 못한 파일 {moved}개를 옮겼습니다.")
+    elif len(state):
+        print(f"⏩ 이미 처리된 파일 {len(state)}개는 건너뜁니다.")
+
+    stats = IngestStats()
+    file_queue = queue.Queue(maxsize=MAX_PENDING_FILES)
+    batch_queue = queue.Queue(maxsize=max(1, PREFETCH_BATCHES))
+    excluded = [PROCESSED_DIR, FAILED_DIR] if after == 'move' else []
+    watcher = FolderWatcher(watch_dir, file_queue, stop_event, stats, skip=state.__contains__,
+                            exclude_dirs=excluded, use_inotify=use_inotify)
+    decoder = threading.Thread(target=batch_decoder, args=(file_queue, batch_queue, stop_event), daemon=True)
+    mode = 'inotify' if watcher.use_inotify else f'폴링({POLL_SECONDS}초)'
+    print(f"👀 '{watch_dir}' 감시 시작 ({mode}, 배치 {BATCH_SIZE}개 또는 {BATCH_TIMEOUT_SECONDS}초, 처리 후: {after})")
+    watcher.start()
+    decoder.start()
+
+    log = ResultLog(RESULTS_LOG_PATH)
+    last_stats = last_retry = last_compact = time.monotonic()
+    try:
+        while True:
+            try:
+                batch = batch_queue.get(timeout=1.0)
+            except queue.Empty:
+                batch = None
+            if batch is _STOP:
+                break
+            if batch:
+                ok = [(item, img) for item, img, err in batch if err is None]
+                results = {}
+                try:
+                    for (item, _), pred in zip(ok, predict_batch(model, [img for _, img in ok], imgsz=IMGSZ)):
+                        results[item[0]] = pred
+                except Exception as e:
+                    print(f"  - ⚠️ 배치 예측 중 오류 발생 ({len(ok)}개 이미지 실패 처리): {e}")
+                for (source, discovered), _, err in batch:
+                    pred = results.get(source)
+                    try:
+                        st = os.stat(source)
+                    except OSError:
+                        watcher.done(source)
+                        continue  # 처리 중 삭제된 파일
+                    entry = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'source': source,
+                             'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+                    if pred is not None:
+                        entry.update(pred=model.names[pred['top1']], conf=round(pred['top1conf'], 6),
+                                     top5=[model.names[i] for i in pred['top5']],
+                                     top5conf=[round(c, 6) for c in pred['top5conf']])
+                    else:
+                        entry['error'] = str(err) if err is not None else '예측 실패'
+                    if after == 'move':
+                        entry['dest'] = str(plan_destination(source, entry.get('pred')))
+                    # 로그를 먼저 쓰고 옮김: 그 사이 종료돼도 재시작 시 로그를 보고 이동만 마저 진행
+                    log.write(entry)
+                    log.flush()
+                    key = file_key(source, st)
+                    state.add(key, entry if after == 'move' else {'source': source})
+                    if after == 'move':
+                        try_move(key, entry)
+                    watcher.done(source)
+                    stats.record(time.monotonic() - discovered, failed=pred is None)
+            if after == 'move' and time.monotonic() - last_retry >= MOVE_RETRY_SECONDS:
+                for key, entry in state.items():
+                    try_move(key, entry, report=False)
+                last_retry = time.monotonic()
+            if time.monotonic() - last_compact >= STATE_COMPACT_SECONDS:
+                state.compact()
+                last_compact = time.monotonic()
+            if time.monotonic() - last_stats >= STATS_SECONDS:
+                print(stats.report(file_queue.qsize(), batch_queue.qsize()))
+                last_stats = time.monotonic()
+    finally:
+        stop_event.set()
+        log.close()
+        state.close()
+        print(stats.report(file_queue.qsize(), batch_queue.qsize()))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="감시 폴더에 들어오는 이미지를 계속 분류합니다.")
+    parser.add_argument('--watch-dir', default=str(WATCH_DIR))
+    parser.add_argument('--after', choices=('move', 'mark'), default=AFTER_PROCESS)
+    parser.add_argument('--poll', action='store_true', help="inotify 대신 폴링으로 감시")
+    args = parser.parse_args()
+
+    if not Path(MODEL_PATH).exists():
+        print(f"❌ 오류: 모델 파일을 찾을 수 없습니다: {MODEL_PATH}")
+        return
+    stop_event = threading.Event()
+    try:
+        run_ingest(MODEL_PATH, args.watch_dir, args.after, use_inotify=not args.poll, stop_event=stop_event)
+    except KeyboardInterrupt:
+        stop_event.set()
+        print("\n⏹️ 종료합니다. (처리되지 않은 파일은 다음 실행에서 이어서 처리)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
-import os
 import json
 from pathlib import Path
+from test_manifest import update_test_manifest
 
 # --------------------------------------------------
 # ✅ 설정할 부분
@@ -12,23 +12,27 @@ TEST_DATASET_PATH = Path(r'C:\Users\sega0\Desktop\code\try\dataset\test')
 #    (스크립트가 있는 폴더에 생성됩니다)
 BASE_DIR = Path(__file__).resolve().parent
 OUTPUT_JSON_PATH = BASE_DIR / "exclude_files.json"
+
+# 3. 클래스별 경로/크기/내용 해시를 담은 매니페스트 (split_images_cls.py가 우선 사용)
+#    다시 실행하면 바뀐 클래스 폴더만 다시 읽습니다.
+OUTPUT_MANIFEST_PATH = BASE_DIR / "test_manifest.json"
 # --------------------------------------------------
 
-def create_exclude_json_from_folder(target_folder, output_path):
-    """지정된 폴더와 그 하위 폴더의 모든 파일명을 읽어 JSON 파일을 생성합니다."""
-    
-    exclude_list = []
+def create_exclude_json_from_folder(target_folder, output_path, manifest_path=OUTPUT_MANIFEST_PATH):
+    """
+    지정된 폴더의 클래스별 Test 매니페스트를 갱신하고,
+    기존 도구와의 호환을 위해 전체 파일명 목록 JSON(exclude_files.json)도 함께 생성합니다.
+    """
     
     if not target_folder.is_dir():
         print(f"❌ 오류: '{target_folder}' 폴더를 찾을 수 없습니다. 경로를 다시 확인해주세요.")
         return
 
-    for root, _, files in os.walk(target_folder):
-        for filename in files:
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif')):
-                exclude_list.append(filename)
+    manifest, rescanned, hashed = update_test_manifest(target_folder, manifest_path)
+    print(f"✅ 매니페스트 갱신: {len(manifest['classes'])}개 클래스 중 {rescanned}개 다시 읽음, {hashed}개 파일 해시 -> '{manifest_path.name}'")
 
-    output_data = {"exclude": sorted(list(set(exclude_list)))}
+    exclude_list = [f['name'] for info in manifest['classes'].values() for f in info['files']]
+    output_data = {"exclude": sorted(set(exclude_list))}
 
     try:
         with open(output_path, 'w', encoding='utf-8') as f: